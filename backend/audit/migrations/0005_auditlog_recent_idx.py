@@ -0,0 +1,17 @@
+# Generated by Django 6.0 on 2026-10-17 03:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0004_alter_auditlog_action_type_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['-created_at', '-id'], name='audit_logs_recent_idx'),
+        ),
+    ]
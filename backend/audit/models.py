@@ -1,3 +1,4 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.conf import settings
 
@@ -65,6 +66,9 @@ class AuditLog(models.Model):
     class Meta:
         db_table = 'audit_logs'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='audit_logs_recent_idx'),
+        ]
     
     def __str__(self):
         return f"{self.action_type}: {self.actor.email} -> {self.target_type}:{self.target_id}"
@@ -124,3 +128,29 @@ class ProjectLedgerEntry(models.Model):
 
     def __str__(self):
         return f"{self.entry_type} - {self.project.title}"
+
+
+class IdempotencyKey(models.Model):
+    """
+    Response of a mutating request sent with an Idempotency-Key header, replayed
+    for retries of the same request (see config/idempotency.py). Rows expire
+    after IDEMPOTENCY_KEY_TTL_HOURS and are deleted by `purge_idempotency_keys`.
+    """
+
+    # 128-bit digest of (user, method, path, key): a fixed-size unique index however long clients make keys.
+    key_digest = models.CharField(max_length=32, unique=True)
+    request_fingerprint = models.CharField(max_length=32)
+    # Null while the first request is still running.
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'idempotency_keys'
+        indexes = [
+            models.Index(fields=['expires_at'], name='idempotency_keys_expiry_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.key_digest} -> {self.status_code}"
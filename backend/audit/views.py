@@ -2,6 +2,7 @@ from rest_framework import generics, permissions
 from django_filters.rest_framework import DjangoFilterBackend
 
 from .models import AuditLog, ProjectLedgerEntry
+from config.pagination import KeysetPagination
 from config.permissions import IsAdminRole
 from .serializers import AuditLogSerializer, ProjectLedgerSerializer
 
@@ -11,6 +12,7 @@ class AuditLogListView(generics.ListAPIView):
     queryset = AuditLog.objects.all()
     serializer_class = AuditLogSerializer
     permission_classes = [IsAdminRole]
+    pagination_class = KeysetPagination
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['action_type', 'target_type', 'actor']
 
@@ -0,0 +1,136 @@
+"""
+Idempotency-Key support for mutating DRF views.
+
+A client that may retry a request (after a timeout, say) sends a unique
+`Idempotency-Key` header. The first request with a key claims it with a
+committed insert, runs the view and stores its status and body in the same
+transaction as the view's own writes. Retries with the same key then get the
+stored response back (with `Idempotent-Replayed: true`) from one indexed
+lookup, without running the view or touching business tables:
+
+- same key, still running: 409;
+- same key, different method/path/body: 422;
+- no header: the view runs as usual.
+
+5xx responses and exceptions (including DRF validation errors) are not
+stored and free the key, so the retry runs again; their writes were rolled
+back. Keys are scoped per user and endpoint and live for
+IDEMPOTENCY_KEY_TTL_HOURS.
+"""
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+IDEMPOTENCY_HEADER = 'HTTP_IDEMPOTENCY_KEY'
+MAX_KEY_LENGTH = 255
+PURGE_BATCH_SIZE = 5000
+
+
+def get_ttl():
+    return timedelta(hours=getattr(settings, 'IDEMPOTENCY_KEY_TTL_HOURS', 24))
+
+
+def digest(*parts):
+    raw = '\x1f'.join(str(part) for part in parts)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:32]
+
+
+def key_digest(request, key):
+    return digest(getattr(request.user, 'pk', None), request.method, request.path, key)
+
+
+def request_fingerprint(request):
+    return digest(request.method, request.path, json.dumps(request.data, sort_keys=True, default=str))
+
+
+def replay(record, fingerprint):
+    """The response for a key that is already taken."""
+    if record.request_fingerprint != fingerprint:
+        return Response(
+            {'error': 'Idempotency-Key was already used for a different request'},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    if record.status_code is None:
+        return Response(
+            {'error': 'A request with this Idempotency-Key is still being processed'},
+            status=status.HTTP_409_CONFLICT,
+        )
+    return Response(record.response_body, status=record.status_code, headers={'Idempotent-Replayed': 'true'})
+
+
+def claim(key, fingerprint):
+    """Claim `key` for this request; returns None when claimed, else the response to send instead."""
+    from audit.models import IdempotencyKey
+
+    now = timezone.now()
+    record = IdempotencyKey.objects.filter(key_digest=key).first()
+    if record is not None and record.expires_at > now:
+        return replay(record, fingerprint)
+    if record is not None:
+        record.delete()
+    try:
+        with transaction.atomic():
+            IdempotencyKey.objects.create(key_digest=key, request_fingerprint=fingerprint, expires_at=now + get_ttl())
+    except IntegrityError:
+        # A concurrent request with the same key claimed it first.
+        return replay(IdempotencyKey.objects.get(key_digest=key), fingerprint)
+    return None
+
+
+def idempotent(method):
+    """Make a DRF view method (post/create) honour the Idempotency-Key header."""
+
+    @wraps(method)
+    def wrapper(view, request, *args, **kwargs):
+        from audit.models import IdempotencyKey
+
+        raw_key = request.META.get(IDEMPOTENCY_HEADER)
+        if not raw_key:
+            return method(view, request, *args, **kwargs)
+        if len(raw_key) > MAX_KEY_LENGTH:
+            return Response(
+                {'error': f'Idempotency-Key must be at most {MAX_KEY_LENGTH} characters'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        key = key_digest(request, raw_key)
+        fingerprint = request_fingerprint(request)
+        taken = claim(key, fingerprint)
+        if taken is not None:
+            return taken
+
+        stored = IdempotencyKey.objects.filter(key_digest=key)
+        try:
+            with transaction.atomic():
+                response = method(view, request, *args, **kwargs)
+                if response.status_code < 500:
+                    stored.update(status_code=response.status_code, response_body=response.data)
+        except Exception:
+            stored.delete()
+            raise
+        if response.status_code >= 500:
+            stored.delete()
+        return response
+
+    return wrapper
+
+
+def purge_expired_keys(now=None, batch_size=PURGE_BATCH_SIZE):
+    """Delete expired keys `batch_size` rows per statement (via the expiry index). Returns how many were deleted."""
+    from audit.models import IdempotencyKey
+
+    now = now or timezone.now()
+    expired = IdempotencyKey.objects.filter(expires_at__lte=now).order_by('expires_at')
+    deleted = 0
+    while True:
+        ids = list(expired.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += IdempotencyKey.objects.filter(id__in=ids).delete()[0]
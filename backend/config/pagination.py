@@ -0,0 +1,253 @@
+import base64
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.db.models import F, Q
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+def encode_cursor_value(value):
+    """JSON-safe cursor value that round-trips without losing precision."""
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    if isinstance(value, date):
+        return {'d': value.isoformat()}
+    if isinstance(value, Decimal):
+        return {'dec': str(value)}
+    return value
+
+
+def decode_cursor_value(value):
+    if isinstance(value, dict):
+        if 'dt' in value:
+            return parse_datetime(value['dt'])
+        if 'd' in value:
+            return parse_date(value['d'])
+        if 'dec' in value:
+            return Decimal(value['dec'])
+    return value
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (cursor) pagination over the queryset's own ordering.
+
+    The ordering applied by the view and its filter backends (for example
+    `?ordering=-funding_progress` or relevance for searches) is used as-is,
+    with the primary key appended as a tie-breaker. Each page is fetched with
+    a `WHERE (ordering columns) > (last row)` condition instead of OFFSET, and
+    no COUNT(*) is issued. Cursors are opaque; NULLs sort as the largest value.
+
+    Requests that pass `?page=` (or `?pagination=page`) keep the old
+    PageNumberPagination behaviour and response shape, including `count`.
+    """
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    page_mode_query_param = 'pagination'
+    page_number_class = PageNumberPagination
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self):
+        self.page_number_paginator = None
+
+    def use_page_numbers(self, request):
+        return (
+            request.query_params.get(self.page_mode_query_param) == 'page'
+            or self.page_number_class.page_query_param in request.query_params
+        )
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_ordering(self, queryset):
+        query = queryset.query
+        if query.order_by:
+            ordering = list(query.order_by)
+        elif query.default_ordering:
+            ordering = list(queryset.model._meta.ordering)
+        else:
+            ordering = []
+        if any(not isinstance(term, str) for term in ordering):
+            raise TypeError('KeysetPagination only supports field-name ordering')
+
+        pk_name = queryset.model._meta.pk.name
+        if not any(term.lstrip('-') in ('pk', pk_name) for term in ordering):
+            descending = bool(ordering) and ordering[0].startswith('-')
+            ordering.append(f"-{pk_name}" if descending else pk_name)
+        return [(term.lstrip('-'), term.startswith('-')) for term in ordering]
+
+    def order_queryset(self, queryset, ordering, reverse):
+        expressions = []
+        for field, descending in ordering:
+            if descending != reverse:
+                expressions.append(F(field).desc(nulls_first=True))
+            else:
+                expressions.append(F(field).asc(nulls_last=True))
+        return queryset.order_by(*expressions)
+
+    def keyset_filter(self, ordering, values, reverse):
+        """Rows strictly after `values` in the (possibly reversed) ordering."""
+        condition = Q(pk__in=[])
+        equal_prefix = Q()
+        for (field, descending), value in zip(ordering, values):
+            descending = descending != reverse
+            if value is None:
+                # NULL sorts last ascending; only non-NULLs follow it descending.
+                after = Q(**{f'{field}__isnull': False}) if descending else None
+                equal = Q(**{f'{field}__isnull': True})
+            else:
+                lookup = 'lt' if descending else 'gt'
+                after = Q(**{f'{field}__{lookup}': value})
+                if not descending:
+                    after |= Q(**{f'{field}__isnull': True})
+                equal = Q(**{field: value})
+            if after is not None:
+                condition |= equal_prefix & after
+            equal_prefix &= equal
+        return condition
+
+    def row_position(self, row, ordering):
+        values = []
+        for field, _ in ordering:
+            value = row
+            for part in field.split('__'):
+                value = getattr(value, part, None) if value is not None else None
+            values.append(value)
+        return values
+
+    def encode_cursor(self, position, reverse):
+        payload = {'p': [encode_cursor_value(value) for value in position]}
+        if reverse:
+            payload['r'] = 1
+        raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+    def decode_cursor(self, request, ordering):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            raw = base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4))
+            payload = json.loads(raw.decode('utf-8'))
+            position = [decode_cursor_value(value) for value in payload['p']]
+            reverse = bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if len(position) != len(ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        if self.use_page_numbers(request):
+            self.page_number_paginator = self.page_number_class()
+            return self.page_number_paginator.paginate_queryset(queryset, request, view)
+
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+        ordering = self.get_ordering(queryset)
+        position, reverse = self.decode_cursor(request, ordering)
+
+        queryset = self.order_queryset(queryset, ordering, reverse)
+        if position is not None:
+            queryset = queryset.filter(self.keyset_filter(ordering, position, reverse))
+
+        results = list(queryset[:page_size + 1])
+        has_more = len(results) > page_size
+        results = results[:page_size]
+        if reverse:
+            results.reverse()
+
+        self.next_position = self.previous_position = None
+        if results:
+            first, last = self.row_position(results[0], ordering), self.row_position(results[-1], ordering)
+            if reverse:
+                self.next_position = last
+                self.previous_position = first if has_more else None
+            else:
+                self.next_position = last if has_more else None
+                self.previous_position = first if position is not None else None
+        elif position is not None:
+            # Paged past the end (or before the start): offer the way back.
+            if reverse:
+                self.next_position = position
+            else:
+                self.previous_position = position
+        return results
+
+    def get_link(self, position, reverse):
+        if position is None:
+            return None
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, self.encode_cursor(position, reverse)
+        )
+
+    def get_next_link(self):
+        return self.get_link(self.next_position, reverse=False)
+
+    def get_previous_link(self):
+        return self.get_link(self.previous_position, reverse=True)
+
+    def get_paginated_response(self, data):
+        if self.page_number_paginator is not None:
+            return self.page_number_paginator.get_paginated_response(data)
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'count': {'type': 'integer', 'description': 'Only present in page-number mode.'},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Opaque cursor returned in `next`/`previous`.',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': f'Results per page (cursor mode, max {self.max_page_size}).',
+                'schema': {'type': 'integer'},
+            },
+            {
+                'name': self.page_number_class.page_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Switches to page-number pagination (with `count`).',
+                'schema': {'type': 'integer'},
+            },
+        ]
+
+    def to_html(self):
+        return ''
+
+    def get_results(self, data):
+        return data['results']
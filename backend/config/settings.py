@@ -95,6 +95,44 @@ DATABASES = {
     )
 }
 
+# Cache
+# Local memory by default; set CACHE_BACKEND to
+# django.core.cache.backends.filebased.FileBasedCache (and CACHE_LOCATION to a
+# directory) to share cached catalog responses between worker processes.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'crowdfunding-default'),
+    }
+}
+PROJECT_CACHE_TIMEOUT = int(os.getenv('PROJECT_CACHE_TIMEOUT', '300'))  # seconds
+# Where build_similarity_index writes the memory-mapped similar-projects index.
+SIMILARITY_INDEX_DIR = os.getenv('SIMILARITY_INDEX_DIR', str(BASE_DIR / 'var' / 'similarity'))
+# Superseded index versions are deleted only after this long (readers may still be opening them).
+SIMILARITY_INDEX_GRACE_SECONDS = int(os.getenv('SIMILARITY_INDEX_GRACE_SECONDS', '600'))  # seconds
+# Half-life of trending scores (changing it requires `manage.py rebuild_project_rankings`).
+TRENDING_HALF_LIFE_HOURS = float(os.getenv('TRENDING_HALF_LIFE_HOURS', '48'))
+# How stale the comparator's catalog percentiles may get.
+PROJECT_COMPARATOR_SNAPSHOT_TTL = int(os.getenv('PROJECT_COMPARATOR_SNAPSHOT_TTL', '300'))  # seconds
+# How long a stored Idempotency-Key response is replayed (`manage.py purge_idempotency_keys` deletes older ones).
+IDEMPOTENCY_KEY_TTL_HOURS = float(os.getenv('IDEMPOTENCY_KEY_TTL_HOURS', '24'))
+# Payment gateway used by `manage.py process_payments`: an HTTP gateway at
+# PAYMENT_GATEWAY_URL (e.g. `manage.py run_mock_gateway`), or an in-process mock when unset.
+PAYMENT_GATEWAY_URL = os.getenv('PAYMENT_GATEWAY_URL', '')
+PAYMENT_GATEWAY_TIMEOUT = float(os.getenv('PAYMENT_GATEWAY_TIMEOUT', '10'))  # seconds
+# Charge attempts before a payment fails; retries back off exponentially from the base delay.
+PAYMENT_MAX_ATTEMPTS = int(os.getenv('PAYMENT_MAX_ATTEMPTS', '5'))
+PAYMENT_RETRY_BASE_SECONDS = float(os.getenv('PAYMENT_RETRY_BASE_SECONDS', '2'))
+# How long a worker owns a claimed payment before another may retry it.
+PAYMENT_LEASE_SECONDS = int(os.getenv('PAYMENT_LEASE_SECONDS', '60'))
+# Shared secret for signed gateway webhooks (POST /api/investments/payments/webhook/) and how
+# old a signature may be; `manage.py apply_payment_webhooks` applies the received events.
+PAYMENT_WEBHOOK_SECRET = os.getenv('PAYMENT_WEBHOOK_SECRET', '')
+PAYMENT_WEBHOOK_TOLERANCE_SECONDS = int(os.getenv('PAYMENT_WEBHOOK_TOLERANCE_SECONDS', '300'))
+# How long applied webhook events are kept (`manage.py purge_payment_webhooks` deletes older ones); a
+# redelivery after that is stored again and ignored, as its payment is no longer queued.
+PAYMENT_WEBHOOK_RETENTION_DAYS = float(os.getenv('PAYMENT_WEBHOOK_RETENTION_DAYS', '7'))
+
 # Custom User Model
 AUTH_USER_MODEL = 'users.User'
 
@@ -152,10 +190,14 @@ CORS_ALLOW_HEADERS = [
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
+    'if-none-match',
+    'if-modified-since',
 ]
 CORS_EXPOSE_HEADERS = [
     'content-type',
     'x-csrftoken',
+    'etag',
+    'last-modified',
 ]
 CORS_PREFLIGHT_MAX_AGE = 86400  # Cache preflight response for 24 hours
 
@@ -5,7 +5,6 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
-from django.db import models
 from django.db.models import Sum
 
 from rest_framework.decorators import api_view, permission_classes
@@ -13,6 +12,7 @@ from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 from django.contrib.auth import get_user_model
 from projects.models import Project
+from projects.portfolio import developer_portfolio
 from investments.models import Investment, Payment
 from access_requests.models import AccessRequest
 from drf_spectacular.views import SpectacularAPIView, SpectacularRedocView, SpectacularSwaggerView
@@ -125,16 +125,9 @@ def dashboard_stats(request):
             'total_payments': Payment.objects.filter(status='SUCCESS').count(),
         })
     elif user.role == 'DEVELOPER':
-        my_projects = Project.objects.filter(developer=user)
-        return Response({
-            'total_projects': my_projects.count(),
-            'active_projects': my_projects.filter(status='APPROVED').count(),
-            'completed_projects': my_projects.filter(shares_sold=models.F('total_shares')).count(),
-            'archived_projects': my_projects.filter(status='ARCHIVED').count(),
-            'total_funds_secured': sum(p.shares_sold * p.per_share_price for p in my_projects),
-            'total_investors': Investment.objects.filter(project__developer=user, status='COMPLETED').values('investor').distinct().count(),
-            'total_shares_sold': sum(p.shares_sold for p in my_projects),
-        })
+        # One grouped query shared with /api/projects/my/portfolio/.
+        _, totals = developer_portfolio(user)
+        return Response(totals)
     else:  # INVESTOR
         investments = Investment.objects.filter(investor=user, status__in=invested_statuses)
         active_investments = investments.filter(status=Investment.Status.COMPLETED)
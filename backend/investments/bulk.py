@@ -0,0 +1,282 @@
+"""
+Bulk admin review and completion of investments.
+
+Both operations lock the requested investments with one SELECT (so each
+item's result is known without re-reading), split them into those whose
+status allows the transition (investments/transitions.py) and per-item
+failures, then apply the transition set-wise: one conditional UPDATE for the
+investments, one bulk INSERT each for pending payments, notifications, audit
+logs and ledger entries, and the share/reservation updates grouped per
+project.
+Queryset updates and bulk inserts skip post_save, so the access and
+membership caches are bumped per investor explicitly.
+
+Results are returned per requested ID, in request order, as
+{"id", "ok", "status"} or {"id", "ok": false, "error"} with the same error
+messages as the single-investment endpoints.
+"""
+import uuid
+from collections import Counter
+from datetime import timedelta
+from itertools import groupby
+
+from django.db import transaction
+from django.utils import timezone
+
+from audit.models import AuditLog, ProjectLedgerEntry
+from notifications.models import Notification
+from projects import funding, ranking
+from projects.cache import bump_access_version, bump_membership_version
+from projects.shares import InsufficientShares, refresh_shares, release_reservations, sell_shares
+
+from .models import Investment, Payment
+from .transitions import can_transition, get_transition, transition_queryset
+
+MAX_BULK_INVESTMENTS = 500
+DEFAULT_APPROVAL_DAYS = 7
+
+
+def lock_investments(ids):
+    return {
+        investment.id: investment
+        for investment in Investment.objects.select_for_update(of=('self',))
+        .filter(id__in=ids)
+        .select_related('investor', 'project')
+    }
+
+
+def failure(investment_id, error):
+    return {'id': investment_id, 'ok': False, 'error': error}
+
+
+def success(investment):
+    return {'id': investment.id, 'ok': True, 'status': investment.status}
+
+
+def investment_metadata(investment, **extra):
+    return {
+        'investor_id': str(investment.investor_id),
+        'investor_name': investment.investor.name,
+        'investor_email': investment.investor.email,
+        'shares': investment.shares,
+        'amount': str(investment.total_amount),
+        **extra,
+    }
+
+
+def bump_investor_caches(investments):
+    for investor_id in {investment.investor_id for investment in investments}:
+        bump_access_version(investor_id)
+        bump_membership_version(investor_id)
+
+
+@transaction.atomic
+def bulk_review(ids, action, actor, admin_note=None, expires_in_days=DEFAULT_APPROVAL_DAYS):
+    """Approve or reject many investments; returns the per-ID results."""
+    now = timezone.now()
+    investments = lock_investments(ids)
+
+    results, reviewed = {}, []
+    for investment_id in ids:
+        investment = investments.get(investment_id)
+        if investment is None:
+            results[investment_id] = failure(investment_id, 'Investment not found')
+        elif not can_transition(investment, action):
+            results[investment_id] = failure(investment_id, 'Investment is not awaiting review')
+        else:
+            reviewed.append(investment)
+    if not reviewed:
+        return [results[investment_id] for investment_id in ids]
+
+    if action == 'approve':
+        expires_at = now + timedelta(days=max(1, expires_in_days))
+        notification_type = 'INVESTMENT_APPROVED'
+        ledger_type = ProjectLedgerEntry.EntryType.INVESTMENT_APPROVED
+        audit_action = AuditLog.ActionType.INVESTMENT_APPROVED
+    else:
+        expires_at = None
+        notification_type = 'INVESTMENT_REJECTED'
+        ledger_type = ProjectLedgerEntry.EntryType.INVESTMENT_REJECTED
+        audit_action = AuditLog.ActionType.INVESTMENT_REJECTED
+
+    reviewed_ids = [investment.id for investment in reviewed]
+    updates = {'reviewed_at': now, 'reviewed_by': actor, 'approval_expires_at': expires_at, 'updated_at': now}
+    if admin_note:
+        updates['admin_note'] = admin_note
+    transition_queryset(Investment.objects.filter(id__in=reviewed_ids), action, **updates)
+    new_status = get_transition(Investment, action).target
+
+    if action == 'approve':
+        paid = set(
+            Payment.objects.filter(
+                investment_id__in=reviewed_ids, status__in=[Payment.Status.PENDING, Payment.Status.QUEUED, Payment.Status.SUCCESS],
+            ).values_list('investment_id', flat=True)
+        )
+        Payment.objects.bulk_create([
+            Payment(
+                transaction_id=f"PENDING-{uuid.uuid4().hex[:12].upper()}",
+                investor=investment.investor,
+                investment=investment,
+                amount=investment.total_amount,
+                status=Payment.Status.PENDING,
+            )
+            for investment in reviewed if investment.id not in paid
+        ])
+    else:
+        released = Counter()
+        for investment in reviewed:
+            released[investment.project_id] += investment.shares
+        release_reservations(released)
+
+    notifications, audit_logs, ledger_entries = [], [], []
+    for investment in reviewed:
+        investment.status = new_status
+        investment.reviewed_at = now
+        investment.reviewed_by = actor
+        investment.approval_expires_at = expires_at
+        investment.admin_note = admin_note or investment.admin_note
+        project = investment.project
+        expires = str(expires_at) if expires_at else None
+        notifications.append(Notification(
+            user=investment.investor,
+            type=notification_type,
+            title=f"Investment {new_status.lower()}",
+            message=f"Your investment request for {project.title} was {new_status.lower()}.",
+            related_id=str(project.id),
+            related_type='project',
+        ))
+        audit_logs.append(AuditLog(
+            action_type=audit_action,
+            actor=actor,
+            target_type=AuditLog.TargetType.INVESTMENT,
+            target_id=str(investment.id),
+            metadata=investment_metadata(
+                investment,
+                project_id=str(project.id),
+                project_name=project.title,
+                status=new_status,
+                price_per_share=str(investment.price_per_share),
+                admin_note=admin_note,
+                expires_at=expires,
+            ),
+        ))
+        ledger_entries.append(ProjectLedgerEntry(
+            project=project,
+            entry_type=ledger_type,
+            actor=actor,
+            metadata=investment_metadata(
+                investment,
+                investment_id=str(investment.id),
+                price_per_share=str(investment.price_per_share),
+                admin_note=admin_note,
+                expires_at=expires,
+            ),
+        ))
+        results[investment.id] = success(investment)
+    Notification.objects.bulk_create(notifications)
+    AuditLog.objects.bulk_create(audit_logs)
+    ProjectLedgerEntry.objects.bulk_create(ledger_entries)
+    bump_investor_caches(reviewed)
+    return [results[investment_id] for investment_id in ids]
+
+
+def sell_project_shares(project, investments):
+    """
+    Sell the shares of `investments` (all in `project`) from their
+    reservations: one sale for the whole group, or one per investment when
+    the group does not fit. Returns (sold investments, {id: error}).
+    """
+    try:
+        sell_shares(project, sum(investment.shares for investment in investments), reserved=True)
+        return investments, {}
+    except InsufficientShares:
+        pass
+    sold, errors = [], {}
+    for investment in investments:
+        try:
+            sell_shares(project, investment.shares, reserved=True)
+            sold.append(investment)
+        except InsufficientShares:
+            refresh_shares(project)
+            errors[investment.id] = f'Only {project.remaining_shares} shares remain in this project'
+    return sold, errors
+
+
+@transaction.atomic
+def bulk_complete(ids, actor, admin_note=None):
+    """Complete many PROCESSING investments; returns the per-ID results."""
+    now = timezone.now()
+    investments = lock_investments(ids)
+
+    results, processing = {}, []
+    for investment_id in ids:
+        investment = investments.get(investment_id)
+        if investment is None:
+            results[investment_id] = failure(investment_id, 'Investment not found')
+        elif investment.status != Investment.Status.PROCESSING:
+            results[investment_id] = failure(investment_id, 'Investment is not processing')
+        else:
+            processing.append(investment)
+
+    completed, projects = [], []
+    processing.sort(key=lambda investment: (investment.project_id, investment.id))
+    for _, group in groupby(processing, key=lambda investment: investment.project_id):
+        group = list(group)
+        sold, errors = sell_project_shares(group[0].project, group)
+        completed.extend(sold)
+        if sold:
+            projects.append(group[0].project)
+        for investment_id, error in errors.items():
+            results[investment_id] = failure(investment_id, error)
+    if not completed:
+        return [results[investment_id] for investment_id in ids]
+
+    updates = {'completed_at': now, 'updated_at': now}
+    if admin_note:
+        updates['admin_note'] = admin_note
+    transition_queryset(
+        Investment.objects.filter(id__in=[investment.id for investment in completed]), 'complete', **updates,
+    )
+    ranking.record_events((investment.project_id, 'investment_completed', now, False) for investment in completed)
+    for project in projects:
+        funding.record_funding_snapshot(project, now)
+
+    notifications, audit_logs, ledger_entries = [], [], []
+    for investment in completed:
+        investment.status = Investment.Status.COMPLETED
+        investment.completed_at = now
+        investment.admin_note = admin_note or investment.admin_note
+        project = investment.project
+        notifications.append(Notification(
+            user=investment.investor,
+            type='INVESTMENT_COMPLETED',
+            title='Investment completed',
+            message=f"Your investment in {project.title} has been completed.",
+            related_id=str(project.id),
+            related_type='project',
+        ))
+        audit_logs.append(AuditLog(
+            action_type=AuditLog.ActionType.INVESTMENT_COMPLETED,
+            actor=actor,
+            target_type=AuditLog.TargetType.INVESTMENT,
+            target_id=str(investment.id),
+            metadata=investment_metadata(
+                investment,
+                project_id=str(project.id),
+                project_name=project.title,
+                status=investment.status,
+                admin_note=admin_note,
+            ),
+        ))
+        ledger_entries.append(ProjectLedgerEntry(
+            project=project,
+            entry_type=ProjectLedgerEntry.EntryType.INVESTMENT_COMPLETED,
+            actor=actor,
+            metadata=investment_metadata(investment, investment_id=str(investment.id), admin_note=admin_note),
+        ))
+        results[investment.id] = success(investment)
+    Notification.objects.bulk_create(notifications)
+    AuditLog.objects.bulk_create(audit_logs)
+    ProjectLedgerEntry.objects.bulk_create(ledger_entries)
+    bump_investor_caches(completed)
+    return [results[investment_id] for investment_id in ids]
@@ -0,0 +1,241 @@
+"""
+Payment gateway adapters.
+
+A gateway charges one payment and answers with a ChargeResult: approved with
+the gateway's charge reference, declined with a reason, or pending (approved
+is None) when the outcome will follow as a webhook. A decline is final;
+failures worth retrying (timeouts, connection errors, 5xx) raise
+GatewayError instead and the payment worker backs off and tries again. The
+payment's transaction ID is sent as the charge's idempotency key, so a retry
+after a lost response never charges twice.
+
+- MockGateway: in-process stand-in with configurable latency, failure and
+  decline rates (the default when PAYMENT_GATEWAY_URL is unset).
+- HttpGateway: talks to a gateway over HTTP, e.g. the local stand-in started
+  with `manage.py run_mock_gateway` (`serve_mock_gateway` below).
+
+Webhooks carry a `Gateway-Signature: t=<unix time>,v1=<hex>` header, an
+HMAC-SHA256 of "<t>.<raw body>" under PAYMENT_WEBHOOK_SECRET
+(`sign_webhook` / `verify_webhook`).
+"""
+import hashlib
+import hmac
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import NamedTuple
+
+import requests
+from django.conf import settings
+
+
+WEBHOOK_SIGNATURE_HEADER = 'Gateway-Signature'
+WEBHOOK_EVENT_OUTCOMES = {'charge.succeeded': True, 'charge.declined': False}
+
+
+class ChargeResult(NamedTuple):
+    approved: bool | None
+    reference: str = ''
+    message: str = ''
+
+
+def sign_webhook(body, secret, timestamp=None):
+    """The signature header value for raw webhook `body` (bytes)."""
+    timestamp = int(time.time() if timestamp is None else timestamp)
+    mac = hmac.new(secret.encode('utf-8'), f'{timestamp}.'.encode('utf-8') + body, hashlib.sha256)
+    return f't={timestamp},v1={mac.hexdigest()}'
+
+
+def verify_webhook(body, header, secret, tolerance=300, now=None):
+    """Whether `header` signs `body` under `secret` within `tolerance` seconds of now."""
+    try:
+        parts = dict(item.split('=', 1) for item in (header or '').split(','))
+        timestamp = int(parts['t'])
+    except (KeyError, ValueError):
+        return False
+    now = time.time() if now is None else now
+    if abs(now - timestamp) > tolerance:
+        return False
+    expected = sign_webhook(body, secret, timestamp).split('v1=', 1)[1]
+    return hmac.compare_digest(expected, parts.get('v1', ''))
+
+
+class GatewayError(Exception):
+    """The gateway could not answer; the charge may be retried."""
+
+
+class PaymentGateway:
+    def charge(self, payment):
+        """Charge `payment` (amount, payment_method, transaction_id); returns a ChargeResult."""
+        raise NotImplementedError
+
+
+class MockGateway(PaymentGateway):
+    """Approves charges after `latency` seconds, failing or declining at the given rates."""
+
+    def __init__(self, latency=0.0, failure_rate=0.0, decline_rate=0.0, seed=None):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.decline_rate = decline_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.charges = {}
+
+    def wait(self):
+        if self.latency:
+            time.sleep(self.latency * (0.5 + self.random.random()))
+
+    def settle(self, key):
+        """Decline or approve `key` for good (under self.lock)."""
+        declined = self.random.random() * (1 - self.failure_rate) < self.decline_rate
+        self.charges[key] = 'declined' if declined else 'succeeded', f"ch_{uuid.uuid4().hex[:16]}"
+        return self.charges[key]
+
+    def decide(self, key):
+        """('failed' | 'declined' | 'succeeded', reference); answers already given for `key` are repeated."""
+        self.wait()
+        with self.lock:
+            if key in self.charges:
+                return self.charges[key]
+            if self.random.random() < self.failure_rate:
+                return 'failed', ''
+            return self.settle(key)
+
+    def charge(self, payment):
+        outcome, reference = self.decide(payment.transaction_id)
+        if outcome == 'failed':
+            raise GatewayError('Gateway unavailable')
+        if outcome == 'declined':
+            return ChargeResult(False, reference, 'Card declined')
+        return ChargeResult(True, reference)
+
+
+class HttpGateway(PaymentGateway):
+    """POSTs charges to `{url}/charges`; 200 approves, 202 is pending, 402 declines, other 4xx fail for good."""
+
+    def __init__(self, url, timeout=10.0):
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+        self.local = threading.local()
+
+    @property
+    def session(self):
+        # One connection pool per worker thread.
+        if not hasattr(self.local, 'session'):
+            self.local.session = requests.Session()
+        return self.local.session
+
+    def charge(self, payment):
+        try:
+            response = self.session.post(
+                f'{self.url}/charges',
+                json={
+                    'idempotency_key': payment.transaction_id,
+                    'amount': str(payment.amount),
+                    'payment_method': payment.payment_method,
+                },
+                timeout=self.timeout,
+            )
+        except requests.RequestException as exc:
+            raise GatewayError(f'Gateway unreachable: {exc}') from exc
+        if response.status_code >= 500 or response.status_code == 429:
+            raise GatewayError(f'Gateway returned {response.status_code}')
+        try:
+            body = response.json()
+        except ValueError:
+            body = {}
+        if response.status_code >= 400:
+            return ChargeResult(False, body.get('id', ''), body.get('error') or f'Gateway returned {response.status_code}')
+        if response.status_code == 202:
+            return ChargeResult(None, body.get('id', ''))
+        return ChargeResult(True, body.get('id', ''))
+
+
+def get_gateway():
+    """The gateway configured by PAYMENT_GATEWAY_URL (in-process MockGateway when unset)."""
+    url = getattr(settings, 'PAYMENT_GATEWAY_URL', '')
+    if url:
+        return HttpGateway(url, timeout=getattr(settings, 'PAYMENT_GATEWAY_TIMEOUT', 10.0))
+    return MockGateway()
+
+
+def serve_mock_gateway(host='127.0.0.1', port=0, gateway=None, webhook_url='', webhook_secret=''):
+    """
+    An HTTP server answering POST /charges from `gateway` (a MockGateway);
+    call serve_forever() on it. With `webhook_url`, new charges are answered
+    202 at once and their outcome is POSTed there, signed, after the latency.
+    """
+    gateway = gateway or MockGateway()
+    in_flight = set()
+
+    def deliver(key):
+        gateway.wait()
+        with gateway.lock:
+            outcome, reference = gateway.settle(key)
+            in_flight.discard(key)
+        body = json.dumps({
+            'id': f"evt_{uuid.uuid4().hex[:16]}",
+            'type': f'charge.{outcome}',
+            'data': {'idempotency_key': key, 'id': reference, 'error': 'Card declined' if outcome == 'declined' else ''},
+        }).encode('utf-8')
+        try:
+            requests.post(webhook_url, data=body, timeout=10, headers={
+                'Content-Type': 'application/json',
+                WEBHOOK_SIGNATURE_HEADER: sign_webhook(body, webhook_secret),
+            })
+        except requests.RequestException:
+            pass  # Lost; the worker's next attempt after its lease gets the stored answer.
+
+    def accept(key):
+        """Answer a charge at once and deliver its outcome later; None when it is already settled."""
+        with gateway.lock:
+            if key in gateway.charges:
+                return None
+            if key in in_flight:
+                return 'pending'
+            if gateway.random.random() < gateway.failure_rate:
+                return 'failed'
+            in_flight.add(key)
+        threading.Thread(target=deliver, args=(key,), daemon=True).start()
+        return 'pending'
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def reply(self, code, body):
+            raw = json.dumps(body).encode('utf-8')
+            self.send_response(code)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(raw)))
+            self.end_headers()
+            self.wfile.write(raw)
+
+        def do_POST(self):
+            try:
+                payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b'{}')
+            except ValueError:
+                payload = None
+            if self.path.rstrip('/') != '/charges':
+                return self.reply(404, {'error': 'Not found'})
+            if not isinstance(payload, dict) or not payload.get('idempotency_key'):
+                return self.reply(400, {'error': 'idempotency_key is required'})
+            key = payload['idempotency_key']
+            accepted = accept(key) if webhook_url else None
+            if accepted == 'pending':
+                return self.reply(202, {'id': '', 'status': 'pending'})
+            outcome, reference = ('failed', '') if accepted == 'failed' else gateway.decide(key)
+            if outcome == 'failed':
+                return self.reply(503, {'error': 'Gateway unavailable'})
+            if outcome == 'declined':
+                return self.reply(402, {'id': reference, 'status': 'declined', 'error': 'Card declined'})
+            return self.reply(200, {'id': reference, 'status': 'succeeded'})
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    return server
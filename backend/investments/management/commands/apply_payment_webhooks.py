@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from investments.webhooks import WEBHOOK_BATCH_SIZE, apply_webhook_events
+
+
+class Command(BaseCommand):
+    help = 'Apply received payment gateway webhooks in batches (run continuously or on a schedule)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=WEBHOOK_BATCH_SIZE, help='Events applied per transaction')
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=0,
+            help='Keep running, checking the inbox every N seconds (default: drain it once and exit)',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.perf_counter()
+            count = apply_webhook_events(batch_size=max(1, options['batch_size']))
+            if count or not options['poll_interval']:
+                self.stdout.write(self.style.SUCCESS(
+                    f"Applied {count} webhook events in {time.perf_counter() - started:.2f}s"
+                ))
+            if not options['poll_interval']:
+                return
+            time.sleep(options['poll_interval'])
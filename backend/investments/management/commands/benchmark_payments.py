@@ -0,0 +1,125 @@
+import threading
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from investments.gateways import HttpGateway, MockGateway, serve_mock_gateway
+from investments.models import Investment, Payment
+from investments.payments import PAYMENT_BATCH_SIZE, process_payment_queue
+from projects.models import Project
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Benchmark queued payment throughput against a slow, flaky gateway at increasing worker counts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', nargs='+', type=int, default=[1, 2, 4, 8, 16], help='Worker counts to run')
+        parser.add_argument('--payments', type=int, default=200, help='Payments queued per run')
+        parser.add_argument('--latency-ms', type=float, default=50.0, help='Mean gateway response time')
+        parser.add_argument('--failure-rate', type=float, default=0.05, help='Share of gateway calls that fail (retried)')
+        parser.add_argument('--decline-rate', type=float, default=0.02, help='Share of charges declined')
+        parser.add_argument('--retry-base-ms', type=float, default=10.0, help='First retry delay')
+        parser.add_argument('--batch-size', type=int, default=PAYMENT_BATCH_SIZE, help='Payments claimed at a time')
+        parser.add_argument(
+            '--gateway-url',
+            default='',
+            help='Benchmark an already running gateway instead of a local mock started for the run',
+        )
+
+    def handle(self, *args, **options):
+        payments = max(1, options['payments'])
+        server = None
+        url = options['gateway_url']
+        if not url:
+            server = serve_mock_gateway(gateway=MockGateway(
+                latency=options['latency_ms'] / 1000,
+                failure_rate=options['failure_rate'],
+                decline_rate=options['decline_rate'],
+            ))
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            host, port = server.server_address[:2]
+            url = f'http://{host}:{port}'
+        self.stdout.write(
+            f"Benchmarking on {connection.vendor} against {url}: {payments} payments per run; "
+            f"synthetic rows are deleted at the end."
+        )
+        self.stdout.write(
+            f"{'workers':>8} {'seconds':>9} {'payments/s':>11} {'succeeded':>10} {'declined':>9} "
+            f"{'failed':>7} {'retries':>8}"
+        )
+
+        suffix = uuid.uuid4().hex[:8]
+        developer = User.objects.create(
+            email=f'payments-benchmark-dev-{suffix}@seed.local', username=f'payments-benchmark-dev-{suffix}',
+            role='DEVELOPER',
+        )
+        investor = User.objects.create(
+            email=f'payments-benchmark-{suffix}@seed.local', username=f'payments-benchmark-{suffix}', role='INVESTOR',
+        )
+        try:
+            for workers in options['workers']:
+                self.run(
+                    HttpGateway(url), developer, investor, max(1, workers), payments,
+                    options['batch_size'], options['retry_base_ms'] / 1000,
+                )
+        finally:
+            investor.delete()
+            developer.delete()
+            if server is not None:
+                server.shutdown()
+                server.server_close()
+
+    def run(self, gateway, developer, investor, workers, payments, batch_size, retry_base):
+        project = Project.objects.create(
+            developer=developer,
+            title=f'Payment benchmark ({workers} workers)',
+            description='Synthetic',
+            short_description='Synthetic',
+            status=Project.Status.APPROVED,
+            total_value=payments * 10,
+            total_shares=payments,
+            duration_days=30,
+        )
+        now = timezone.now()
+        investments = Investment.objects.bulk_create([
+            Investment(
+                investor=investor, project=project, shares=1, price_per_share=10, total_amount=10,
+                status=Investment.Status.APPROVED, approval_expires_at=now + timezone.timedelta(days=1),
+            )
+            for _ in range(payments)
+        ])
+        Payment.objects.bulk_create([
+            Payment(
+                transaction_id=f"BENCH-{uuid.uuid4().hex[:16].upper()}",
+                investor=investor,
+                investment=investment,
+                amount=investment.total_amount,
+                status=Payment.Status.QUEUED,
+                payment_method='card',
+                next_attempt_at=now,
+            )
+            for investment in investments
+        ])
+
+        queued = Payment.objects.filter(investment__project=project, status=Payment.Status.QUEUED)
+        totals = {}
+        started = time.perf_counter()
+        while queued.exists():
+            outcomes = process_payment_queue(gateway, workers=workers, batch_size=batch_size, retry_base=retry_base)
+            for outcome, count in outcomes.items():
+                totals[outcome] = totals.get(outcome, 0) + count
+            if not any(outcomes.values()):
+                time.sleep(retry_base / 2 or 0.001)
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            f"{workers:>8} {elapsed:>9.2f} {payments / elapsed:>11,.1f} {totals.get('succeeded', 0):>10} "
+            f"{totals.get('declined', 0):>9} {totals.get('failed', 0):>7} {totals.get('retried', 0):>8}"
+        )
+        project.delete()
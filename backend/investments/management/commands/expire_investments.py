@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from investments.utils import EXPIRY_BATCH_SIZE, expire_due_investments
+
+
+class Command(BaseCommand):
+    help = 'Expire approved investments whose payment window has closed (run on a schedule)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=EXPIRY_BATCH_SIZE,
+            help='Investments expired per transaction',
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        count = expire_due_investments(batch_size=max(1, options['batch_size']))
+        self.stdout.write(self.style.SUCCESS(
+            f"Expired {count} investments in {time.perf_counter() - started:.2f}s"
+        ))
@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from investments.gateways import get_gateway
+from investments.payments import PAYMENT_BATCH_SIZE, process_payment_queue
+
+
+class Command(BaseCommand):
+    help = 'Charge queued payments through the payment gateway (run continuously or on a schedule)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Concurrent gateway calls')
+        parser.add_argument('--batch-size', type=int, default=PAYMENT_BATCH_SIZE, help='Payments claimed at a time')
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=0,
+            help='Keep running, checking for due payments every N seconds (default: drain the queue once and exit)',
+        )
+
+    def handle(self, *args, **options):
+        gateway = get_gateway()
+        while True:
+            started = time.perf_counter()
+            outcomes = process_payment_queue(
+                gateway, workers=max(1, options['workers']), batch_size=max(1, options['batch_size']),
+            )
+            if any(outcomes.values()) or not options['poll_interval']:
+                summary = ', '.join(f'{count} {outcome}' for outcome, count in outcomes.items())
+                self.stdout.write(self.style.SUCCESS(
+                    f"Processed payments in {time.perf_counter() - started:.2f}s: {summary}"
+                ))
+            if not options['poll_interval']:
+                return
+            time.sleep(options['poll_interval'])
@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from investments.webhooks import PURGE_BATCH_SIZE, purge_applied_events
+
+
+class Command(BaseCommand):
+    help = 'Delete applied payment webhook events past their retention (run on a schedule)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=PURGE_BATCH_SIZE, help='Rows deleted per statement')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        count = purge_applied_events(batch_size=max(1, options['batch_size']))
+        self.stdout.write(self.style.SUCCESS(
+            f"Purged {count} webhook events in {time.perf_counter() - started:.2f}s"
+        ))
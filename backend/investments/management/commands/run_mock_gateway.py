@@ -0,0 +1,48 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from investments.gateways import MockGateway, serve_mock_gateway
+
+
+class Command(BaseCommand):
+    help = 'Run a local stand-in payment gateway (point PAYMENT_GATEWAY_URL at it)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--latency-ms', type=float, default=50.0, help='Mean time to answer a charge')
+        parser.add_argument('--failure-rate', type=float, default=0.0, help='Share of charges answered with 503')
+        parser.add_argument('--decline-rate', type=float, default=0.0, help='Share of charges declined (402)')
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument(
+            '--webhook-url',
+            default='',
+            help='Answer charges 202 and POST their outcome here (e.g. http://localhost:8000/api/investments/payments/webhook/)',
+        )
+
+    def handle(self, *args, **options):
+        if options['webhook_url'] and not settings.PAYMENT_WEBHOOK_SECRET:
+            raise CommandError('Set PAYMENT_WEBHOOK_SECRET to sign webhooks')
+        gateway = MockGateway(
+            latency=options['latency_ms'] / 1000,
+            failure_rate=options['failure_rate'],
+            decline_rate=options['decline_rate'],
+            seed=options['seed'],
+        )
+        server = serve_mock_gateway(
+            options['host'], options['port'], gateway,
+            webhook_url=options['webhook_url'], webhook_secret=settings.PAYMENT_WEBHOOK_SECRET,
+        )
+        host, port = server.server_address[:2]
+        self.stdout.write(self.style.SUCCESS(
+            f"Mock gateway on http://{host}:{port}/charges "
+            f"({options['latency_ms']:.0f} ms, {options['failure_rate']:.0%} failures, "
+            f"{options['decline_rate']:.0%} declines"
+            f"{', webhooks to ' + options['webhook_url'] if options['webhook_url'] else ''}); Ctrl-C to stop"
+        ))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
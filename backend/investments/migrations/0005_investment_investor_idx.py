@@ -0,0 +1,17 @@
+# Generated by Django 6.0 on 2026-10-17 03:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investments', '0004_investment_withdrawn_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='investment',
+            index=models.Index(fields=['investor', '-created_at', '-id'], name='investments_investor_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 6.0 on 2026-10-17 04:20
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investments', '0005_investment_investor_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='investment',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 6.0 on 2026-10-17 04:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investments', '0006_investment_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='investment',
+            index=models.Index(fields=['project', 'status'], name='investments_project_status_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 6.0 on 2026-10-17 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investments', '0008_payment_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentWebhookEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_id', models.CharField(max_length=255, unique=True)),
+                ('event_type', models.CharField(max_length=100)),
+                ('transaction_id', models.CharField(max_length=255)),
+                ('payload', models.JSONField()),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('applied_at', models.DateTimeField(blank=True, null=True)),
+                ('result', models.CharField(blank=True, choices=[('APPLIED', 'Applied'), ('DUPLICATE', 'Duplicate'), ('IGNORED', 'Ignored')], max_length=20)),
+            ],
+            options={
+                'db_table': 'payment_webhook_events',
+                'ordering': ['id'],
+                'indexes': [models.Index(condition=models.Q(('applied_at__isnull', True)), fields=['id'], name='webhook_events_inbox_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 6.0 on 2026-10-17 10:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investments', '0009_payment_webhook_events'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='paymentwebhookevent',
+            index=models.Index(condition=models.Q(('applied_at__isnull', False)), fields=['applied_at'], name='webhook_events_applied_idx'),
+        ),
+    ]
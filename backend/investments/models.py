@@ -45,22 +45,38 @@ class Investment(models.Model):
     approval_expires_at = models.DateTimeField(null=True, blank=True)
     
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     completed_at = models.DateTimeField(null=True, blank=True)
     withdrawn_at = models.DateTimeField(null=True, blank=True)
+
+    # Statuses whose shares are held in Project.reserved_shares.
+    RESERVING_STATUSES = (Status.REQUESTED, Status.APPROVED, Status.PROCESSING)
     
     class Meta:
         db_table = 'investments'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['investor', '-created_at', '-id'], name='investments_investor_idx'),
+            models.Index(fields=['project', 'status'], name='investments_project_status_idx'),
+        ]
     
     def __str__(self):
         return f"{self.investor.email} - {self.shares} shares in {self.project.title}"
 
+    def save(self, *args, **kwargs):
+        # Partial saves must still bump updated_at (it validates conditional GETs).
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {'updated_at'}
+        super().save(*args, **kwargs)
+
 
 class Payment(models.Model):
     """Payment model for tracking investment payments."""
     
     class Status(models.TextChoices):
         PENDING = 'PENDING', 'Pending'
+        QUEUED = 'QUEUED', 'Queued'
         SUCCESS = 'SUCCESS', 'Success'
         FAILED = 'FAILED', 'Failed'
         REFUNDED = 'REFUNDED', 'Refunded'
@@ -81,6 +97,12 @@ class Payment(models.Model):
     amount = models.DecimalField(max_digits=15, decimal_places=2)
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
     payment_method = models.CharField(max_length=50, blank=True)
+    # Gateway queue (investments/payments.py): charge attempts so far, when the
+    # next one is due (or the current one's lease ends) and the last failure.
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.CharField(max_length=255, blank=True)
+    gateway_reference = models.CharField(max_length=255, blank=True)
     
     created_at = models.DateTimeField(auto_now_add=True)
     processed_at = models.DateTimeField(null=True, blank=True)
@@ -88,6 +110,49 @@ class Payment(models.Model):
     class Meta:
         db_table = 'payments'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='payments_queue_idx'),
+        ]
+        constraints = [
+            # At most one charge in flight per investment.
+            models.UniqueConstraint(
+                fields=['investment'],
+                condition=models.Q(status='QUEUED'),
+                name='payments_one_queued_per_investment',
+            ),
+        ]
     
     def __str__(self):
         return f"Payment {self.transaction_id} - {self.status}"
+
+
+class PaymentWebhookEvent(models.Model):
+    """Gateway webhook as received; applied in batches by investments/webhooks.py."""
+
+    class Result(models.TextChoices):
+        APPLIED = 'APPLIED', 'Applied'
+        DUPLICATE = 'DUPLICATE', 'Duplicate'
+        IGNORED = 'IGNORED', 'Ignored'
+
+    event_id = models.CharField(max_length=255, unique=True)
+    event_type = models.CharField(max_length=100)
+    transaction_id = models.CharField(max_length=255)
+    payload = models.JSONField()
+    received_at = models.DateTimeField(auto_now_add=True)
+    applied_at = models.DateTimeField(null=True, blank=True)
+    result = models.CharField(max_length=20, choices=Result.choices, blank=True)
+
+    class Meta:
+        db_table = 'payment_webhook_events'
+        ordering = ['id']
+        indexes = [
+            # The inbox: events not applied yet, oldest first.
+            models.Index(fields=['id'], condition=models.Q(applied_at__isnull=True), name='webhook_events_inbox_idx'),
+            # Applied events by age, for the retention purge.
+            models.Index(
+                fields=['applied_at'], condition=models.Q(applied_at__isnull=False), name='webhook_events_applied_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} {self.transaction_id}"
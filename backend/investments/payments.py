@@ -0,0 +1,383 @@
+"""
+Asynchronous payment processing.
+
+The pay endpoint only queues: the investor's payment moves to QUEUED with
+next_attempt_at = now. `process_payment_queue` (run by
+`manage.py process_payments`) claims due payments in batches, charges them
+through the gateway (investments/gateways.py) on a thread pool and hands the
+batch's answers to `apply_charge_results`, the gateway callback that moves
+the payments and their investments (signed webhooks from the gateway reach
+it through investments/webhooks.py):
+
+- approved: payment SUCCESS, investment APPROVED -> PROCESSING, with the
+  audit logs, ledger entries and notifications the pay view used to write;
+- declined, or out of attempts: payment FAILED and the investor notified; the
+  investment stays APPROVED so they can pay again until the approval expires
+  (expiry skips investments with a payment in flight);
+- pending: left QUEUED under its lease until the webhook arrives; if it
+  never does, the next attempt gets the settled answer from the gateway;
+- gateway error: tried again after exponential backoff with jitter.
+
+Claiming bumps `attempts` and sets next_attempt_at to a lease deadline in a
+short SKIP LOCKED transaction, so several workers can share the queue and a
+worker that dies mid-batch has its payments picked up again once the lease
+runs out. Threads only talk to the gateway; results are written on the
+calling thread, set-wise per batch.
+"""
+import logging
+import random
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import Case, CharField, F, Value, When
+from django.utils import timezone
+
+from audit.models import AuditLog, ProjectLedgerEntry
+from notifications.models import Notification
+from users.models import WalletTransaction
+
+from .bulk import bump_investor_caches
+from .gateways import ChargeResult, GatewayError
+from .models import Investment, Payment
+from .transitions import get_transition, transition, transition_queryset
+from .utils import credit_wallet
+
+logger = logging.getLogger(__name__)
+
+PAYMENT_BATCH_SIZE = 100
+MAX_RETRY_DELAY = 300  # seconds
+
+
+def get_max_attempts():
+    return getattr(settings, 'PAYMENT_MAX_ATTEMPTS', 5)
+
+
+def get_retry_base():
+    return getattr(settings, 'PAYMENT_RETRY_BASE_SECONDS', 2.0)
+
+
+def get_lease():
+    return timedelta(seconds=getattr(settings, 'PAYMENT_LEASE_SECONDS', 60))
+
+
+def new_transaction_id():
+    return f"TXN-{uuid.uuid4().hex[:12].upper()}"
+
+
+def retry_delay(attempt, base=None):
+    """Seconds before retry number `attempt` (1-based): doubling from `base`, capped, with jitter."""
+    base = get_retry_base() if base is None else base
+    delay = min(MAX_RETRY_DELAY, base * 2 ** (attempt - 1))
+    return delay * (0.5 + random.random() / 2)
+
+
+def enqueue_payment(investment, payment_method, now=None):
+    """
+    Queue a charge for `investment`'s total, reusing its pending payment.
+    Returns the payment, or None if a charge is already in flight.
+    """
+    now = now or timezone.now()
+    fields = {
+        'transaction_id': new_transaction_id(),
+        'payment_method': payment_method,
+        'amount': investment.total_amount,
+        'attempts': 0,
+        'next_attempt_at': now,
+        'last_error': '',
+    }
+    pending = investment.payments.filter(status=Payment.Status.PENDING).order_by('-created_at').first()
+    try:
+        with transaction.atomic():
+            if pending is not None:
+                return pending if transition(pending, 'queue', **fields) else None
+            return Payment.objects.create(
+                investor=investment.investor, investment=investment, status=Payment.Status.QUEUED, **fields,
+            )
+    except IntegrityError:
+        # payments_one_queued_per_investment: a concurrent request queued one first.
+        return None
+
+
+def claim_payments(batch_size=PAYMENT_BATCH_SIZE, now=None):
+    """Lease up to `batch_size` due payments to this worker; returns them with investment loaded."""
+    now = now or timezone.now()
+    with transaction.atomic():
+        ids = list(
+            Payment.objects.select_for_update(skip_locked=True)
+            .filter(status=Payment.Status.QUEUED, next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return []
+        Payment.objects.filter(id__in=ids).update(attempts=F('attempts') + 1, next_attempt_at=now + get_lease())
+    return list(
+        Payment.objects.filter(id__in=ids, status=Payment.Status.QUEUED)
+        .select_related('investor', 'investment__investor', 'investment__project')
+        .order_by('next_attempt_at', 'id')
+    )
+
+
+def charge(gateway, payment):
+    """Run on a worker thread: the gateway's answer, or the GatewayError it raised."""
+    try:
+        return gateway.charge(payment)
+    except GatewayError as exc:
+        return exc
+    except Exception as exc:  # A broken adapter must not take the worker down.
+        logger.exception('Gateway adapter failed for payment %s', payment.pk)
+        return GatewayError(f'Gateway adapter failed: {exc}')
+
+
+def schedule_retry(payment, error, retry_base=None, now=None):
+    """Back `payment` off after a gateway error, or decline it once out of attempts. Returns 'retried' or 'failed'."""
+    now = now or timezone.now()
+    message = str(error)[:255]
+    if payment.attempts >= get_max_attempts():
+        return 'failed' if handle_charge_result(payment, ChargeResult(False, message=message), now=now) else None
+    Payment.objects.filter(pk=payment.pk, status=Payment.Status.QUEUED).update(
+        next_attempt_at=now + timedelta(seconds=retry_delay(payment.attempts, retry_base)),
+        last_error=message,
+    )
+    return 'retried'
+
+
+def per_payment(payments, value):
+    """A CASE setting each payment's own `value(payment)` in a set-wise UPDATE."""
+    return Case(
+        *[When(pk=payment.pk, then=Value(value(payment))) for payment in payments],
+        output_field=CharField(),
+    )
+
+
+@transaction.atomic
+def apply_charge_results(results, now=None):
+    """
+    Gateway callback for many payments at once: `results` maps QUEUED payments
+    (with investor, investment and project loaded) to ChargeResults. Payments
+    that already left QUEUED (repeated or late answers) and pending results
+    are skipped. Writes are set-wise: one UPDATE per payment outcome, one for
+    the investments and one bulk INSERT each for audit logs, ledger entries
+    and notifications. Returns {payment id: 'succeeded' | 'declined' | 'refunded'}.
+    """
+    now = now or timezone.now()
+    queued = set(
+        Payment.objects.select_for_update(of=('self',))
+        .filter(id__in=[payment.id for payment in results], status=Payment.Status.QUEUED)
+        .values_list('id', flat=True)
+    )
+    answered = {
+        payment: result for payment, result in results.items()
+        if payment.id in queued and result.approved is not None
+    }
+    approved = [payment for payment, result in answered.items() if result.approved]
+    declined = [payment for payment, result in answered.items() if not result.approved]
+    for payments, name in ((approved, 'succeed'), (declined, 'decline')):
+        if not payments:
+            continue
+        transition_queryset(
+            Payment.objects.filter(id__in=[payment.id for payment in payments]),
+            name,
+            gateway_reference=per_payment(payments, lambda payment: answered[payment].reference),
+            last_error=per_payment(payments, lambda payment: answered[payment].message[:255]),
+            next_attempt_at=None,
+            processed_at=now,
+        )
+        target = get_transition(Payment, name).target
+        for payment in payments:
+            payment.status, payment.processed_at, payment.next_attempt_at = target, now, None
+            payment.gateway_reference, payment.last_error = answered[payment].reference, answered[payment].message[:255]
+
+    outcomes = {payment.id: 'declined' for payment in declined}
+    payable = set(
+        Investment.objects.select_for_update(of=('self',))
+        .filter(id__in=[payment.investment_id for payment in approved], status=Investment.Status.APPROVED)
+        .values_list('id', flat=True)
+    ) if approved else set()
+    processed = [payment for payment in approved if payment.investment_id in payable]
+    if processed:
+        transition_queryset(Investment.objects.filter(id__in=payable), 'process', updated_at=now)
+        for payment in processed:
+            payment.investment.status = Investment.Status.PROCESSING
+            outcomes[payment.id] = 'succeeded'
+        bump_investor_caches([payment.investment for payment in processed])
+    for payment in approved:
+        if payment.investment_id not in payable:
+            refund_charge(payment)
+            outcomes[payment.id] = 'refunded'
+
+    record_payments_processed(processed)
+    record_declines(declined)
+    return outcomes
+
+
+def handle_charge_result(payment, result, now=None):
+    """Gateway callback for one payment; returns its outcome, or None if nothing was applied."""
+    return apply_charge_results({payment: result}, now=now).get(payment.id)
+
+
+def refund_charge(payment):
+    """Credit back a charge that succeeded after its investment was revoked, expired or released."""
+    investment = payment.investment
+    logger.warning('Payment %s succeeded for investment %s in status %s; refunding', payment.pk, investment.pk, investment.status)
+    transition(payment, 'refund')
+    credit_wallet(
+        payment.investor,
+        payment.amount,
+        WalletTransaction.Type.REFUND,
+        project=investment.project,
+        investment=investment,
+        reference=f"REFUND-{payment.transaction_id}",
+    )
+
+
+def record_declines(payments):
+    Notification.objects.bulk_create([
+        Notification(
+            user=payment.investor,
+            type='PAYMENT_FAILED',
+            title='Payment failed',
+            message=(
+                f"Your payment for {payment.investment.project.title} did not go through. "
+                "You can try again before the approval expires."
+            ),
+            related_id=str(payment.investment.project_id),
+            related_type='project',
+        )
+        for payment in payments
+    ])
+
+
+def record_payments_processed(payments):
+    """Everything that follows charges moving their investments to PROCESSING."""
+    if not payments:
+        return
+    User = get_user_model()
+    admins = list(
+        (User.objects.filter(role='ADMIN') | User.objects.filter(is_staff=True) | User.objects.filter(is_superuser=True))
+        .distinct()
+    )
+    notifications, audit_logs, ledger_entries = [], [], []
+    for payment in payments:
+        investment = payment.investment
+        project = investment.project
+        actor = investment.investor
+        audit_logs.append(AuditLog(
+            action_type=AuditLog.ActionType.PAYMENT_PROCESSED,
+            actor=actor,
+            target_type=AuditLog.TargetType.PAYMENT,
+            target_id=str(payment.id),
+            metadata={
+                'investment_id': str(investment.id),
+                'project_id': str(project.id),
+                'project_name': project.title,
+                'status': payment.status,
+                'transaction_id': payment.transaction_id,
+                'gateway_reference': payment.gateway_reference,
+                'payment_method': payment.payment_method,
+                'amount': str(payment.amount),
+                'attempts': payment.attempts,
+            },
+        ))
+        ledger_entries.append(ProjectLedgerEntry(
+            project=project,
+            entry_type=ProjectLedgerEntry.EntryType.PAYMENT_PROCESSED,
+            actor=actor,
+            metadata={
+                'payment_id': str(payment.id),
+                'investment_id': str(investment.id),
+                'project_id': str(project.id),
+                'project_name': project.title,
+                'status': payment.status,
+                'transaction_id': payment.transaction_id,
+                'gateway_reference': payment.gateway_reference,
+                'payment_method': payment.payment_method,
+                'amount': str(payment.amount),
+            },
+        ))
+        notifications.append(Notification(
+            user=actor,
+            type='PAYMENT_SUCCESS',
+            title='Payment received',
+            message=f"Your payment for {project.title} has been received and is processing.",
+            related_id=str(project.id),
+            related_type='project',
+        ))
+        notifications.extend(
+            Notification(
+                user=admin,
+                type='INVESTMENT_PROCESSING',
+                title='Investment ready for review',
+                message=f"Payment received for {project.title}. Review to complete the investment.",
+                related_id=str(investment.id),
+                related_type='investment',
+            )
+            for admin in admins
+        )
+        audit_logs.append(AuditLog(
+            action_type=AuditLog.ActionType.INVESTMENT_PROCESSING,
+            actor=actor,
+            target_type=AuditLog.TargetType.INVESTMENT,
+            target_id=str(investment.id),
+            metadata={
+                'project_id': str(project.id),
+                'project_name': project.title,
+                'status': investment.status,
+                'investor_id': str(investment.investor_id),
+                'investor_name': investment.investor.name,
+                'investor_email': investment.investor.email,
+                'amount': str(investment.total_amount),
+            },
+        ))
+        ledger_entries.append(ProjectLedgerEntry(
+            project=project,
+            entry_type=ProjectLedgerEntry.EntryType.INVESTMENT_PROCESSING,
+            actor=actor,
+            metadata={
+                'investment_id': str(investment.id),
+                'investor_id': str(investment.investor_id),
+                'investor_name': investment.investor.name,
+                'investor_email': investment.investor.email,
+                'payment_id': str(payment.id),
+                'transaction_id': payment.transaction_id,
+                'payment_method': payment.payment_method,
+                'amount': str(investment.total_amount),
+                'shares': investment.shares,
+            },
+        ))
+    Notification.objects.bulk_create(notifications)
+    AuditLog.objects.bulk_create(audit_logs)
+    ProjectLedgerEntry.objects.bulk_create(ledger_entries)
+
+
+def process_payment_queue(gateway, workers=4, batch_size=PAYMENT_BATCH_SIZE, retry_base=None):
+    """
+    Charge every payment that is due, `workers` gateway calls at a time, until
+    none are left (payments backed off into the future wait for the next
+    run). Returns a count per outcome.
+    """
+    outcomes = {'succeeded': 0, 'declined': 0, 'refunded': 0, 'pending': 0, 'retried': 0, 'failed': 0}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        while True:
+            batch = claim_payments(batch_size)
+            if not batch:
+                return outcomes
+            answered = {}
+            futures = {pool.submit(charge, gateway, payment): payment for payment in batch}
+            for future in as_completed(futures):
+                payment, result = futures[future], future.result()
+                if isinstance(result, GatewayError):
+                    outcome = schedule_retry(payment, result, retry_base)
+                    if outcome:
+                        outcomes[outcome] += 1
+                elif result.approved is None:
+                    # The outcome arrives as a webhook; the lease stands in case it never does.
+                    outcomes['pending'] += 1
+                else:
+                    answered[payment] = result
+            for outcome in apply_charge_results(answered).values():
+                outcomes[outcome] += 1
@@ -1,8 +1,8 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
-from django.utils import timezone
+from django.db import transaction
+from projects.shares import InsufficientShares, reserve_shares
 from .models import Investment, Payment
-from .utils import expire_investment_request
 
 User = get_user_model()
 
@@ -68,28 +68,23 @@ class InvestmentCreateSerializer(serializers.ModelSerializer):
         if project.status != 'APPROVED':
             raise serializers.ValidationError({'project': 'Cannot invest in unapproved project'})
         
-        if shares > project.remaining_shares:
-            raise serializers.ValidationError({'shares': f'Only {project.remaining_shares} shares available'})
-        
         if shares <= 0:
             raise serializers.ValidationError({'shares': 'Must purchase at least 1 share'})
 
-        expired_approvals = Investment.objects.filter(
-            investor=user,
-            project=project,
-            status=Investment.Status.APPROVED,
-            approval_expires_at__lt=timezone.now(),
-        )
-        for investment in expired_approvals:
-            expire_investment_request(investment)
-
         return attrs
     
+    @transaction.atomic
     def create(self, validated_data):
         project = validated_data['project']
         shares = validated_data['shares']
         request_note = validated_data.get('request_note')
-        
+
+        # Availability is checked by the reserving UPDATE itself, not by an earlier read.
+        try:
+            reserve_shares(project, shares)
+        except InsufficientShares as exc:
+            raise serializers.ValidationError({'shares': str(exc)})
+
         investment = Investment.objects.create(
             investor=self.context['request'].user,
             project=project,
@@ -0,0 +1,118 @@
+"""
+Status machine for Investment and Payment.
+
+Every status change is looked up by name in a transition table
+(allowed source statuses -> target status) and written as one conditional
+UPDATE:
+
+    UPDATE investments SET status = <target>, ... WHERE id = %s AND status = <status the caller read>
+
+The row count says whether the caller won. A racing action (revoke against
+approve, pay against expiry, two admins completing) that changed the row
+first makes the UPDATE match nothing, so the loser returns without any side
+effects: no row locks and no re-read. Because the WHERE clause pins the
+status the caller saw, side effects that depend on the source status (sold
+shares vs. a reservation) are always based on the status actually left.
+
+Batch paths use `transition_queryset` (WHERE status IN <sources>) and get a
+count back. Queryset updates skip post_save, so `transition` bumps the
+investor's access and membership caches itself; batch callers do it once
+per investor.
+"""
+from typing import NamedTuple
+
+from django.utils import timezone
+
+from projects.cache import bump_access_version, bump_membership_version
+
+from .models import Investment, Payment
+
+
+class Transition(NamedTuple):
+    sources: frozenset
+    target: str
+
+
+def table(spec):
+    return {name: Transition(frozenset(sources), target) for name, (sources, target) in spec.items()}
+
+
+InvestmentStatus = Investment.Status
+# Investments still holding money or shares; admin releases apply to them.
+LIVE_INVESTMENT_STATUSES = (
+    InvestmentStatus.REQUESTED, InvestmentStatus.APPROVED, InvestmentStatus.PROCESSING, InvestmentStatus.COMPLETED,
+)
+
+INVESTMENT_TRANSITIONS = table({
+    'approve': ((InvestmentStatus.REQUESTED, InvestmentStatus.APPROVED), InvestmentStatus.APPROVED),
+    'reject': ((InvestmentStatus.REQUESTED,), InvestmentStatus.REJECTED),
+    'cancel': ((InvestmentStatus.REQUESTED, InvestmentStatus.APPROVED), InvestmentStatus.CANCELLED),
+    'expire': ((InvestmentStatus.APPROVED,), InvestmentStatus.EXPIRED),
+    'process': ((InvestmentStatus.APPROVED,), InvestmentStatus.PROCESSING),
+    'complete': ((InvestmentStatus.PROCESSING,), InvestmentStatus.COMPLETED),
+    'refund': (LIVE_INVESTMENT_STATUSES, InvestmentStatus.REFUNDED),
+    'withdraw': (LIVE_INVESTMENT_STATUSES, InvestmentStatus.WITHDRAWN),
+    'reverse': (LIVE_INVESTMENT_STATUSES, InvestmentStatus.REVERSED),
+})
+
+PaymentStatus = Payment.Status
+PAYMENT_TRANSITIONS = table({
+    'queue': ((PaymentStatus.PENDING,), PaymentStatus.QUEUED),
+    'succeed': ((PaymentStatus.PENDING, PaymentStatus.QUEUED), PaymentStatus.SUCCESS),
+    'fail': ((PaymentStatus.PENDING,), PaymentStatus.FAILED),
+    # Gateway declines and exhausted retries; expiry and revokes only `fail` unqueued payments.
+    'decline': ((PaymentStatus.QUEUED,), PaymentStatus.FAILED),
+    'refund': ((PaymentStatus.PENDING, PaymentStatus.SUCCESS), PaymentStatus.REFUNDED),
+    'withdraw': ((PaymentStatus.PENDING, PaymentStatus.SUCCESS), PaymentStatus.WITHDRAWN),
+    'reverse': ((PaymentStatus.PENDING, PaymentStatus.SUCCESS), PaymentStatus.REVERSED),
+})
+
+TRANSITIONS = {Investment: INVESTMENT_TRANSITIONS, Payment: PAYMENT_TRANSITIONS}
+
+
+def get_transition(model, name):
+    try:
+        return TRANSITIONS[model][name]
+    except KeyError:
+        raise ValueError(f'Unknown {model.__name__} transition: {name}')
+
+
+def can_transition(instance, name):
+    """Whether `instance`'s current (in-memory) status allows the transition."""
+    return instance.status in get_transition(type(instance), name).sources
+
+
+def with_updated_at(model, fields):
+    # Queryset updates skip auto_now.
+    if any(field.name == 'updated_at' for field in model._meta.concrete_fields):
+        fields.setdefault('updated_at', timezone.now())
+    return fields
+
+
+def transition(instance, name, **fields):
+    """
+    Move `instance` along transition `name` if its row still has the status
+    the caller read, setting `fields` in the same UPDATE. On success the
+    instance is updated in memory and True is returned; otherwise nothing is
+    written and False is returned.
+    """
+    model = type(instance)
+    spec = get_transition(model, name)
+    if instance.status not in spec.sources:
+        return False
+    fields = with_updated_at(model, {'status': spec.target, **fields})
+    if not model.objects.filter(pk=instance.pk, status=instance.status).update(**fields):
+        return False
+    for field, value in fields.items():
+        setattr(instance, field, value)
+    if model is Investment:
+        bump_access_version(instance.investor_id)
+        bump_membership_version(instance.investor_id)
+    return True
+
+
+def transition_queryset(queryset, name, **fields):
+    """Move every row of `queryset` that allows transition `name`; returns how many moved."""
+    spec = get_transition(queryset.model, name)
+    fields = with_updated_at(queryset.model, {'status': spec.target, **fields})
+    return queryset.filter(status__in=spec.sources).update(**fields)
@@ -3,6 +3,8 @@ from . import views
 
 urlpatterns = [
     path('', views.InvestmentListCreateView.as_view(), name='investment-list'),
+    path('bulk-review/', views.InvestmentBulkReviewView.as_view(), name='investment-bulk-review'),
+    path('bulk-complete/', views.InvestmentBulkCompleteView.as_view(), name='investment-bulk-complete'),
     path('<int:pk>/', views.InvestmentDetailView.as_view(), name='investment-detail'),
     path('<int:investment_id>/pay/', views.ProcessPaymentView.as_view(), name='process-payment'),
     path('<int:investment_id>/revoke/', views.InvestmentRevokeView.as_view(), name='investment-revoke'),
@@ -10,4 +12,5 @@ urlpatterns = [
     path('<int:investment_id>/complete/', views.InvestmentCompleteView.as_view(), name='investment-complete'),
     path('<int:investment_id>/action/', views.InvestmentAdminActionView.as_view(), name='investment-admin-action'),
     path('payments/', views.PaymentListView.as_view(), name='payment-list'),
+    path('payments/webhook/', views.PaymentWebhookView.as_view(), name='payment-webhook'),
 ]
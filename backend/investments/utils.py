@@ -1,10 +1,16 @@
+from collections import Counter
 from decimal import Decimal
 
 from django.db import transaction
+from django.db.models import Exists, OuterRef
 from django.utils import timezone
 
 from audit.models import AuditLog, ProjectLedgerEntry
-from .models import Payment
+from projects import funding, ranking
+from projects.cache import bump_access_version, bump_membership_version
+from projects.shares import release_reservation, release_reservations, release_shares
+from .models import Investment, Payment
+from .transitions import can_transition, transition, transition_queryset
 from notifications.models import Notification
 from users.models import Wallet, WalletTransaction
 
@@ -29,30 +35,36 @@ def credit_wallet(user, amount, tx_type, project=None, investment=None, referenc
     )
 
 
-def release_project_shares(project, shares):
-    project.shares_sold = max(0, project.shares_sold - shares)
-    project.save(update_fields=['shares_sold'])
-
-
 @transaction.atomic
 def apply_investment_action(investment, action, actor=None, admin_note=None):
+    """
+    Refund, withdraw or reverse `investment`. Returns False (nothing done) if
+    its status no longer allows it, or while a charge for it is queued: the
+    worker would refund that charge again once it found the investment closed.
+    """
     project = investment.project
     now = timezone.now()
-    status_map = {
-        'refund': investment.Status.REFUNDED,
-        'withdraw': investment.Status.WITHDRAWN,
-        'reverse': investment.Status.REVERSED,
-    }
-    if action not in status_map:
+    if action not in ('refund', 'withdraw', 'reverse'):
         raise ValueError('Invalid investment action')
 
-    if investment.status == investment.Status.COMPLETED:
-        release_project_shares(project, investment.shares)
+    # ProcessPaymentView takes the same lock, so no charge is queued between the check and the transition.
+    list(Investment.objects.select_for_update().filter(pk=investment.pk).values_list('pk', flat=True))
+    if investment.payments.filter(status=Payment.Status.QUEUED).exists():
+        return False
 
-    investment.status = status_map[action]
-    investment.admin_note = admin_note or investment.admin_note
-    investment.withdrawn_at = now
-    investment.save(update_fields=['status', 'admin_note', 'withdrawn_at'])
+    previous_status = investment.status
+    if not transition(investment, action, admin_note=admin_note or investment.admin_note, withdrawn_at=now):
+        return False
+
+    was_completed = previous_status == investment.Status.COMPLETED
+    if was_completed:
+        release_shares(project, investment.shares)
+        ranking.investment_released(investment)
+    elif previous_status in Investment.RESERVING_STATUSES:
+        release_reservation(project, investment.shares)
+
+    if was_completed:
+        funding.record_funding_snapshot(project, now)
 
     credit_wallet(
         investment.investor,
@@ -131,63 +143,131 @@ def apply_investment_action(investment, action, actor=None, admin_note=None):
         related_id=str(project.id),
         related_type='project',
     )
+    return True
+
+
+EXPIRY_BATCH_SIZE = 500
+
+
+@transaction.atomic
+def expire_investments(investments, actor=None, now=None):
+    """
+    Mark approved investments as EXPIRED with set-based writes: one UPDATE for
+    the investments, one for their pending payments, one for the projects'
+    reservations and one bulk INSERT each for the notifications, audit logs
+    and ledger entries. `investments` need their investor and project loaded
+    and must be locked by the caller. Returns how many were expired.
+    """
+    investments = list(investments)
+    if not investments:
+        return 0
+    now = now or timezone.now()
+    transition_queryset(
+        Investment.objects.filter(id__in=[investment.id for investment in investments]), 'expire', updated_at=now,
+    )
+    record_expiries(investments, actor, now)
+    # The queryset UPDATE skips Investment post_save, which would bump these per row.
+    for investor_id in {investment.investor_id for investment in investments}:
+        bump_access_version(investor_id)
+        bump_membership_version(investor_id)
+    return len(investments)
+
 
+def record_expiries(investments, actor, now):
+    """Everything that follows investments moving to EXPIRED."""
+    ids = [investment.id for investment in investments]
+    transition_queryset(Payment.objects.filter(investment_id__in=ids), 'fail', processed_at=now)
+    released = Counter()
+    for investment in investments:
+        released[investment.project_id] += investment.shares
+    release_reservations(released)
 
+    notifications, audit_logs, ledger_entries = [], [], []
+    for investment in investments:
+        investment.status = Investment.Status.EXPIRED
+        investment.updated_at = now
+        project = investment.project
+        expires_at = str(investment.approval_expires_at) if investment.approval_expires_at else None
+        notifications.append(Notification(
+            user=investment.investor,
+            type='INVESTMENT_EXPIRED',
+            title='Investment request expired',
+            message=f"Your investment request for {project.title} has expired.",
+            related_id=str(project.id),
+            related_type='project',
+        ))
+        audit_logs.append(AuditLog(
+            action_type=AuditLog.ActionType.INVESTMENT_EXPIRED,
+            actor=actor or investment.investor,
+            target_type=AuditLog.TargetType.INVESTMENT,
+            target_id=str(investment.id),
+            metadata={
+                'status': investment.status,
+                'project_id': str(project.id),
+                'project_name': project.title,
+                'investor_id': str(investment.investor_id),
+                'investor_name': investment.investor.name,
+                'investor_email': investment.investor.email,
+                'shares': investment.shares,
+                'amount': str(investment.total_amount),
+                'expires_at': expires_at,
+            },
+        ))
+        ledger_entries.append(ProjectLedgerEntry(
+            project=project,
+            entry_type=ProjectLedgerEntry.EntryType.INVESTMENT_EXPIRED,
+            actor=actor or investment.investor,
+            metadata={
+                'investment_id': str(investment.id),
+                'investor_id': str(investment.investor_id),
+                'investor_name': investment.investor.name,
+                'investor_email': investment.investor.email,
+                'shares': investment.shares,
+                'amount': str(investment.total_amount),
+                'expires_at': expires_at,
+            },
+        ))
+    Notification.objects.bulk_create(notifications)
+    AuditLog.objects.bulk_create(audit_logs)
+    ProjectLedgerEntry.objects.bulk_create(ledger_entries)
+
+
+@transaction.atomic
 def expire_investment_request(investment, actor=None):
-    if investment.status != investment.Status.APPROVED:
+    """Expire one approval whose window closed; False if it is not due, being paid or another action won."""
+    if not can_transition(investment, 'expire'):
         return False
     if not investment.approval_expires_at or investment.approval_expires_at >= timezone.now():
         return False
+    if investment.payments.filter(status=Payment.Status.QUEUED).exists():
+        return False
+    now = timezone.now()
+    if not transition(investment, 'expire', updated_at=now):
+        return False
+    record_expiries([investment], actor, now)
+    return True
 
-    investment.status = investment.Status.EXPIRED
-    investment.save(update_fields=['status'])
-
-    pending_payment = investment.payments.filter(status=Payment.Status.PENDING).order_by('-created_at').first()
-    if pending_payment:
-        pending_payment.status = Payment.Status.FAILED
-        pending_payment.processed_at = timezone.now()
-        pending_payment.save(update_fields=['status', 'processed_at'])
-
-    actor = actor or investment.investor
-    project = investment.project
 
-    Notification.objects.create(
-        user=investment.investor,
-        type='INVESTMENT_EXPIRED',
-        title='Investment request expired',
-        message=f"Your investment request for {project.title} has expired.",
-        related_id=str(project.id),
-        related_type='project',
+def expire_due_investments(now=None, batch_size=EXPIRY_BATCH_SIZE):
+    """
+    Expire every APPROVED investment whose approval window closed before `now`,
+    `batch_size` at a time (one transaction per batch; rows locked by another
+    worker are skipped). Investments with a charge in flight wait for its
+    outcome. Returns how many were expired.
+    """
+    now = now or timezone.now()
+    queued = Payment.objects.filter(investment=OuterRef('pk'), status=Payment.Status.QUEUED)
+    due = (
+        Investment.objects.select_for_update(skip_locked=True, of=('self',))
+        .filter(status=Investment.Status.APPROVED, approval_expires_at__lt=now)
+        .exclude(Exists(queued))
+        .select_related('investor', 'project')
+        .order_by('approval_expires_at', 'id')
     )
-    AuditLog.objects.create(
-        action_type=AuditLog.ActionType.INVESTMENT_EXPIRED,
-        actor=actor,
-        target_type=AuditLog.TargetType.INVESTMENT,
-        target_id=str(investment.id),
-        metadata={
-            'status': investment.status,
-            'project_id': str(project.id),
-            'project_name': project.title,
-            'investor_id': str(investment.investor_id),
-            'investor_name': investment.investor.name,
-            'investor_email': investment.investor.email,
-            'shares': investment.shares,
-            'amount': str(investment.total_amount),
-            'expires_at': investment.approval_expires_at,
-        },
-    )
-    ProjectLedgerEntry.objects.create(
-        project=project,
-        entry_type=ProjectLedgerEntry.EntryType.INVESTMENT_EXPIRED,
-        actor=actor,
-        metadata={
-            'investment_id': str(investment.id),
-            'investor_id': str(investment.investor_id),
-            'investor_name': investment.investor.name,
-            'investor_email': investment.investor.email,
-            'shares': investment.shares,
-            'amount': str(investment.total_amount),
-            'expires_at': investment.approval_expires_at,
-        },
-    )
-    return True
+    expired = 0
+    while True:
+        with transaction.atomic():
+            batch = list(due[:batch_size])
+            expired += expire_investments(batch, now=now)
+        if len(batch) < batch_size:
+            return expired
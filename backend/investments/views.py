@@ -4,16 +4,27 @@ import logging
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from django.db import transaction
 from django.utils import timezone
 import uuid
+from functools import partial
 
 from .models import Investment, Payment
 from notifications.models import Notification
 from .serializers import InvestmentSerializer, InvestmentCreateSerializer, PaymentSerializer
+from projects import funding, ranking
 from projects.models import Project
+from projects.shares import InsufficientShares, release_reservation, sell_shares
 from audit.models import AuditLog, ProjectLedgerEntry
+from config.conditional import conditional_response, list_fingerprint, make_etag, serializer_version
+from config.idempotency import idempotent
+from config.pagination import KeysetPagination
 from config.permissions import IsAdminRole
 from django.contrib.auth import get_user_model
+from .bulk import MAX_BULK_INVESTMENTS, bulk_complete, bulk_review
+from .payments import enqueue_payment
+from .webhooks import InvalidWebhook, ingest_webhook
+from .transitions import can_transition, transition
 from .utils import apply_investment_action, expire_investment_request
 
 logger = logging.getLogger(__name__)
@@ -21,6 +32,7 @@ logger = logging.getLogger(__name__)
 class InvestmentListCreateView(generics.ListCreateAPIView):
     """List or create investments."""
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
     
     def get_queryset(self):
         user = self.request.user
@@ -30,12 +42,6 @@ class InvestmentListCreateView(generics.ListCreateAPIView):
                 or getattr(target, 'is_staff', False)
                 or getattr(target, 'is_superuser', False)
             )
-        expired = Investment.objects.filter(
-            status=Investment.Status.APPROVED,
-            approval_expires_at__lt=timezone.now(),
-        )
-        for investment in expired:
-            expire_investment_request(investment)
         status_filter = self.request.query_params.get('status')
         if is_admin(user):
             queryset = Investment.objects.all()
@@ -54,13 +60,28 @@ class InvestmentListCreateView(generics.ListCreateAPIView):
             queryset = queryset.filter(investor_id=investor_id)
         return queryset
     
+    def list(self, request, *args, **kwargs):
+        # Pure read: due approvals are expired by `manage.py expire_investments`.
+        latest, count = list_fingerprint(self.filter_queryset(self.get_queryset()))
+        etag = make_etag(
+            'investments', serializer_version(InvestmentSerializer), request.user.pk,
+            request.get_full_path(), latest, count,
+        )
+        build = partial(super().list, request, *args, **kwargs)
+        return conditional_response(request, build, etag=etag, last_modified=latest)
+
     def get_serializer_class(self):
         if self.request.method == 'POST':
             return InvestmentCreateSerializer
         return InvestmentSerializer
 
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         investment = serializer.save()
+        ranking.investment_requested(investment)
         User = get_user_model()
         admins = User.objects.filter(role='ADMIN') | User.objects.filter(is_staff=True) | User.objects.filter(is_superuser=True)
         project_title = investment.project.title
@@ -127,141 +148,63 @@ class InvestmentDetailView(generics.RetrieveAPIView):
         else:
             return Investment.objects.filter(investor=user)
 
+    def retrieve(self, request, *args, **kwargs):
+        build = partial(super().retrieve, request, *args, **kwargs)
+        updated_at = self.get_queryset().filter(pk=kwargs.get('pk')).values_list('updated_at', flat=True).first()
+        if updated_at is None:
+            return build()
+        etag = make_etag('investment', kwargs.get('pk'), updated_at, serializer_version(InvestmentSerializer))
+        return conditional_response(request, build, etag=etag, last_modified=updated_at)
+
 
 class ProcessPaymentView(APIView):
-    """Process payment for an investment (mock implementation)."""
+    """Queue payment for an approved investment; the payment worker charges it (investments/payments.py)."""
     permission_classes = [permissions.IsAuthenticated]
     
+    @idempotent
+    @transaction.atomic
     def post(self, request, investment_id):
         try:
-            investment = Investment.objects.get(pk=investment_id, investor=request.user)
+            investment = Investment.objects.select_for_update().get(pk=investment_id, investor=request.user)
         except Investment.DoesNotExist:
             return Response({'error': 'Investment not found'}, status=status.HTTP_404_NOT_FOUND)
         
-        if investment.status != Investment.Status.APPROVED:
+        if not can_transition(investment, 'process'):
             return Response({'error': 'Investment is not approved for payment'}, status=status.HTTP_400_BAD_REQUEST)
 
         if getattr(request.user, 'is_banned', False):
             return Response({'error': 'Banned users cannot invest'}, status=status.HTTP_403_FORBIDDEN)
 
+        if investment.payments.filter(status=Payment.Status.QUEUED).exists():
+            return Response({'error': 'Payment is already being processed'}, status=status.HTTP_400_BAD_REQUEST)
+
         if investment.approval_expires_at and investment.approval_expires_at < timezone.now():
             expire_investment_request(investment, actor=request.user)
             return Response({'error': 'Investment request expired'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Mock payment processing
-        payment_method = request.data.get('payment_method', 'card')
-        
-        pending_payment = investment.payments.filter(status=Payment.Status.PENDING).order_by('-created_at').first()
-        if pending_payment:
-            pending_payment.transaction_id = f"TXN-{uuid.uuid4().hex[:12].upper()}"
-            pending_payment.status = Payment.Status.SUCCESS
-            pending_payment.payment_method = payment_method
-            pending_payment.amount = investment.total_amount
-            pending_payment.processed_at = timezone.now()
-            pending_payment.save(update_fields=['transaction_id', 'status', 'payment_method', 'amount', 'processed_at'])
-            payment = pending_payment
-        else:
-            payment = Payment.objects.create(
-                transaction_id=f"TXN-{uuid.uuid4().hex[:12].upper()}",
-                investor=request.user,
-                investment=investment,
-                amount=investment.total_amount,
-                status=Payment.Status.SUCCESS,
-                payment_method=payment_method,
-                processed_at=timezone.now()
-            )
-
-        AuditLog.objects.create(
-            action_type=AuditLog.ActionType.PAYMENT_PROCESSED,
-            actor=request.user,
-            target_type=AuditLog.TargetType.PAYMENT,
-            target_id=str(payment.id),
-            metadata={
-                'investment_id': str(investment.id),
-                'project_id': str(investment.project.id),
-                'project_name': investment.project.title,
-                'status': payment.status,
-                'transaction_id': payment.transaction_id,
-                'payment_method': payment.payment_method,
-                'amount': str(payment.amount),
-            },
-        )
-        ProjectLedgerEntry.objects.create(
-            project=investment.project,
-            entry_type=ProjectLedgerEntry.EntryType.PAYMENT_PROCESSED,
-            actor=request.user,
-            metadata={
-                'payment_id': str(payment.id),
-                'investment_id': str(investment.id),
-                'project_id': str(investment.project.id),
-                'project_name': investment.project.title,
-                'status': payment.status,
-                'transaction_id': payment.transaction_id,
-                'payment_method': payment.payment_method,
-                'amount': str(payment.amount),
-            },
-        )
-        
-        investment.status = Investment.Status.PROCESSING
-        investment.save(update_fields=['status'])
-
-        project = investment.project
-        Notification.objects.create(
-            user=request.user,
-            type='PAYMENT_SUCCESS',
-            title='Payment received',
-            message=f"Your payment for {project.title} has been received and is processing.",
-            related_id=str(project.id),
-            related_type='project',
-        )
 
-        User = get_user_model()
-        admins = User.objects.filter(role='ADMIN') | User.objects.filter(is_staff=True) | User.objects.filter(is_superuser=True)
-        for admin in admins.distinct():
-            Notification.objects.create(
-                user=admin,
-                type='INVESTMENT_PROCESSING',
-                title='Investment ready for review',
-                message=f"Payment received for {project.title}. Review to complete the investment.",
-                related_id=str(investment.id),
-                related_type='investment',
-            )
+        payment = enqueue_payment(investment, request.data.get('payment_method', 'card'))
+        if payment is None:
+            return Response({'error': 'Payment is already being processed'}, status=status.HTTP_400_BAD_REQUEST)
 
-        AuditLog.objects.create(
-            action_type=AuditLog.ActionType.INVESTMENT_PROCESSING,
-            actor=request.user,
-            target_type=AuditLog.TargetType.INVESTMENT,
-            target_id=str(investment.id),
-            metadata={
-                'project_id': str(project.id),
-                'project_name': project.title,
-                'status': investment.status,
-                'investor_id': str(investment.investor_id),
-                'investor_name': investment.investor.name,
-                'investor_email': investment.investor.email,
-                'amount': str(investment.total_amount),
-            },
-        )
-        ProjectLedgerEntry.objects.create(
-            project=project,
-            entry_type=ProjectLedgerEntry.EntryType.INVESTMENT_PROCESSING,
-            actor=request.user,
-            metadata={
-                'investment_id': str(investment.id),
-                'investor_id': str(investment.investor_id),
-                'investor_name': investment.investor.name,
-                'investor_email': investment.investor.email,
-                'payment_id': str(payment.id),
-                'transaction_id': payment.transaction_id,
-                'payment_method': payment.payment_method,
-                'amount': str(investment.total_amount),
-            },
-        )
-        
         return Response({
             'investment': InvestmentSerializer(investment).data,
             'payment': PaymentSerializer(payment).data
-        })
+        }, status=status.HTTP_202_ACCEPTED)
+
+
+class PaymentWebhookView(APIView):
+    """Receive a signed gateway webhook into the inbox; `manage.py apply_payment_webhooks` applies it."""
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+    # Gateways deliver in bursts from a few addresses; the signature is the gate.
+    throttle_classes = []
+
+    def post(self, request):
+        try:
+            ingest_webhook(request.body, request.META.get('HTTP_GATEWAY_SIGNATURE'))
+        except InvalidWebhook as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'received': True}, status=status.HTTP_202_ACCEPTED)
 
 
 class PaymentListView(generics.ListAPIView):
@@ -285,28 +228,31 @@ class InvestmentRevokeView(APIView):
     """Investor revokes an investment request."""
     permission_classes = [permissions.IsAuthenticated]
 
+    @idempotent
+    @transaction.atomic
     def post(self, request, investment_id):
         try:
             investment = Investment.objects.get(pk=investment_id, investor=request.user)
         except Investment.DoesNotExist:
             return Response({'error': 'Investment not found'}, status=status.HTTP_404_NOT_FOUND)
 
-        if investment.status not in [Investment.Status.REQUESTED, Investment.Status.APPROVED]:
+        if not can_transition(investment, 'cancel'):
             return Response({'error': 'Investment cannot be revoked'}, status=status.HTTP_400_BAD_REQUEST)
 
+        if investment.payments.filter(status=Payment.Status.QUEUED).exists():
+            return Response({'error': 'Payment is being processed'}, status=status.HTTP_400_BAD_REQUEST)
+
         if investment.status == Investment.Status.APPROVED:
             if expire_investment_request(investment, actor=request.user):
                 return Response(InvestmentSerializer(investment).data)
 
-        investment.status = Investment.Status.CANCELLED
-        investment.approval_expires_at = None
-        investment.save(update_fields=['status', 'approval_expires_at'])
+        if not transition(investment, 'cancel', approval_expires_at=None):
+            return Response({'error': 'Investment cannot be revoked'}, status=status.HTTP_400_BAD_REQUEST)
+        release_reservation(investment.project, investment.shares)
 
         pending_payment = investment.payments.filter(status=Payment.Status.PENDING).order_by('-created_at').first()
         if pending_payment:
-            pending_payment.status = Payment.Status.FAILED
-            pending_payment.processed_at = timezone.now()
-            pending_payment.save(update_fields=['status', 'processed_at'])
+            transition(pending_payment, 'fail', processed_at=timezone.now())
 
         project = investment.project
         AuditLog.objects.create(
@@ -348,6 +294,8 @@ class InvestmentReviewView(APIView):
     """Admin approve or reject an investment request."""
     permission_classes = [IsAdminRole]
 
+    @idempotent
+    @transaction.atomic
     def post(self, request, investment_id):
         try:
             investment = Investment.objects.get(pk=investment_id)
@@ -361,102 +309,110 @@ class InvestmentReviewView(APIView):
         if action not in ['approve', 'reject']:
             return Response({'error': 'Invalid action'}, status=status.HTTP_400_BAD_REQUEST)
 
-        is_requested = investment.status == Investment.Status.REQUESTED
-        is_approved = investment.status == Investment.Status.APPROVED
-        if not is_requested and not (is_approved and action == 'approve'):
+        if not can_transition(investment, action):
             return Response({'error': 'Investment is not awaiting review'}, status=status.HTTP_400_BAD_REQUEST)
 
-        investment.reviewed_at = timezone.now()
-        investment.reviewed_by = request.user
-        investment.admin_note = admin_note or investment.admin_note
-
         if action == 'approve':
             try:
                 expires_in_days = int(expires_in_days)
             except (TypeError, ValueError):
                 expires_in_days = 7
-            investment.status = Investment.Status.APPROVED
-            investment.approval_expires_at = timezone.now() + timedelta(days=max(1, expires_in_days))
+            approval_expires_at = timezone.now() + timedelta(days=max(1, expires_in_days))
             notification_type = 'INVESTMENT_APPROVED'
             ledger_type = ProjectLedgerEntry.EntryType.INVESTMENT_APPROVED
             audit_action = AuditLog.ActionType.INVESTMENT_APPROVED
         else:
-            investment.status = Investment.Status.REJECTED
-            investment.approval_expires_at = None
+            approval_expires_at = None
             notification_type = 'INVESTMENT_REJECTED'
             ledger_type = ProjectLedgerEntry.EntryType.INVESTMENT_REJECTED
             audit_action = AuditLog.ActionType.INVESTMENT_REJECTED
 
-        investment.save()
+        if not transition(
+            investment,
+            action,
+            reviewed_at=timezone.now(),
+            reviewed_by=request.user,
+            admin_note=admin_note or investment.admin_note,
+            approval_expires_at=approval_expires_at,
+        ):
+            return Response({'error': 'Investment is not awaiting review'}, status=status.HTTP_400_BAD_REQUEST)
+        if action == 'reject':
+            release_reservation(investment.project, investment.shares)
 
+        # Best-effort records below each get a savepoint, so a failed write
+        # cannot abort the transaction holding the review itself.
         if action == 'approve':
             try:
-                existing_payment = investment.payments.filter(
-                    status__in=[Payment.Status.PENDING, Payment.Status.SUCCESS]
-                ).first()
-                if not existing_payment:
-                    Payment.objects.create(
-                        transaction_id=f"PENDING-{uuid.uuid4().hex[:12].upper()}",
-                        investor=investment.investor,
-                        investment=investment,
-                        amount=investment.total_amount,
-                        status=Payment.Status.PENDING,
-                    )
+                with transaction.atomic():
+                    existing_payment = investment.payments.filter(
+                        status__in=[Payment.Status.PENDING, Payment.Status.QUEUED, Payment.Status.SUCCESS]
+                    ).first()
+                    if not existing_payment:
+                        Payment.objects.create(
+                            transaction_id=f"PENDING-{uuid.uuid4().hex[:12].upper()}",
+                            investor=investment.investor,
+                            investment=investment,
+                            amount=investment.total_amount,
+                            status=Payment.Status.PENDING,
+                        )
             except Exception:
                 logger.exception('Failed to create pending payment for investment %s', investment.id)
 
         try:
-            Notification.objects.create(
-                user=investment.investor,
-                type=notification_type,
-                title=f"Investment {investment.status.lower()}",
-                message=f"Your investment request for {investment.project.title} was {investment.status.lower()}.",
-                related_id=str(investment.project.id),
-                related_type='project',
-            )
+            with transaction.atomic():
+                Notification.objects.create(
+                    user=investment.investor,
+                    type=notification_type,
+                    title=f"Investment {investment.status.lower()}",
+                    message=f"Your investment request for {investment.project.title} was {investment.status.lower()}.",
+                    related_id=str(investment.project.id),
+                    related_type='project',
+                )
         except Exception:
             logger.exception('Failed to create notification for investment %s', investment.id)
 
         try:
-            AuditLog.objects.create(
-                action_type=audit_action,
-                actor=request.user,
-                target_type=AuditLog.TargetType.INVESTMENT,
-                target_id=str(investment.id),
-                metadata={
-                    'project_id': str(investment.project.id),
-                    'project_name': investment.project.title,
-                    'status': investment.status,
-                    'investor_id': str(investment.investor_id),
-                    'investor_name': investment.investor.name,
-                    'investor_email': investment.investor.email,
-                    'shares': investment.shares,
-                    'price_per_share': str(investment.price_per_share),
-                    'amount': str(investment.total_amount),
-                    'admin_note': admin_note,
-                    'expires_at': str(investment.approval_expires_at) if investment.approval_expires_at else None,
-                },
-            )
+            with transaction.atomic():
+                AuditLog.objects.create(
+                    action_type=audit_action,
+                    actor=request.user,
+                    target_type=AuditLog.TargetType.INVESTMENT,
+                    target_id=str(investment.id),
+                    metadata={
+                        'project_id': str(investment.project.id),
+                        'project_name': investment.project.title,
+                        'status': investment.status,
+                        'investor_id': str(investment.investor_id),
+                        'investor_name': investment.investor.name,
+                        'investor_email': investment.investor.email,
+                        'shares': investment.shares,
+                        'price_per_share': str(investment.price_per_share),
+                        'amount': str(investment.total_amount),
+                        'admin_note': admin_note,
+                        'expires_at': str(investment.approval_expires_at) if investment.approval_expires_at else None,
+                    },
+                )
         except Exception:
             logger.exception('Failed to create audit log for investment %s', investment.id)
 
         try:
-            ProjectLedgerEntry.objects.create(
-                project=investment.project,
-                entry_type=ledger_type,
-                actor=request.user,
-                metadata={
-                    'investment_id': str(investment.id),
-                    'investor_id': str(investment.investor_id),
-                    'investor_name': investment.investor.name,
-                    'investor_email': investment.investor.email,
-                    'shares': investment.shares,
-                    'price_per_share': str(investment.price_per_share),
-                    'amount': str(investment.total_amount),
-                    'admin_note': admin_note,
-                    'expires_at': str(investment.approval_expires_at) if investment.approval_expires_at else None,
-                },
-            )
+            with transaction.atomic():
+                ProjectLedgerEntry.objects.create(
+                    project=investment.project,
+                    entry_type=ledger_type,
+                    actor=request.user,
+                    metadata={
+                        'investment_id': str(investment.id),
+                        'investor_id': str(investment.investor_id),
+                        'investor_name': investment.investor.name,
+                        'investor_email': investment.investor.email,
+                        'shares': investment.shares,
+                        'price_per_share': str(investment.price_per_share),
+                        'amount': str(investment.total_amount),
+                        'admin_note': admin_note,
+                        'expires_at': str(investment.approval_expires_at) if investment.approval_expires_at else None,
+                    },
+                )
         except Exception:
             logger.exception('Failed to create project ledger entry for investment %s', investment.id)
 
@@ -467,28 +423,34 @@ class InvestmentCompleteView(APIView):
     """Admin completes processing investments."""
     permission_classes = [IsAdminRole]
 
+    @idempotent
+    @transaction.atomic
     def post(self, request, investment_id):
         try:
             investment = Investment.objects.get(pk=investment_id)
         except Investment.DoesNotExist:
             return Response({'error': 'Investment not found'}, status=status.HTTP_404_NOT_FOUND)
 
-        if investment.status != Investment.Status.PROCESSING:
-            return Response({'error': 'Investment is not processing'}, status=status.HTTP_400_BAD_REQUEST)
-
         admin_note = request.data.get('admin_note')
-
-        investment.status = Investment.Status.COMPLETED
-        investment.completed_at = timezone.now()
-        if admin_note:
-            investment.admin_note = admin_note
-            investment.save(update_fields=['status', 'completed_at', 'admin_note'])
-        else:
-            investment.save(update_fields=['status', 'completed_at'])
+        # Only the admin whose transition wins sells the shares.
+        if not transition(
+            investment, 'complete', completed_at=timezone.now(), admin_note=admin_note or investment.admin_note,
+        ):
+            return Response({'error': 'Investment is not processing'}, status=status.HTTP_400_BAD_REQUEST)
 
         project = investment.project
-        project.shares_sold += investment.shares
-        project.save(update_fields=['shares_sold'])
+        try:
+            sell_shares(project, investment.shares, reserved=True)
+        except InsufficientShares:
+            # Undo the transition together with everything else in this request.
+            transaction.set_rollback(True)
+            return Response(
+                {'error': f'Only {project.remaining_shares} shares remain in this project'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        ranking.investment_completed(investment)
+        funding.record_funding_snapshot(project, investment.completed_at)
 
         Notification.objects.create(
             user=investment.investor,
@@ -534,10 +496,78 @@ class InvestmentCompleteView(APIView):
         return Response(InvestmentSerializer(investment).data)
 
 
+class BulkInvestmentView(APIView):
+    """
+    Base for admin endpoints acting on up to MAX_BULK_INVESTMENTS investments.
+
+    Body: {"ids": [investment ids], ...}. Responds 200 with one result per ID
+    ({"id", "ok", "status"} or {"id", "ok": false, "error"}) so a partial
+    failure does not roll back the rest.
+    """
+    permission_classes = [IsAdminRole]
+
+    def parse_ids(self, request):
+        raw_ids = request.data.get('ids')
+        if not isinstance(raw_ids, list) or not raw_ids:
+            raise ValueError('ids must be a non-empty list of investment IDs')
+        try:
+            ids = list(dict.fromkeys(int(value) for value in raw_ids))
+        except (TypeError, ValueError):
+            raise ValueError('ids must be a non-empty list of investment IDs')
+        if len(ids) > MAX_BULK_INVESTMENTS:
+            raise ValueError(f'At most {MAX_BULK_INVESTMENTS} investments per request')
+        return ids
+
+    def respond(self, results):
+        succeeded = sum(1 for result in results if result['ok'])
+        return Response({'results': results, 'succeeded': succeeded, 'failed': len(results) - succeeded})
+
+
+class InvestmentBulkReviewView(BulkInvestmentView):
+    """Admin approve or reject many investment requests."""
+
+    @idempotent
+    def post(self, request):
+        try:
+            ids = self.parse_ids(request)
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        action = request.data.get('action')
+        if action not in ['approve', 'reject']:
+            return Response({'error': 'Invalid action'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            expires_in_days = int(request.data.get('expires_in_days', 7))
+        except (TypeError, ValueError):
+            expires_in_days = 7
+
+        return self.respond(bulk_review(
+            ids, action, request.user, admin_note=request.data.get('admin_note'), expires_in_days=expires_in_days,
+        ))
+
+
+class InvestmentBulkCompleteView(BulkInvestmentView):
+    """Admin completes many processing investments."""
+
+    @idempotent
+    def post(self, request):
+        try:
+            ids = self.parse_ids(request)
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return self.respond(bulk_complete(ids, request.user, admin_note=request.data.get('admin_note')))
+
+
 class InvestmentAdminActionView(APIView):
     """Admin refund/withdraw/reverse an investment."""
     permission_classes = [IsAdminRole]
-
+    payment_events = {
+        'refund': (AuditLog.ActionType.PAYMENT_REFUNDED, ProjectLedgerEntry.EntryType.PAYMENT_REFUNDED),
+        'withdraw': (AuditLog.ActionType.PAYMENT_WITHDRAWN, ProjectLedgerEntry.EntryType.PAYMENT_WITHDRAWN),
+        'reverse': (AuditLog.ActionType.PAYMENT_REVERSED, ProjectLedgerEntry.EntryType.PAYMENT_REVERSED),
+    }
+
+    @idempotent
+    @transaction.atomic
     def post(self, request, investment_id):
         try:
             investment = Investment.objects.get(pk=investment_id)
@@ -549,103 +579,37 @@ class InvestmentAdminActionView(APIView):
         if action not in ['refund', 'withdraw', 'reverse']:
             return Response({'error': 'Invalid action'}, status=status.HTTP_400_BAD_REQUEST)
 
+        if investment.payments.filter(status=Payment.Status.QUEUED).exists():
+            return Response({'error': 'Payment is being processed'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # The payment is only touched once the investment transition has won.
+        if not apply_investment_action(investment, action, actor=request.user, admin_note=admin_note):
+            label = {'refund': 'refunded', 'withdraw': 'withdrawn', 'reverse': 'reversed'}[action]
+            return Response({'error': f'Investment cannot be {label}'}, status=status.HTTP_400_BAD_REQUEST)
+
         payment = investment.payments.order_by('-created_at').first()
-        if action == 'refund' and payment:
-            payment.status = Payment.Status.REFUNDED
-            payment.processed_at = timezone.now()
-            payment.save(update_fields=['status', 'processed_at'])
-            AuditLog.objects.create(
-                action_type=AuditLog.ActionType.PAYMENT_REFUNDED,
-                actor=request.user,
-                target_type=AuditLog.TargetType.PAYMENT,
-                target_id=str(payment.id),
-                metadata={
-                    'investment_id': str(investment.id),
-                    'project_id': str(investment.project.id),
-                    'project_name': investment.project.title,
-                    'status': payment.status,
-                    'transaction_id': payment.transaction_id,
-                    'amount': str(payment.amount),
-                },
-            )
-            ProjectLedgerEntry.objects.create(
-                project=investment.project,
-                entry_type=ProjectLedgerEntry.EntryType.PAYMENT_REFUNDED,
-                actor=request.user,
-                metadata={
-                    'payment_id': str(payment.id),
-                    'investment_id': str(investment.id),
-                    'project_id': str(investment.project.id),
-                    'project_name': investment.project.title,
-                    'status': payment.status,
-                    'transaction_id': payment.transaction_id,
-                    'amount': str(payment.amount),
-                },
-            )
-        elif action == 'withdraw' and payment:
-            payment.status = Payment.Status.WITHDRAWN
-            payment.processed_at = timezone.now()
-            payment.save(update_fields=['status', 'processed_at'])
-            AuditLog.objects.create(
-                action_type=AuditLog.ActionType.PAYMENT_WITHDRAWN,
-                actor=request.user,
-                target_type=AuditLog.TargetType.PAYMENT,
-                target_id=str(payment.id),
-                metadata={
-                    'investment_id': str(investment.id),
-                    'project_id': str(investment.project.id),
-                    'project_name': investment.project.title,
-                    'status': payment.status,
-                    'transaction_id': payment.transaction_id,
-                    'amount': str(payment.amount),
-                },
-            )
-            ProjectLedgerEntry.objects.create(
-                project=investment.project,
-                entry_type=ProjectLedgerEntry.EntryType.PAYMENT_WITHDRAWN,
-                actor=request.user,
-                metadata={
-                    'payment_id': str(payment.id),
-                    'investment_id': str(investment.id),
-                    'project_id': str(investment.project.id),
-                    'project_name': investment.project.title,
-                    'status': payment.status,
-                    'transaction_id': payment.transaction_id,
-                    'amount': str(payment.amount),
-                },
-            )
-        elif action == 'reverse' and payment:
-            payment.status = Payment.Status.REVERSED
-            payment.processed_at = timezone.now()
-            payment.save(update_fields=['status', 'processed_at'])
+        if payment and transition(payment, action, processed_at=timezone.now()):
+            audit_action, ledger_type = self.payment_events[action]
+            metadata = {
+                'investment_id': str(investment.id),
+                'project_id': str(investment.project.id),
+                'project_name': investment.project.title,
+                'status': payment.status,
+                'transaction_id': payment.transaction_id,
+                'amount': str(payment.amount),
+            }
             AuditLog.objects.create(
-                action_type=AuditLog.ActionType.PAYMENT_REVERSED,
+                action_type=audit_action,
                 actor=request.user,
                 target_type=AuditLog.TargetType.PAYMENT,
                 target_id=str(payment.id),
-                metadata={
-                    'investment_id': str(investment.id),
-                    'project_id': str(investment.project.id),
-                    'project_name': investment.project.title,
-                    'status': payment.status,
-                    'transaction_id': payment.transaction_id,
-                    'amount': str(payment.amount),
-                },
+                metadata=metadata,
             )
             ProjectLedgerEntry.objects.create(
                 project=investment.project,
-                entry_type=ProjectLedgerEntry.EntryType.PAYMENT_REVERSED,
+                entry_type=ledger_type,
                 actor=request.user,
-                metadata={
-                    'payment_id': str(payment.id),
-                    'investment_id': str(investment.id),
-                    'project_id': str(investment.project.id),
-                    'project_name': investment.project.title,
-                    'status': payment.status,
-                    'transaction_id': payment.transaction_id,
-                    'amount': str(payment.amount),
-                },
+                metadata={'payment_id': str(payment.id), **metadata},
             )
 
-        apply_investment_action(investment, action, actor=request.user, admin_note=admin_note)
         return Response(InvestmentSerializer(investment).data)
@@ -0,0 +1,131 @@
+"""
+Gateway webhook inbox.
+
+Gateway callbacks arrive in bursts, so receiving one does no payment work:
+the endpoint checks the signature (investments/gateways.py) and appends the
+raw event to PaymentWebhookEvent with a single INSERT (a resent event ID is
+ignored by the unique constraint), then answers 202.
+
+`apply_webhook_events` (run by `manage.py apply_payment_webhooks`) drains
+the inbox in batches, one transaction each, with SKIP LOCKED so several
+appliers can run. Within a batch, events are deduplicated by transaction ID
+(the first outcome for a payment wins), matched to their QUEUED payments in
+one query and applied through `apply_charge_results`, which writes set-wise.
+Every event is then stamped APPLIED, DUPLICATE or IGNORED (unknown type, or
+no queued payment: the worker already applied the gateway's answer).
+
+Applied events are kept for PAYMENT_WEBHOOK_RETENTION_DAYS, then deleted in
+batches by `purge_applied_events` (`manage.py purge_payment_webhooks`).
+"""
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .gateways import WEBHOOK_EVENT_OUTCOMES, ChargeResult, verify_webhook
+from .models import Payment, PaymentWebhookEvent
+from .payments import apply_charge_results
+
+WEBHOOK_BATCH_SIZE = 500
+PURGE_BATCH_SIZE = 5000
+
+
+class InvalidWebhook(Exception):
+    pass
+
+
+def parse_webhook(body, signature):
+    """The unsaved PaymentWebhookEvent for a raw webhook; raises InvalidWebhook."""
+    secret = getattr(settings, 'PAYMENT_WEBHOOK_SECRET', '')
+    tolerance = getattr(settings, 'PAYMENT_WEBHOOK_TOLERANCE_SECONDS', 300)
+    if not secret or not verify_webhook(body, signature, secret, tolerance):
+        raise InvalidWebhook('Invalid signature')
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise InvalidWebhook('Invalid JSON')
+    data = payload.get('data') if isinstance(payload, dict) else None
+    if not isinstance(data, dict) or not payload.get('id') or not payload.get('type'):
+        raise InvalidWebhook('Event id, type and data are required')
+    if not data.get('idempotency_key'):
+        raise InvalidWebhook('data.idempotency_key is required')
+    return PaymentWebhookEvent(
+        event_id=str(payload['id'])[:255],
+        event_type=str(payload['type'])[:100],
+        transaction_id=str(data['idempotency_key'])[:255],
+        payload=payload,
+    )
+
+
+def ingest_webhook(body, signature):
+    """Append a signed webhook to the inbox (one INSERT); raises InvalidWebhook."""
+    PaymentWebhookEvent.objects.bulk_create([parse_webhook(body, signature)], ignore_conflicts=True)
+
+
+def charge_result(event):
+    data = event.payload.get('data', {})
+    return ChargeResult(WEBHOOK_EVENT_OUTCOMES[event.event_type], str(data.get('id') or ''), str(data.get('error') or ''))
+
+
+def stamp(events, result, now):
+    if events:
+        PaymentWebhookEvent.objects.filter(id__in=[event.id for event in events]).update(applied_at=now, result=result)
+
+
+@transaction.atomic
+def apply_webhook_batch(batch_size=WEBHOOK_BATCH_SIZE):
+    """Apply up to `batch_size` inbox events; returns how many were taken from the inbox."""
+    now = timezone.now()
+    events = list(
+        PaymentWebhookEvent.objects.select_for_update(skip_locked=True)
+        .filter(applied_at__isnull=True)
+        .order_by('id')[:batch_size]
+    )
+    first, duplicates, ignored = {}, [], []
+    for event in events:
+        if event.event_type not in WEBHOOK_EVENT_OUTCOMES:
+            ignored.append(event)
+        elif event.transaction_id in first:
+            duplicates.append(event)
+        else:
+            first[event.transaction_id] = event
+
+    payments = (
+        Payment.objects.filter(transaction_id__in=list(first), status=Payment.Status.QUEUED)
+        .select_related('investor', 'investment__investor', 'investment__project')
+    ) if first else []
+    results = {payment: charge_result(first[payment.transaction_id]) for payment in payments}
+    outcomes = apply_charge_results(results, now=now)
+    applied_ids = {payment.transaction_id for payment in results if payment.id in outcomes}
+    applied = [event for txn, event in first.items() if txn in applied_ids]
+    ignored.extend(event for txn, event in first.items() if txn not in applied_ids)
+
+    stamp(applied, PaymentWebhookEvent.Result.APPLIED, now)
+    stamp(duplicates, PaymentWebhookEvent.Result.DUPLICATE, now)
+    stamp(ignored, PaymentWebhookEvent.Result.IGNORED, now)
+    return len(events)
+
+
+def apply_webhook_events(batch_size=WEBHOOK_BATCH_SIZE):
+    """Drain the inbox `batch_size` events per transaction; returns how many were processed."""
+    processed = 0
+    while True:
+        count = apply_webhook_batch(batch_size)
+        processed += count
+        if count < batch_size:
+            return processed
+
+
+def purge_applied_events(now=None, batch_size=PURGE_BATCH_SIZE):
+    """Delete events applied over PAYMENT_WEBHOOK_RETENTION_DAYS ago, `batch_size` per statement; returns the count."""
+    now = now or timezone.now()
+    cutoff = now - timedelta(days=getattr(settings, 'PAYMENT_WEBHOOK_RETENTION_DAYS', 7))
+    applied = PaymentWebhookEvent.objects.filter(applied_at__lte=cutoff).order_by('applied_at')
+    deleted = 0
+    while True:
+        ids = list(applied.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += PaymentWebhookEvent.objects.filter(id__in=ids).delete()[0]
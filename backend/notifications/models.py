@@ -60,6 +60,9 @@ class Notification(models.Model):
     class Meta:
         db_table = 'notifications'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='notifications_user_idx'),
+        ]
     
     def __str__(self):
         return f"{self.type}: {self.title}"
@@ -9,6 +9,8 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.authentication import JWTAuthentication
 
+from config.pagination import KeysetPagination
+
 from .models import Notification
 from .serializers import NotificationSerializer
 
@@ -27,6 +29,7 @@ class NotificationListView(generics.ListAPIView):
     """List notifications for the authenticated user."""
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
     
     def get_queryset(self):
         return Notification.objects.filter(user=self.request.user)
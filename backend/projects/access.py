@@ -0,0 +1,65 @@
+"""
+Who may see a project's restricted fields.
+
+A user may see them for projects they own, for every project if they are an
+admin, and for projects where they hold a PROCESSING or COMPLETED investment
+or an APPROVED access request. The project IDs are resolved with a single
+UNION query the first time they are needed, then memoized on the request so
+serializing many projects costs no further queries.
+"""
+from access_requests.models import AccessRequest
+from investments.models import Investment
+
+from .models import Project
+
+ACCESS_INVESTMENT_STATUSES = (Investment.Status.PROCESSING, Investment.Status.COMPLETED)
+REQUEST_ATTR = '_restricted_access'
+
+
+class RestrictedAccess:
+    def __init__(self, user):
+        self.user = user
+        self.sees_everything = bool(user and user.is_authenticated) and (
+            getattr(user, 'role', None) == 'ADMIN'
+            or getattr(user, 'is_staff', False)
+            or getattr(user, 'is_superuser', False)
+        )
+        self._project_ids = None
+
+    @property
+    def project_ids(self):
+        """IDs of projects whose restricted fields the user may see (admins: unused)."""
+        if self._project_ids is None:
+            self._project_ids = self._load_project_ids()
+        return self._project_ids
+
+    def _load_project_ids(self):
+        if not self.user or not self.user.is_authenticated or self.sees_everything:
+            return frozenset()
+        owned = Project.objects.filter(developer=self.user).order_by().values_list('id', flat=True)
+        invested = Investment.objects.filter(
+            investor=self.user, status__in=ACCESS_INVESTMENT_STATUSES,
+        ).order_by().values_list('project_id', flat=True)
+        approved = AccessRequest.objects.filter(
+            investor=self.user, status=AccessRequest.Status.APPROVED,
+        ).order_by().values_list('project_id', flat=True)
+        return frozenset(owned.union(invested, approved))
+
+    def allows(self, project):
+        if self.sees_everything:
+            return True
+        if not self.user or not self.user.is_authenticated:
+            return False
+        if project.developer_id == self.user.pk:
+            return True
+        return project.pk in self.project_ids
+
+
+def get_restricted_access(request):
+    """RestrictedAccess for `request.user`, memoized on the underlying HttpRequest."""
+    http_request = getattr(request, '_request', request)
+    access = getattr(http_request, REQUEST_ATTR, None)
+    if access is None or access.user is not request.user:
+        access = RestrictedAccess(request.user)
+        setattr(http_request, REQUEST_ATTR, access)
+    return access
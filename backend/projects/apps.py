@@ -1,5 +1,20 @@
 from django.apps import AppConfig
+from django.core import checks
+from django.db.models.signals import post_migrate
+
+
+def ensure_search_triggers(sender, using='default', **kwargs):
+    from .search import ensure_sqlite_triggers
+    ensure_sqlite_triggers(using)
 
 
 class ProjectsConfig(AppConfig):
     name = 'projects'
+
+    def ready(self):
+        from .ranking import check_half_life
+        from .signals import connect_cache_signals
+
+        post_migrate.connect(ensure_search_triggers, sender=self)
+        connect_cache_signals()
+        checks.register(check_half_life)
@@ -0,0 +1,196 @@
+"""
+Response cache for the public project catalog.
+
+Guests and investors see the same catalog, so their list and detail
+responses are cached under keys that embed a catalog version number. Any
+project mutation bumps the version (see projects/signals.py), which orphans
+every cached page at once; stale entries simply age out of the backend.
+Works on any Django cache backend (local-memory and file based included).
+"""
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+CATALOG_VERSION_KEY = 'projects:catalog-version'
+ACCESS_VERSION_KEY = 'projects:access-version:{user_id}'
+RANKING_VERSION_KEY = 'projects:ranking-version'
+MEMBERSHIP_VERSION_KEY = 'projects:membership-version:{user_id}'
+
+
+def _initial_version():
+    # Time-based, so a version lost to eviction or a restart never reuses an old number.
+    return int(time.time() * 1000)
+
+
+def _get_version(key):
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def _bump_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _initial_version(), timeout=None)
+
+
+def _bump_now_and_on_commit(key):
+    # The bump after commit invalidates anything cached from pre-commit reads.
+    _bump_version(key)
+    transaction.on_commit(lambda: _bump_version(key))
+
+
+def get_catalog_version():
+    return _get_version(CATALOG_VERSION_KEY)
+
+
+def bump_catalog_version():
+    """Invalidate every cached catalog response. Call after bulk/queryset updates."""
+    _bump_now_and_on_commit(CATALOG_VERSION_KEY)
+
+
+def get_access_version(user_id):
+    return _get_version(ACCESS_VERSION_KEY.format(user_id=user_id))
+
+
+def bump_access_version(user_id):
+    """Invalidate cached detail pages for one investor (their restricted-field access changed)."""
+    _bump_now_and_on_commit(ACCESS_VERSION_KEY.format(user_id=user_id))
+
+
+def get_membership_version(user_id):
+    return _get_version(MEMBERSHIP_VERSION_KEY.format(user_id=user_id))
+
+
+def bump_membership_version(user_id):
+    """The user's favorites, compare list, investments or access requests changed (see projects/membership.py)."""
+    _bump_now_and_on_commit(MEMBERSHIP_VERSION_KEY.format(user_id=user_id))
+
+
+def get_ranking_version():
+    return _get_version(RANKING_VERSION_KEY)
+
+
+def bump_ranking_version():
+    """Invalidate cached `ordering=trending` pages (trending scores changed)."""
+    _bump_now_and_on_commit(RANKING_VERSION_KEY)
+
+
+def get_cache_timeout():
+    return getattr(settings, 'PROJECT_CACHE_TIMEOUT', 300)
+
+
+def is_public_viewer(user):
+    """Guests and plain investors share the APPROVED catalog; admins and developers do not."""
+    if not user or not user.is_authenticated:
+        return True
+    return (
+        getattr(user, 'role', None) == 'INVESTOR'
+        and not getattr(user, 'is_staff', False)
+        and not getattr(user, 'is_superuser', False)
+    )
+
+
+def viewer_scope(user):
+    """Which catalog `user` sees: the shared public one, everything (admins), or their own mix."""
+    if is_public_viewer(user):
+        return 'public'
+    if (
+        getattr(user, 'role', None) == 'ADMIN'
+        or getattr(user, 'is_staff', False)
+        or getattr(user, 'is_superuser', False)
+    ):
+        return 'admin'
+    return f'user:{user.pk}'
+
+
+def viewer_access_state(user):
+    """
+    Token that changes whenever what `user` may see of restricted fields changes.
+
+    Guests never see them; developers and admins see them by role/ownership;
+    investors depend on their investments and access requests.
+    """
+    if not user or not user.is_authenticated or not is_public_viewer(user):
+        return ''
+    return f'u{user.pk}:{get_access_version(user.pk)}'
+
+
+def viewer_membership_state(user):
+    """Token that changes whenever the per-viewer flags on project cards would."""
+    if not user or not user.is_authenticated:
+        return ''
+    return f'm{user.pk}:{get_membership_version(user.pk)}'
+
+
+def normalize_query(request):
+    """Sorted, re-encoded query string so equivalent URLs share a cache entry."""
+    items = sorted(
+        (key, value)
+        for key, values in request.query_params.lists()
+        for value in values
+        if value != ''
+    )
+    return urlencode(items)
+
+
+def catalog_cache_key(request, kind, *parts, all_viewers=False):
+    """
+    Versioned key for a catalog response, or None when `request` must not be cached.
+
+    Only public viewers are cached unless `all_viewers` is set, in which case
+    admins share one entry and developers get their own. `parts` scope the
+    entry further (e.g. a project id); the host is included because paginated
+    responses embed absolute next/previous links.
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    if not all_viewers and not is_public_viewer(request.user):
+        return None
+    scope = [viewer_scope(request.user), *(str(part) for part in parts)]
+    if kind == 'detail':
+        # Restricted fields on the detail page depend on the investor's access.
+        scope.append(viewer_access_state(request.user))
+    raw = '|'.join([request.get_host(), normalize_query(request), *scope])
+    digest = hashlib.md5(raw.encode('utf-8'), usedforsecurity=False).hexdigest()
+    return f'projects:{kind}:{get_catalog_version()}:{digest}'
+
+
+def cached_catalog_response(request, kind, build, *parts, all_viewers=False):
+    """
+    Serve `build()`'s response from the cache for public viewers.
+
+    Only successful responses are stored; their `data` is cached rather than
+    the rendered bytes, so content negotiation still happens per request.
+    """
+    key = catalog_cache_key(request, kind, *parts, all_viewers=all_viewers)
+    if key is None:
+        return build()
+    data = cache.get(key)
+    if data is not None:
+        return Response(data)
+    response = build()
+    if response.status_code == status.HTTP_200_OK:
+        cache.set(key, response.data, get_cache_timeout())
+    return response
+
+
+def cached_catalog_value(request, kind, compute, *parts, all_viewers=False):
+    """Like cached_catalog_response, for any picklable value derived from the catalog."""
+    key = catalog_cache_key(request, kind, *parts, all_viewers=all_viewers)
+    if key is None:
+        return compute()
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, get_cache_timeout())
+    return value
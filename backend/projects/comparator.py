@@ -0,0 +1,209 @@
+"""
+Vectorized project comparator.
+
+Selected projects are loaded with one query into columnar NumPy arrays.
+Scores are then computed for the whole selection at once:
+
+- `normalized`: min/max scaling across the selection (the score the compare
+  page averages).
+- `percentiles`: rank against the whole APPROVED catalog.
+- `z_scores`: distance from the catalog mean in standard deviations.
+
+The catalog side comes from a column snapshot kept in process memory and
+rebuilt at most every PROJECT_COMPARATOR_SNAPSHOT_TTL seconds, so a compare
+call never scans the catalog itself.
+"""
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from investments.models import Investment
+
+from .models import Project
+
+MAX_COMPARE = 500
+SECONDS_PER_DAY = 86400.0
+
+# Metrics scored against the selection (kept to the original three, which the
+# compare page averages) and against the catalog.
+NORMALIZED_METRICS = ('per_share_price', 'funding_progress', 'total_value')
+CATALOG_METRICS = (
+    'per_share_price', 'funding_progress', 'total_value',
+    'duration_days', 'remaining_shares', 'days_left', 'investor_count',
+)
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+
+def get_snapshot_ttl():
+    return getattr(settings, 'PROJECT_COMPARATOR_SNAPSHOT_TTL', 300)
+
+
+def with_investor_count(queryset):
+    """Annotate distinct investors holding a COMPLETED investment (a subquery, no GROUP BY)."""
+    investors = (
+        Investment.objects.filter(project=OuterRef('pk'), status=Investment.Status.COMPLETED)
+        .order_by()
+        .values('project')
+        .annotate(total=Count('investor', distinct=True))
+        .values('total')
+    )
+    return queryset.annotate(
+        investor_count=Coalesce(Subquery(investors, output_field=IntegerField()), Value(0))
+    )
+
+
+COLUMN_FIELDS = (
+    'id', 'per_share_price_value', 'funding_progress_value', 'total_value', 'total_shares',
+    'shares_sold', 'remaining_shares_value', 'duration_days', 'end_date', 'investor_count',
+)
+
+
+def load_columns(queryset, now=None):
+    """Run `queryset` once and return (rows, {metric: float64 array})."""
+    now = now or timezone.now()
+    rows = list(with_investor_count(queryset).values(*COLUMN_FIELDS, 'title', 'category', 'status'))
+    columns = {
+        'per_share_price': np.fromiter((row['per_share_price_value'] for row in rows), float, len(rows)),
+        'funding_progress': np.fromiter((row['funding_progress_value'] for row in rows), float, len(rows)),
+        'total_value': np.fromiter((float(row['total_value']) for row in rows), float, len(rows)),
+        'duration_days': np.fromiter((row['duration_days'] for row in rows), float, len(rows)),
+        'remaining_shares': np.fromiter((row['remaining_shares_value'] for row in rows), float, len(rows)),
+        'investor_count': np.fromiter((row['investor_count'] for row in rows), float, len(rows)),
+    }
+    end_timestamps = np.fromiter(
+        (row['end_date'].timestamp() if row['end_date'] else np.nan for row in rows), float, len(rows)
+    )
+    columns['days_left'] = np.maximum((end_timestamps - now.timestamp()) / SECONDS_PER_DAY, 0.0)
+    return rows, columns
+
+
+class CatalogSnapshot:
+    """Sorted metric columns of the APPROVED catalog, with mean and std per metric."""
+
+    def __init__(self, columns, size, built_at):
+        self.size = size
+        self.built_at = built_at
+        self.sorted = {}
+        self.mean = {}
+        self.std = {}
+        for metric in CATALOG_METRICS:
+            values = columns[metric]
+            values = values[~np.isnan(values)]
+            self.sorted[metric] = np.sort(values)
+            self.mean[metric] = float(values.mean()) if values.size else np.nan
+            self.std[metric] = float(values.std()) if values.size else np.nan
+
+    @classmethod
+    def build(cls):
+        now = timezone.now()
+        rows, columns = load_columns(Project.objects.filter(status=Project.Status.APPROVED).order_by(), now)
+        return cls(columns, len(rows), now)
+
+    def percentiles(self, metric, values):
+        """Mean percentile rank (0-100) of each value within the catalog column."""
+        column = self.sorted[metric]
+        if not column.size:
+            return np.full(values.shape, np.nan)
+        below = np.searchsorted(column, values, side='left')
+        not_above = np.searchsorted(column, values, side='right')
+        ranks = (below + not_above) / 2.0 / column.size * 100.0
+        return np.where(np.isnan(values), np.nan, ranks)
+
+    def z_scores(self, metric, values):
+        std = self.std[metric]
+        if np.isnan(std):
+            return np.full(values.shape, np.nan)
+        if std == 0:
+            return np.where(np.isnan(values), np.nan, 0.0)
+        return (values - self.mean[metric]) / std
+
+
+def get_catalog_snapshot():
+    """The current catalog snapshot, rebuilt when older than the TTL."""
+    global _snapshot
+    snapshot = _snapshot
+    if snapshot is not None and time.monotonic() - snapshot[0] < get_snapshot_ttl():
+        return snapshot[1]
+    with _snapshot_lock:
+        if _snapshot is None or time.monotonic() - _snapshot[0] >= get_snapshot_ttl():
+            _snapshot = (time.monotonic(), CatalogSnapshot.build())
+        return _snapshot[1]
+
+
+def reset_catalog_snapshot():
+    global _snapshot
+    with _snapshot_lock:
+        _snapshot = None
+
+
+def min_max_normalize(values):
+    low, high = np.nanmin(values), np.nanmax(values)
+    if high == low:
+        return np.ones_like(values)
+    return (values - low) / (high - low)
+
+
+def _to_list(values, digits=4):
+    return [None if np.isnan(value) else round(float(value), digits) for value in values]
+
+
+def compare_projects(project_ids):
+    """
+    Comparison payload for `project_ids` (at most MAX_COMPARE), or None if none exist.
+
+    Projects come back newest first, like the project list.
+    """
+    rows, columns = load_columns(Project.objects.filter(id__in=project_ids).order_by('-created_at'))
+    if not rows:
+        return None
+
+    snapshot = get_catalog_snapshot()
+    normalized = {metric: _to_list(min_max_normalize(columns[metric])) for metric in NORMALIZED_METRICS}
+    percentiles = {metric: _to_list(snapshot.percentiles(metric, columns[metric]), 2) for metric in CATALOG_METRICS}
+    z_scores = {metric: _to_list(snapshot.z_scores(metric, columns[metric])) for metric in CATALOG_METRICS}
+    days_left = _to_list(columns['days_left'], 2)
+
+    projects = []
+    for index, row in enumerate(rows):
+        projects.append({
+            'id': row['id'],
+            'title': row['title'],
+            'category': row['category'],
+            'status': row['status'],
+            'total_value': float(row['total_value']),
+            'total_shares': row['total_shares'],
+            'shares_sold': row['shares_sold'],
+            'per_share_price': row['per_share_price_value'],
+            'funding_progress': row['funding_progress_value'],
+            'duration_days': row['duration_days'],
+            'remaining_shares': row['remaining_shares_value'],
+            'days_left': days_left[index],
+            'investor_count': row['investor_count'],
+            'normalized': {metric: normalized[metric][index] for metric in NORMALIZED_METRICS},
+            'percentiles': {metric: percentiles[metric][index] for metric in CATALOG_METRICS},
+            'z_scores': {metric: z_scores[metric][index] for metric in CATALOG_METRICS},
+        })
+
+    metrics = {}
+    for metric in CATALOG_METRICS:
+        column = columns[metric]
+        present = column[~np.isnan(column)]
+        metrics[metric] = {
+            'min': float(present.min()) if present.size else None,
+            'max': float(present.max()) if present.size else None,
+            'catalog_mean': None if np.isnan(snapshot.mean[metric]) else snapshot.mean[metric],
+            'catalog_std': None if np.isnan(snapshot.std[metric]) else snapshot.std[metric],
+        }
+
+    return {
+        'projects': projects,
+        'metrics': metrics,
+        'catalog': {'size': snapshot.size, 'snapshot_at': snapshot.built_at},
+    }
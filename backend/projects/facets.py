@@ -0,0 +1,72 @@
+"""
+Facet counts for the catalog filter sidebar.
+
+Every facet is a conditional COUNT over the same filtered queryset, so all
+counts come back from a single aggregate query. Range buckets are half-open
+(`min <= value < max`; a missing bound is unbounded) and carry the bounds the
+frontend passes back as `min_*`/`max_*` list filters, which are half-open the
+same way, so a bucket's count is exactly what its filtered list returns.
+"""
+from django.db.models import Count, Q
+
+from .models import Project
+
+# (key, min, max) per bucket, on the stored metric columns.
+RANGE_FACETS = {
+    'funding_progress': ('funding_progress_value', [
+        ('0-25', 0, 25),
+        ('25-50', 25, 50),
+        ('50-75', 50, 75),
+        ('75-100', 75, 100),
+        ('funded', 100, None),
+    ]),
+    'per_share_price': ('per_share_price_value', [
+        ('under-10', None, 10),
+        ('10-50', 10, 50),
+        ('50-100', 50, 100),
+        ('100-500', 100, 500),
+        ('500-plus', 500, None),
+    ]),
+    'duration_days': ('duration_days', [
+        ('under-30', None, 30),
+        ('30-90', 30, 90),
+        ('90-180', 90, 180),
+        ('180-365', 180, 365),
+        ('365-plus', 365, None),
+    ]),
+}
+
+
+def _range_condition(field, low, high):
+    condition = Q()
+    if low is not None:
+        condition &= Q(**{f'{field}__gte': low})
+    if high is not None:
+        condition &= Q(**{f'{field}__lt': high})
+    return condition
+
+
+def catalog_facets(queryset):
+    """Total, per-category and per-range-bucket counts for `queryset` in one query."""
+    aggregates = {'total': Count('pk')}
+    for value, _ in Project.Category.choices:
+        aggregates[f'category__{value}'] = Count('pk', filter=Q(category=value))
+    for facet, (field, buckets) in RANGE_FACETS.items():
+        for key, low, high in buckets:
+            aggregates[f'{facet}__{key}'] = Count('pk', filter=_range_condition(field, low, high))
+
+    counts = queryset.order_by().aggregate(**aggregates)
+
+    facets = {
+        'total': counts['total'],
+        'category': [
+            {'value': value, 'label': label, 'count': counts[f'category__{value}']}
+            for value, label in Project.Category.choices
+        ],
+    }
+    for facet, (_, buckets) in RANGE_FACETS.items():
+        facets[facet] = [
+            {'key': key, 'min': low, 'max': high, 'count': counts[f'{facet}__{key}']}
+            for key, low, high in buckets
+        ]
+    return facets
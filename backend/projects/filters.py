@@ -0,0 +1,81 @@
+from rest_framework import filters
+
+from .search import search_projects
+
+
+class ProjectOrderingFilter(filters.OrderingFilter):
+    """
+    OrderingFilter that understands the public sort keys used by the frontend.
+
+    `funding_progress`, `per_share_price` and `remaining_shares` are Python
+    properties on Project; sorting by them is mapped onto the stored, indexed
+    metric columns instead. `trending` (hottest first) maps onto the indexed
+    ProjectRanking score, descending; `-trending` reverses it.
+    """
+    aliases = {
+        'per_share_price': 'per_share_price_value',
+        'funding_progress': 'funding_progress_value',
+        'remaining_shares': 'remaining_shares_value',
+    }
+    descending_aliases = {
+        'trending': 'ranking__score',
+    }
+
+    def translate(self, term):
+        descending = term.startswith('-')
+        field = term.lstrip('-')
+        if field in self.descending_aliases:
+            field, descending = self.descending_aliases[field], not descending
+        field = self.aliases.get(field, field)
+        return f"-{field}" if descending else field
+
+    def remove_invalid_fields(self, queryset, fields, view, request):
+        fields = [self.translate(term) for term in fields]
+        return super().remove_invalid_fields(queryset, fields, view, request)
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if not request.query_params.get(self.ordering_param) and 'search_rank' in queryset.query.annotations:
+            # Full-text searches are ordered by relevance unless a sort was requested.
+            return ['-search_rank', *(ordering or [])]
+        return ordering
+
+    def filter_queryset(self, request, queryset, view):
+        queryset = super().filter_queryset(request, queryset, view)
+        if any(term.lstrip('-').startswith('ranking__') for term in queryset.query.order_by):
+            # Cursor positions read the score off each row.
+            queryset = queryset.select_related('ranking')
+        return queryset
+
+
+class ProjectSearchFilter(filters.BaseFilterBackend):
+    """
+    Full-text search on title, short_description and description.
+
+    Reads `?q=` (or the older `?search=`) and delegates to projects.search,
+    which uses the tsvector/GIN index on PostgreSQL and FTS5 on SQLite.
+    Must run before ProjectOrderingFilter so results can be ranked.
+    """
+    search_params = ('q', 'search')
+
+    def get_search_query(self, request):
+        for param in self.search_params:
+            value = request.query_params.get(param, '').strip()
+            if value:
+                return value
+        return ''
+
+    def filter_queryset(self, request, queryset, view):
+        query = self.get_search_query(request)
+        if not query:
+            return queryset
+        return search_projects(queryset, query)
+
+    def get_schema_operation_parameters(self, view):
+        return [{
+            'name': 'q',
+            'required': False,
+            'in': 'query',
+            'description': 'Full-text search over title and descriptions (prefix matching, ranked).',
+            'schema': {'type': 'string'},
+        }]
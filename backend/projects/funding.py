@@ -0,0 +1,221 @@
+"""
+Daily funding time series (ProjectFundingSnapshot): shares sold, amount
+raised and investor count per project at the end of each day with activity.
+
+- `record_funding_snapshot` upserts today's row from the project's current
+  state; it runs when an investment completes or a completed one is released.
+- `rollup_funding_snapshots` rebuilds the series from the project ledger
+  (INVESTMENT_COMPLETED and refund/withdraw/reverse entries). The replay is
+  anchored on the current state: the state before the first ledger entry is
+  the current one minus the ledger's net effect, so shares sold outside the
+  ledger (e.g. seeded projects) are carried through and the last point always
+  matches the project.
+- `funding_series` serves a date range, downsampled to one point (the last
+  state) per day, week or month.
+
+Days without activity have no row; the series is a step function.
+"""
+from collections import Counter
+from datetime import timedelta
+from decimal import Decimal
+from itertools import groupby
+
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from audit.models import ProjectLedgerEntry
+from investments.models import Investment
+
+from .models import Project, ProjectFundingSnapshot
+from .shares import live_shares_sold
+
+SNAPSHOT_FIELDS = ['shares_sold', 'raised', 'investor_count', 'updated_at']
+INTERVALS = ('day', 'week', 'month')
+DEFAULT_BATCH_SIZE = 500
+
+COMPLETED_ENTRY = ProjectLedgerEntry.EntryType.INVESTMENT_COMPLETED
+RELEASE_ENTRIES = (
+    ProjectLedgerEntry.EntryType.INVESTMENT_REFUNDED,
+    ProjectLedgerEntry.EntryType.INVESTMENT_WITHDRAWN,
+    ProjectLedgerEntry.EntryType.INVESTMENT_REVERSED,
+)
+
+
+def upsert_snapshots(snapshots):
+    ProjectFundingSnapshot.objects.bulk_create(
+        snapshots,
+        update_conflicts=True,
+        unique_fields=['project', 'day'],
+        update_fields=SNAPSHOT_FIELDS,
+    )
+
+
+def record_funding_snapshot(project, moment=None):
+    """Upsert the project's row for today (or `moment`'s day) from its current state."""
+    figures = Investment.objects.filter(project=project, status=Investment.Status.COMPLETED).aggregate(
+        raised=Sum('total_amount'),
+        investors=Count('investor', distinct=True),
+    )
+    upsert_snapshots([ProjectFundingSnapshot(
+        project=project,
+        day=timezone.localdate(moment or timezone.now()),
+        shares_sold=live_shares_sold(project),
+        raised=figures['raised'] or 0,
+        investor_count=figures['investors'] or 0,
+        updated_at=timezone.now(),
+    )])
+
+
+def ledger_deltas(entries):
+    """(day, shares, amount, investor_id, sign) per entry that moved the project's funding."""
+    completed = set()
+    for entry in entries:
+        metadata = entry.metadata or {}
+        investment_id = metadata.get('investment_id')
+        if entry.entry_type == COMPLETED_ENTRY:
+            completed.add(investment_id)
+            sign = 1
+        elif investment_id in completed:
+            # Only releases of completed investments gave shares back.
+            completed.discard(investment_id)
+            sign = -1
+        else:
+            continue
+        yield (
+            timezone.localdate(entry.created_at),
+            int(metadata.get('shares') or 0),
+            Decimal(str(metadata.get('amount') or 0)),
+            metadata.get('investor_id'),
+            sign,
+        )
+
+
+def replay_project(project_id, entries, shares_sold, raised, holdings):
+    """
+    Snapshot rows for one project from its ledger entries (oldest first) and
+    its current shares sold, raised amount and holdings (investor -> number of
+    completed investments).
+    """
+    deltas = list(ledger_deltas(entries))
+    shares_sold -= sum(sign * shares for _, shares, _, _, sign in deltas)
+    raised -= sum(sign * amount for _, _, amount, _, sign in deltas)
+    holdings = Counter(holdings)
+    for _, _, _, investor, sign in deltas:
+        holdings[investor] -= sign
+
+    now = timezone.now()
+    snapshots = []
+    for day, day_deltas in groupby(deltas, key=lambda delta: delta[0]):
+        for _, shares, amount, investor, sign in day_deltas:
+            shares_sold += sign * shares
+            raised += sign * amount
+            holdings[investor] += sign
+        snapshots.append(ProjectFundingSnapshot(
+            project_id=project_id,
+            day=day,
+            shares_sold=max(0, shares_sold),
+            raised=max(Decimal('0'), raised),
+            investor_count=sum(1 for count in holdings.values() if count > 0),
+            updated_at=now,
+        ))
+    return snapshots
+
+
+def rollup_funding_snapshots(since=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Rebuild the series of every project with funding entries in the ledger
+    (only those with entries on or after `since`, when given). Returns
+    (projects, rows) written.
+    """
+    entries = ProjectLedgerEntry.objects.filter(entry_type__in=(COMPLETED_ENTRY, *RELEASE_ENTRIES))
+    if since is not None:
+        entries = entries.filter(
+            project__in=entries.filter(created_at__date__gte=since).values('project').distinct()
+        )
+    entries = entries.only('project_id', 'entry_type', 'metadata', 'created_at').order_by(
+        'project_id', 'created_at', 'id'
+    )
+
+    projects = rows = 0
+    batch = []
+    for project_id, project_entries in groupby(entries.iterator(), key=lambda entry: entry.project_id):
+        batch.append((project_id, list(project_entries)))
+        if len(batch) >= batch_size:
+            rows += rollup_batch(batch)
+            projects += len(batch)
+            batch = []
+    if batch:
+        rows += rollup_batch(batch)
+        projects += len(batch)
+    return projects, rows
+
+
+@transaction.atomic
+def rollup_batch(batch):
+    project_ids = [project_id for project_id, _ in batch]
+    shares_sold = dict(Project.objects.filter(id__in=project_ids).values_list('id', 'shares_sold'))
+    raised = {project_id: Decimal('0') for project_id in project_ids}
+    holdings = {project_id: Counter() for project_id in project_ids}
+    completed = (
+        Investment.objects.filter(project_id__in=project_ids, status=Investment.Status.COMPLETED)
+        .order_by()
+        .values_list('project_id', 'investor_id')
+        .annotate(count=Count('id'), amount=Sum('total_amount'))
+    )
+    for project_id, investor_id, count, amount in completed:
+        raised[project_id] += amount or 0
+        # Ledger metadata stores IDs as strings.
+        holdings[project_id][str(investor_id)] = count
+
+    snapshots = []
+    for project_id, entries in batch:
+        if project_id in shares_sold:
+            snapshots.extend(replay_project(
+                project_id, entries, shares_sold[project_id], raised[project_id], holdings[project_id],
+            ))
+    ProjectFundingSnapshot.objects.filter(project_id__in=project_ids).delete()
+    ProjectFundingSnapshot.objects.bulk_create(snapshots)
+    return len(snapshots)
+
+
+def bucket_start(day, interval):
+    if interval == 'week':
+        return day - timedelta(days=day.weekday())
+    if interval == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def funding_series(project, start=None, end=None, interval='day'):
+    """
+    Points {date, shares_sold, raised, investor_count} for the date range, one
+    per `interval` bucket (dated at the bucket start, carrying the bucket's
+    last state). With `start`, the state carried into the range is the first
+    point so the series does not begin at zero.
+    """
+    snapshots = ProjectFundingSnapshot.objects.filter(project=project).order_by('day')
+    rows = snapshots
+    if start is not None:
+        rows = rows.filter(day__gte=start)
+    if end is not None:
+        rows = rows.filter(day__lte=end)
+    rows = list(rows.values('day', 'shares_sold', 'raised', 'investor_count'))
+
+    if start is not None and (not rows or rows[0]['day'] != start):
+        carried = snapshots.filter(day__lt=start).values('shares_sold', 'raised', 'investor_count').last()
+        if carried:
+            rows.insert(0, {'day': start, **carried})
+
+    points = {}
+    for row in rows:
+        bucket = bucket_start(row['day'], interval)
+        if start is not None and bucket < start:
+            bucket = start
+        points[bucket] = {
+            'date': bucket,
+            'shares_sold': row['shares_sold'],
+            'raised': row['raised'],
+            'investor_count': row['investor_count'],
+        }
+    return list(points.values())
@@ -0,0 +1,56 @@
+"""
+Reconcile a project's gallery with a new ordered list of image URLs.
+
+Instead of deleting every ProjectImage and inserting the list again, the
+current rows are diffed against the new list: rows whose URL is kept stay
+(their ids survive, and they are only rewritten if their position moved),
+new URLs are bulk-inserted and dropped ones are deleted in one statement.
+At most four queries run whatever the gallery size: one SELECT, one
+bulk UPDATE, one bulk INSERT and one DELETE, each only when needed.
+"""
+from collections import defaultdict, deque
+
+from .cache import bump_catalog_version
+from .models import ProjectImage
+
+
+def diff_images(existing, urls):
+    """
+    Plan the changes turning `existing` (ProjectImage rows) into `urls`, in order.
+
+    Returns (moved rows with their new `order` set, new unsaved rows, ids to
+    delete). Repeated URLs are matched to existing rows one to one, in their
+    current order.
+    """
+    available = defaultdict(deque)
+    for image in sorted(existing, key=lambda image: (image.order, image.id)):
+        available[image.image_url].append(image)
+
+    moved, created = [], []
+    for order, url in enumerate(urls):
+        if available[url]:
+            image = available[url].popleft()
+            if image.order != order:
+                image.order = order
+                moved.append(image)
+        else:
+            created.append(ProjectImage(image_url=url, order=order))
+    removed = [image.id for images in available.values() for image in images]
+    return moved, created, removed
+
+
+def sync_project_images(project, urls):
+    """Make `project`'s images exactly `urls` (in order) with a fixed number of queries."""
+    existing = list(ProjectImage.objects.filter(project=project).only('id', 'image_url', 'order'))
+    moved, created, removed = diff_images(existing, urls)
+    if removed:
+        ProjectImage.objects.filter(id__in=removed).delete()
+    if moved:
+        ProjectImage.objects.bulk_update(moved, ['order'])
+    if created:
+        for image in created:
+            image.project = project
+        ProjectImage.objects.bulk_create(created)
+    if moved or created or removed:
+        bump_catalog_version()
+    return moved, created, removed
@@ -0,0 +1,287 @@
+"""
+Streaming, idempotent bulk loader for project seed/import files.
+
+Records are read one at a time from a JSON array or NDJSON file (never the
+whole file), grouped into batches and upserted with a handful of queries per
+batch:
+
+- developers missing from the run's cache are fetched, then bulk-created;
+- projects are upserted with `bulk_create(update_conflicts=True)` keyed on
+  `Project.external_id` (the record's `id`), so re-running a file updates rows
+  in place instead of duplicating them;
+- each batch's images are replaced with one DELETE and one bulk INSERT.
+
+bulk_create skips Project.save() and post_save, so funding metrics are
+computed here, new projects get their ranking rows explicitly and the catalog
+cache is invalidated once at the end.
+"""
+import hashlib
+import json
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .cache import bump_catalog_version
+from .models import Project, ProjectImage
+from .ranking import ensure_rankings
+
+DEFAULT_BATCH_SIZE = 1000
+READ_CHUNK_SIZE = 1 << 16
+
+UPSERT_FIELDS = [
+    'title', 'developer', 'description', 'short_description', 'category', 'status',
+    'total_value', 'total_shares', 'shares_sold', 'duration_days', 'start_date', 'end_date',
+    'thumbnail_url', 'has_3d_model', 'model_3d_url', 'is_3d_public', 'has_restricted_fields',
+    'financial_projections', 'business_plan', 'team_details', 'legal_documents', 'risk_assessment',
+    'submitted_at', 'reviewed_at', 'review_note', 'updated_at',
+    *Project.FUNDING_METRIC_FIELDS,
+]
+
+
+class ImportFormatError(ValueError):
+    pass
+
+
+def parse_datetime_value(value):
+    if not value:
+        return None
+    if isinstance(value, str):
+        dt = parse_datetime(value)
+        if dt is None:
+            date_value = parse_date(value)
+            if date_value is None:
+                return None
+            dt = timezone.datetime.combine(date_value, timezone.datetime.min.time())
+        if timezone.is_naive(dt):
+            return timezone.make_aware(dt)
+        return dt
+    return None
+
+
+def iter_json_array(handle):
+    """Yield the elements of a top-level JSON array without loading the whole file."""
+    decoder = json.JSONDecoder()
+    buffer, position, started, eof = '', 0, False, False
+    while True:
+        if not eof:
+            chunk = handle.read(READ_CHUNK_SIZE)
+            eof = not chunk
+            buffer, position = buffer[position:] + chunk, 0
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if position >= len(buffer):
+                break
+            if not started:
+                if buffer[position] != '[':
+                    raise ImportFormatError('Invalid JSON: expected a list of projects')
+                started = True
+                position += 1
+                continue
+            if buffer[position] == ']':
+                return
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError as exc:
+                if eof:
+                    raise ImportFormatError(f'Invalid JSON at offset {exc.pos}: {exc.msg}') from exc
+                break  # The element continues in the next chunk.
+            if end == len(buffer) and not eof:
+                break  # A bare number or literal may continue in the next chunk.
+            position = end
+            yield item
+        if eof:
+            raise ImportFormatError('Invalid JSON: truncated list of projects' if started
+                                    else 'Invalid JSON: expected a list of projects')
+
+
+def iter_ndjson(handle):
+    for line_number, line in enumerate(handle, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as exc:
+            raise ImportFormatError(f'Invalid NDJSON on line {line_number}: {exc.msg}') from exc
+
+
+def sniff_format(handle):
+    """'json' if a seekable text handle starts with an array, else 'ndjson' (rewinds the handle)."""
+    start = handle.tell()
+    first = ''
+    while True:
+        char = handle.read(1)
+        if not char or not char.isspace():
+            first = char
+            break
+    handle.seek(start)
+    return 'json' if first == '[' else 'ndjson'
+
+
+def iter_records(handle, fmt='auto'):
+    """Records from a JSON array or NDJSON stream, one at a time."""
+    if fmt == 'auto':
+        fmt = sniff_format(handle)
+    return iter_json_array(handle) if fmt == 'json' else iter_ndjson(handle)
+
+
+def developer_identity(item):
+    key = item.get('developerId') or item.get('developerName') or 'developer'
+    return f"{key}@seed.local", item.get('developerName') or 'Developer'
+
+
+def external_id_for(item):
+    """The record's own `id`, or a stable digest of developer + title for records without one."""
+    if item.get('id') not in (None, ''):
+        return str(item['id'])
+    email, _ = developer_identity(item)
+    raw = f"{email}|{item.get('title') or 'Untitled Project'}"
+    return 'seed-' + hashlib.sha1(raw.encode('utf-8'), usedforsecurity=False).hexdigest()
+
+
+def build_project(item, external_id, developer_id, now):
+    restricted = item.get('restrictedFields') or {}
+    project = Project(
+        external_id=external_id,
+        developer_id=developer_id,
+        title=item.get('title') or 'Untitled Project',
+        description=item.get('description') or '',
+        short_description=item.get('shortDescription') or '',
+        category=item.get('category') or Project.Category.OTHER,
+        status=item.get('status') or Project.Status.DRAFT,
+        total_value=Decimal(str(item.get('totalValue') or 0)),
+        total_shares=int(item.get('totalShares') or 0),
+        shares_sold=int(item.get('sharesSold') or 0),
+        duration_days=int(item.get('durationDays') or 0),
+        start_date=parse_datetime_value(item.get('startDate')),
+        end_date=parse_datetime_value(item.get('endDate')),
+        thumbnail_url=item.get('thumbnailUrl'),
+        has_3d_model=bool(item.get('has3DModel')),
+        model_3d_url=item.get('model3DUrl'),
+        is_3d_public=bool(item.get('is3DPublic')),
+        has_restricted_fields=bool(item.get('hasRestrictedFields')),
+        financial_projections=restricted.get('financialProjections'),
+        business_plan=restricted.get('businessPlan'),
+        team_details=restricted.get('teamDetails'),
+        legal_documents=restricted.get('legalDocuments'),
+        risk_assessment=restricted.get('riskAssessment'),
+        submitted_at=parse_datetime_value(item.get('submittedAt')),
+        reviewed_at=parse_datetime_value(item.get('reviewedAt')),
+        review_note=item.get('reviewNote'),
+        created_at=now,
+        updated_at=now,
+    )
+    project.refresh_funding_metrics()
+    return project
+
+
+class ProjectImporter:
+    """Upserts project records in batches; counters accumulate across `load()` calls."""
+
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE):
+        self.batch_size = max(1, batch_size)
+        self.developer_ids = {}
+        self.created = 0
+        self.updated = 0
+        self.images = 0
+        self.skipped = 0
+
+    @property
+    def processed(self):
+        return self.created + self.updated
+
+    def load(self, records, progress=None):
+        batch = []
+        for item in records:
+            if not isinstance(item, dict):
+                self.skipped += 1
+                continue
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                self.load_batch(batch)
+                batch = []
+                if progress:
+                    progress(self)
+        if batch:
+            self.load_batch(batch)
+            if progress:
+                progress(self)
+        bump_catalog_version()
+
+    def resolve_developers(self, batch):
+        User = get_user_model()
+        missing = {}
+        for item in batch:
+            email, name = developer_identity(item)
+            if email not in self.developer_ids:
+                missing.setdefault(email, name)
+        if not missing:
+            return
+        existing = dict(User.objects.filter(email__in=missing).values_list('email', 'id'))
+        new_users = []
+        for email, name in missing.items():
+            if email not in existing:
+                first_name, _, last_name = name.partition(' ')
+                new_users.append(User(
+                    email=email, username=email, first_name=first_name, last_name=last_name,
+                    role='DEVELOPER', is_verified=True,
+                ))
+        if new_users:
+            User.objects.bulk_create(new_users, ignore_conflicts=True)
+            existing.update(User.objects.filter(email__in=[user.email for user in new_users]).values_list('email', 'id'))
+        self.developer_ids.update(existing)
+
+    def adopt_legacy_rows(self, projects):
+        """Give rows seeded before external IDs existed (matched on developer + title) their ID."""
+        wanted = {(project.developer_id, project.title): project.external_id for project in projects}
+        legacy = Project.objects.filter(
+            external_id__isnull=True, title__in={title for _, title in wanted},
+        ).only('id', 'developer_id', 'title')
+        adopted = []
+        for row in legacy:
+            external_id = wanted.pop((row.developer_id, row.title), None)
+            if external_id is not None:
+                row.external_id = external_id
+                adopted.append(row)
+        if adopted:
+            Project.objects.bulk_update(adopted, ['external_id'])
+
+    @transaction.atomic
+    def load_batch(self, batch):
+        self.resolve_developers(batch)
+        now = timezone.now()
+        projects = {}
+        images = {}
+        for item in batch:
+            external_id = external_id_for(item)
+            developer_id = self.developer_ids[developer_identity(item)[0]]
+            # Later duplicates in the same batch win, as they would row by row.
+            projects[external_id] = build_project(item, external_id, developer_id, now)
+            images[external_id] = [url for url in item.get('images') or [] if url]
+
+        self.adopt_legacy_rows(projects.values())
+        existing = set(Project.objects.filter(external_id__in=projects).values_list('external_id', flat=True))
+        Project.objects.bulk_create(
+            projects.values(),
+            update_conflicts=True,
+            unique_fields=['external_id'],
+            update_fields=UPSERT_FIELDS,
+        )
+        ids = dict(Project.objects.filter(external_id__in=projects).values_list('external_id', 'id'))
+
+        ProjectImage.objects.filter(project_id__in=ids.values()).delete()
+        new_images = [
+            ProjectImage(project_id=ids[external_id], image_url=url, order=order)
+            for external_id, urls in images.items()
+            for order, url in enumerate(urls)
+        ]
+        ProjectImage.objects.bulk_create(new_images, batch_size=self.batch_size)
+        ensure_rankings(ids[external_id] for external_id in projects if external_id not in existing)
+
+        self.updated += len(existing)
+        self.created += len(projects) - len(existing)
+        self.images += len(new_images)
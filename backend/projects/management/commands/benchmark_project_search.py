@@ -0,0 +1,126 @@
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+
+from projects.models import Project
+from projects.search import parse_terms, search_projects
+
+User = get_user_model()
+
+VOCABULARY = [
+    'solar', 'farm', 'energy', 'battery', 'storage', 'urban', 'housing', 'apartment', 'retail',
+    'market', 'clinic', 'health', 'hospital', 'telemedicine', 'software', 'platform', 'cloud',
+    'analytics', 'robotics', 'factory', 'textile', 'organic', 'dairy', 'orchard', 'irrigation',
+    'warehouse', 'logistics', 'delivery', 'restaurant', 'coffee', 'bakery', 'hotel', 'resort',
+    'wind', 'turbine', 'hydro', 'recycling', 'waste', 'water', 'school', 'education', 'training',
+    'fitness', 'pharmacy', 'biotech', 'laboratory', 'vehicle', 'charging', 'network', 'fiber',
+    'coworking', 'office', 'tower', 'estate', 'greenhouse', 'vertical', 'fishery', 'expansion',
+    'community', 'regional', 'modern', 'sustainable', 'affordable', 'premium', 'smart', 'digital',
+]
+CATEGORIES = [choice for choice, _ in Project.Category.choices]
+SYLLABLES = ['ka', 'lo', 'mi', 'ren', 'tos', 'va', 'qui', 'dor', 'zen', 'pha', 'lu', 'bri', 'sta', 'mon']
+
+
+class Command(BaseCommand):
+    help = 'Benchmark full-text project search against the old ILIKE SearchFilter on synthetic catalogs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[10_000, 100_000, 1_000_000])
+        parser.add_argument(
+            '--queries',
+            nargs='+',
+            default=['solar', 'solar farm', 'health clin', 'affordable urban housing'],
+        )
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per query (median is reported)')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        self.stdout.write(
+            f"Benchmarking on {connection.vendor}; synthetic rows are rolled back at the end."
+        )
+        self.stdout.write(f"{'rows':>10}  {'query':<28} {'ilike ms':>10} {'fts ms':>10} {'speedup':>8} {'hits':>8}")
+
+        with transaction.atomic():
+            developer = User.objects.create(
+                email='search-benchmark@seed.local',
+                username='search-benchmark@seed.local',
+                role='DEVELOPER',
+            )
+            self.filler = [
+                ''.join(rng.choices(SYLLABLES, k=rng.randint(2, 4))) for _ in range(5000)
+            ]
+            loaded = 0
+            for size in sorted(options['sizes']):
+                loaded = self.grow_catalog(developer, loaded, size, options['batch_size'], rng)
+                with connection.cursor() as cursor:
+                    cursor.execute('ANALYZE projects')
+
+                base = Project.objects.filter(status=Project.Status.APPROVED)
+                for query in options['queries']:
+                    ilike_ms, _ = self.time_page(self.ilike_search(base, query).order_by('-created_at'), options['repeat'])
+                    fts_ms, hits = self.time_page(search_projects(base, query).order_by('-search_rank'), options['repeat'])
+                    speedup = ilike_ms / fts_ms if fts_ms else float('inf')
+                    self.stdout.write(
+                        f"{size:>10}  {query[:28]:<28} {ilike_ms:>10.2f} {fts_ms:>10.2f} {speedup:>7.1f}x {hits:>8}"
+                    )
+
+            transaction.set_rollback(True)
+
+    def ilike_search(self, queryset, query):
+        """Equivalent of DRF SearchFilter over the three text columns."""
+        for term in parse_terms(query):
+            queryset = queryset.filter(
+                Q(title__icontains=term) | Q(short_description__icontains=term) | Q(description__icontains=term)
+            )
+        return queryset
+
+    def time_page(self, queryset, repeat):
+        """Median time to fetch a first page of 20 rows plus its total count."""
+        timings = []
+        hits = 0
+        for _ in range(max(1, repeat)):
+            started = time.perf_counter()
+            list(queryset[:20])
+            hits = queryset.count()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings), hits
+
+    def words(self, rng, low, high):
+        """Mostly filler vocabulary with ~10% domain words, so queries stay selective."""
+        return ' '.join(
+            rng.choice(VOCABULARY) if rng.random() < 0.1 else rng.choice(self.filler)
+            for _ in range(rng.randint(low, high))
+        )
+
+    def grow_catalog(self, developer, loaded, target, batch_size, rng):
+        started = time.perf_counter()
+        while loaded < target:
+            batch = []
+            for _ in range(min(batch_size, target - loaded)):
+                total_shares = rng.choice([100, 500, 1000, 5000, 10000])
+                project = Project(
+                    developer=developer,
+                    title=self.words(rng, 3, 5).title(),
+                    short_description=self.words(rng, 10, 15),
+                    description=self.words(rng, 40, 80),
+                    category=rng.choice(CATEGORIES),
+                    status=Project.Status.APPROVED,
+                    total_value=Decimal(total_shares * rng.randint(10, 500)),
+                    total_shares=total_shares,
+                    shares_sold=rng.randint(0, total_shares),
+                    duration_days=rng.choice([30, 60, 90, 180, 365]),
+                )
+                project.refresh_funding_metrics()
+                batch.append(project)
+            Project.objects.bulk_create(batch)
+            loaded += len(batch)
+        self.stdout.write(f"Loaded {loaded} synthetic projects ({time.perf_counter() - started:.1f}s)")
+        return loaded
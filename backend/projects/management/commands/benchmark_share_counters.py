@@ -0,0 +1,96 @@
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, connections, transaction
+
+from projects.models import Project
+from projects.shares import configure_counters, live_shares_sold, sell_shares
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Benchmark contended share sales on one project with and without sharded counters'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=16, help='Concurrent writers (threads)')
+        parser.add_argument('--sales', type=int, default=100, help='Sales per writer')
+        parser.add_argument('--slots', nargs='+', type=int, default=[0, 4, 16], help='Counter slots per run (0 = off)')
+        parser.add_argument(
+            '--hold-ms',
+            type=float,
+            default=5.0,
+            help='Time each sale stays in its transaction, standing in for the rest of a completion',
+        )
+
+    def handle(self, *args, **options):
+        workers, sales = max(1, options['workers']), max(1, options['sales'])
+        self.stdout.write(
+            f"Benchmarking on {connection.vendor}: {workers} writers x {sales} sales, "
+            f"{options['hold_ms']:.1f} ms per transaction; synthetic rows are deleted at the end."
+        )
+        if connection.vendor == 'sqlite':
+            self.stdout.write('SQLite serialises all writers on the database file, so slots cannot help there.')
+        self.stdout.write(f"{'slots':>6} {'seconds':>9} {'sales/s':>10} {'sold':>8} {'lost':>6}")
+
+        developer = User.objects.create(
+            email='shares-benchmark@seed.local', username='shares-benchmark@seed.local', role='DEVELOPER',
+        )
+        try:
+            for slots in options['slots']:
+                self.run(developer, slots, workers, sales, options['hold_ms'] / 1000)
+        finally:
+            developer.delete()
+
+    def run(self, developer, slots, workers, sales, hold):
+        project = Project.objects.create(
+            developer=developer,
+            title=f'Share counter benchmark ({slots} slots)',
+            description='Synthetic',
+            short_description='Synthetic',
+            status=Project.Status.APPROVED,
+            total_value=workers * sales * 10,
+            total_shares=workers * sales,
+            duration_days=30,
+        )
+        # Every sale completes a reserved investment, as InvestmentCompleteView does.
+        Project.objects.filter(pk=project.pk).update(reserved_shares=project.total_shares)
+        configure_counters(project, slots)
+        barrier = threading.Barrier(workers + 1)
+        completed, errors = [], []
+
+        def writer():
+            mine = Project.objects.get(pk=project.pk)
+            done = 0
+            barrier.wait()
+            try:
+                for _ in range(sales):
+                    with transaction.atomic():
+                        sell_shares(mine, 1, reserved=True)
+                        time.sleep(hold)
+                    done += 1
+            except Exception as exc:  # Reported below with the run.
+                errors.append(exc)
+            finally:
+                completed.append(done)
+                connections.close_all()
+
+        threads = [threading.Thread(target=writer) for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+        barrier.wait()
+        started = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        project.refresh_from_db()
+        sold = live_shares_sold(project)
+        self.stdout.write(
+            f"{slots:>6} {elapsed:>9.2f} {sum(completed) / elapsed:>10,.0f} {sold:>8} {sum(completed) - sold:>6}"
+        )
+        for exc in errors[:3]:
+            self.stderr.write(f'  writer failed: {exc!r}')
+        project.delete()
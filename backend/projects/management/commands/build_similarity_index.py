@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from projects.similarity import DEFAULT_NEIGHBORS, build_index, get_index_dir, refresh_index
+
+
+class Command(BaseCommand):
+    help = 'Build (or incrementally refresh) the similar-projects index served by /api/projects/<id>/similar/'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help='Only fold in projects changed since the last build (falls back to a full build when needed)',
+        )
+        parser.add_argument('--neighbors', type=int, default=DEFAULT_NEIGHBORS, help='Neighbours stored per project')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        build = refresh_index if options['incremental'] else build_index
+        result = build(k=options['neighbors'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{result['mode']} build: {result['indexed']} projects indexed, {result['updated']} updated, "
+            f"{result['removed']} removed in {time.perf_counter() - started:.2f}s ({get_index_dir()})"
+        ))
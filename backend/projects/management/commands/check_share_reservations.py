@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from projects.models import Project
+from projects.shares import reservation_drift
+
+
+class Command(BaseCommand):
+    help = "Compare each project's reserved_shares with its in-progress investments (one query)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Overwrite drifted projects with the expected value')
+
+    def handle(self, *args, **options):
+        drifted = list(reservation_drift())
+        for project_id, reserved, expected in drifted:
+            self.stdout.write(f'Project {project_id}: reserved_shares={reserved}, investments hold {expected}')
+            if options['fix']:
+                Project.objects.filter(pk=project_id).update(reserved_shares=expected)
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS('No reservation drift'))
+        elif options['fix']:
+            self.stdout.write(self.style.SUCCESS(f'Fixed {len(drifted)} projects'))
+        else:
+            self.stdout.write(self.style.WARNING(f'{len(drifted)} projects drifted (rerun with --fix)'))
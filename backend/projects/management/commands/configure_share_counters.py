@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from projects.models import Project
+from projects.shares import MAX_COUNTER_SLOTS, configure_counters
+
+
+class Command(BaseCommand):
+    help = 'Switch a project to sharded share counters (or back, with --slots 0)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('project_id', type=int)
+        parser.add_argument(
+            '--slots',
+            type=int,
+            required=True,
+            help=f'Counter slots (0 disables sharding, at most {MAX_COUNTER_SLOTS})',
+        )
+
+    def handle(self, *args, **options):
+        if not 0 <= options['slots'] <= MAX_COUNTER_SLOTS:
+            raise CommandError(f'--slots must be between 0 and {MAX_COUNTER_SLOTS}')
+        try:
+            project = Project.objects.get(pk=options['project_id'])
+        except Project.DoesNotExist:
+            raise CommandError(f"Project {options['project_id']} not found")
+        configure_counters(project, options['slots'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{project.title}: {project.counter_slots} share counter slots, {project.shares_sold} shares sold"
+        ))
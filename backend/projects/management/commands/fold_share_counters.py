@@ -0,0 +1,16 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from projects.shares import fold_all_counters
+
+
+class Command(BaseCommand):
+    help = 'Fold the share counters of sharded projects back into shares_sold (run on a schedule)'
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        count = fold_all_counters()
+        self.stdout.write(self.style.SUCCESS(
+            f"Folded share counters of {count} projects in {time.perf_counter() - started:.2f}s"
+        ))
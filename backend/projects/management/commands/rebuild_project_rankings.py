@@ -0,0 +1,16 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from projects.ranking import rebuild_rankings
+
+
+class Command(BaseCommand):
+    help = 'Recompute every trending score from investments and favorites (after changing weights or half-life)'
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        count = rebuild_rankings()
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {count} project rankings in {time.perf_counter() - started:.2f}s"
+        ))
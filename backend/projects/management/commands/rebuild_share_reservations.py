@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from projects.shares import rebuild_reservations
+
+
+class Command(BaseCommand):
+    help = 'Recompute reserved_shares of every project (or the given ones) from the project ledger'
+
+    def add_arguments(self, parser):
+        parser.add_argument('project_ids', nargs='*', type=int, help='Only these projects')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        changed = rebuild_reservations(options['project_ids'] or None)
+        for project_id, (old, new) in sorted(changed.items()):
+            self.stdout.write(f'Project {project_id}: reserved_shares {old} -> {new}')
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt reservations, {len(changed)} projects changed in {time.perf_counter() - started:.2f}s"
+        ))
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from projects.funding import DEFAULT_BATCH_SIZE, rollup_funding_snapshots
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily funding snapshots of projects from the investment ledger'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since',
+            help='Only rebuild projects with ledger entries on or after this date (YYYY-MM-DD)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help='Projects rebuilt per transaction',
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            try:
+                since = parse_date(options['since'])
+            except ValueError:
+                since = None
+            if since is None:
+                raise CommandError('--since must be a date (YYYY-MM-DD)')
+        started = time.perf_counter()
+        projects, rows = rollup_funding_snapshots(since=since, batch_size=max(1, options['batch_size']))
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {rows} funding snapshots for {projects} projects in {time.perf_counter() - started:.2f}s"
+        ))
@@ -0,0 +1,122 @@
+"""
+Per-viewer state on project cards, and bulk favorite/compare mutations.
+
+ProjectListSerializer exposes `is_favorited`, `is_compared`, `my_access_status`
+and `my_position` (shares held through COMPLETED investments). They are
+computed with one correlated subquery each (`with_viewer_state`), never per row.
+
+The public catalog list is cached and shared between viewers, so there the
+flags are not part of the cached page; `overlay_viewer_state` fills them in
+for the page's project IDs with one extra query per request instead.
+"""
+from django.db import connection, transaction
+from django.db.models import Exists, IntegerField, OuterRef, Subquery, Sum
+from django.utils import timezone
+
+from access_requests.models import AccessRequest
+from investments.models import Investment
+
+from . import ranking
+from .cache import bump_membership_version
+from .models import Compare, Favorite, Project
+
+MAX_BULK_PROJECTS = 100
+VIEWER_STATE_FIELDS = ('is_favorited', 'is_compared', 'my_access_status', 'my_position')
+
+
+def viewer_state_annotations(user):
+    if not user or not user.is_authenticated:
+        return {}
+    position = (
+        Investment.objects.filter(project=OuterRef('pk'), investor=user, status=Investment.Status.COMPLETED)
+        .order_by()
+        .values('project')
+        .annotate(total=Sum('shares'))
+        .values('total')
+    )
+    return {
+        'is_favorited': Exists(Favorite.objects.filter(project=OuterRef('pk'), user=user)),
+        'is_compared': Exists(Compare.objects.filter(project=OuterRef('pk'), user=user)),
+        'my_access_status': Subquery(
+            AccessRequest.objects.filter(project=OuterRef('pk'), investor=user).values('status')[:1]
+        ),
+        'my_position': Subquery(position, output_field=IntegerField()),
+    }
+
+
+def with_viewer_state(queryset, user):
+    """Annotate the viewer's favorite/compare/access/position state (no-op for guests)."""
+    annotations = viewer_state_annotations(user)
+    return queryset.annotate(**annotations) if annotations else queryset
+
+
+def overlay_viewer_state(results, user):
+    """Fill the viewer's state into already-serialized project dicts, in one query."""
+    if not results or not user or not user.is_authenticated:
+        return results
+    states = {
+        row['id']: row
+        for row in with_viewer_state(Project.objects.filter(id__in=[item['id'] for item in results]), user)
+        .order_by()
+        .values('id', *VIEWER_STATE_FIELDS)
+    }
+    for item in results:
+        state = states.get(item['id'])
+        if state:
+            item.update({field: state[field] for field in VIEWER_STATE_FIELDS})
+            item['my_position'] = item['my_position'] or 0
+    return results
+
+
+class BulkMembership:
+    """Add/remove many projects to a user's favorites (or compare list) in one statement each."""
+
+    def __init__(self, model, user, record_ranking=False):
+        self.model = model
+        self.user = user
+        self.record_ranking = record_ranking
+
+    def insert(self, project_ids, now):
+        """INSERT ... ON CONFLICT DO NOTHING RETURNING: the project IDs this call actually added."""
+        meta = self.model._meta
+        quote = connection.ops.quote_name
+        columns = ', '.join(quote(meta.get_field(name).column) for name in ('user', 'project', 'created_at'))
+        conflict = ', '.join(quote(meta.get_field(name).column) for name in ('user', 'project'))
+        created_at = meta.get_field('created_at').get_db_prep_value(now, connection)
+        params = [value for project_id in project_ids for value in (self.user.pk, project_id, created_at)]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {quote(meta.db_table)} ({columns}) VALUES {", ".join(["(%s, %s, %s)"] * len(project_ids))} '
+                f'ON CONFLICT ({conflict}) DO NOTHING RETURNING {quote(meta.get_field("project").column)}',
+                params,
+            )
+            return sorted(project_id for project_id, in cursor.fetchall())
+
+    @transaction.atomic
+    def add(self, project_ids):
+        known_ids = list(Project.objects.filter(id__in=project_ids).order_by('id').values_list('id', flat=True))
+        if not known_ids:
+            return []
+        # Rows that already exist, or that a concurrent request inserts first,
+        # are skipped by the INSERT and not returned, so they are never counted twice.
+        now = timezone.now()
+        added = self.insert(known_ids, now)
+        if not added:
+            return []
+        if self.record_ranking:
+            ranking.record_events((project_id, 'favorite', now, False) for project_id in added)
+        bump_membership_version(self.user.pk)
+        return added
+
+    @transaction.atomic
+    def remove(self, project_ids):
+        # Locked first, so a concurrent removal of the same rows waits and then finds nothing to remove.
+        rows = self.model.objects.filter(user=self.user, project_id__in=project_ids).select_for_update()
+        removed = list(rows.order_by('project_id').values_list('id', 'project_id', 'created_at'))
+        if not removed:
+            return []
+        self.model.objects.filter(id__in=[row_id for row_id, _, _ in removed]).delete()
+        if self.record_ranking:
+            ranking.record_events((project_id, 'favorite', created_at, True) for _, project_id, created_at in removed)
+        bump_membership_version(self.user.pk)
+        return [project_id for _, project_id, _ in removed]
@@ -0,0 +1,67 @@
+# Generated by Django 6.0 on 2026-10-17 03:34
+
+from django.db import migrations, models
+from django.db.models import Case, F, FloatField, Value, When
+from django.db.models.functions import Cast
+
+
+def backfill_funding_metrics(apps, schema_editor):
+    Project = apps.get_model('projects', 'Project')
+    Project.objects.update(
+        per_share_price_value=Case(
+            When(total_shares__gt=0, then=Cast('total_value', FloatField()) / F('total_shares')),
+            default=Value(0.0),
+            output_field=FloatField(),
+        ),
+        funding_progress_value=Case(
+            When(total_shares__gt=0, then=F('shares_sold') * 100.0 / F('total_shares')),
+            default=Value(0.0),
+            output_field=FloatField(),
+        ),
+        remaining_shares_value=Case(
+            When(total_shares__gt=F('shares_sold'), then=F('total_shares') - F('shares_sold')),
+            default=Value(0),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0009_alter_projecteditrequest_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='funding_progress_value',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='per_share_price_value',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='remaining_shares_value',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_funding_metrics, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['status', '-created_at'], name='projects_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['status', 'funding_progress_value'], name='projects_status_progress_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['status', 'per_share_price_value'], name='projects_status_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['status', 'remaining_shares_value'], name='projects_status_remaining_idx'),
+        ),
+    ]
@@ -0,0 +1,83 @@
+from django.db import migrations
+
+# The DDL is inlined (not imported from projects.search) so this migration
+# keeps creating the same structures whatever later happens to that module.
+
+POSTGRES_INSTALL = [
+    """
+    ALTER TABLE projects ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english'::regconfig, coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english'::regconfig, coalesce(short_description, '')), 'B') ||
+        setweight(to_tsvector('english'::regconfig, coalesce(description, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS projects_search_vector_idx ON projects USING gin (search_vector)",
+]
+POSTGRES_UNINSTALL = [
+    "DROP INDEX IF EXISTS projects_search_vector_idx",
+    "ALTER TABLE projects DROP COLUMN IF EXISTS search_vector",
+]
+
+SQLITE_INSTALL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS projects_search USING fts5(
+        title, short_description, description,
+        content='projects', content_rowid='id', tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS projects_search_ai AFTER INSERT ON projects BEGIN
+        INSERT INTO projects_search(rowid, title, short_description, description)
+        VALUES (new.id, new.title, new.short_description, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS projects_search_ad AFTER DELETE ON projects BEGIN
+        INSERT INTO projects_search(projects_search, rowid, title, short_description, description)
+        VALUES ('delete', old.id, old.title, old.short_description, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS projects_search_au AFTER UPDATE OF title, short_description, description ON projects BEGIN
+        INSERT INTO projects_search(projects_search, rowid, title, short_description, description)
+        VALUES ('delete', old.id, old.title, old.short_description, old.description);
+        INSERT INTO projects_search(rowid, title, short_description, description)
+        VALUES (new.id, new.title, new.short_description, new.description);
+    END
+    """,
+    "INSERT INTO projects_search(projects_search) VALUES ('rebuild')",
+]
+SQLITE_UNINSTALL = [
+    "DROP TRIGGER IF EXISTS projects_search_ai",
+    "DROP TRIGGER IF EXISTS projects_search_ad",
+    "DROP TRIGGER IF EXISTS projects_search_au",
+    "DROP TABLE IF EXISTS projects_search",
+]
+
+STATEMENTS = {
+    'postgresql': (POSTGRES_INSTALL, POSTGRES_UNINSTALL),
+    'sqlite': (SQLITE_INSTALL, SQLITE_UNINSTALL),
+}
+
+
+def forwards(apps, schema_editor):
+    install, _ = STATEMENTS.get(schema_editor.connection.vendor, ([], []))
+    for statement in install:
+        schema_editor.execute(statement)
+
+
+def backwards(apps, schema_editor):
+    _, uninstall = STATEMENTS.get(schema_editor.connection.vendor, ([], []))
+    for statement in uninstall:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0010_project_funding_metrics'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 6.0 on 2026-10-17 03:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def create_rankings(apps, schema_editor):
+    # Zero scores; `manage.py rebuild_project_rankings` fills in the history.
+    Project = apps.get_model('projects', 'Project')
+    ProjectRanking = apps.get_model('projects', 'ProjectRanking')
+    ProjectRanking.objects.bulk_create(
+        [ProjectRanking(project_id=project_id) for project_id in Project.objects.values_list('id', flat=True)],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0011_project_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectRanking',
+            fields=[
+                ('project', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ranking', serialize=False, to='projects.project')),
+                ('score', models.FloatField(default=0.0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'project_rankings',
+                'indexes': [models.Index(fields=['-score', '-project'], name='project_rankings_score_idx')],
+            },
+        ),
+        migrations.RunPython(create_rankings, migrations.RunPython.noop),
+    ]
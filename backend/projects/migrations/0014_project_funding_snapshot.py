@@ -0,0 +1,31 @@
+# Generated by Django 6.0 on 2026-10-17 04:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0013_project_external_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectFundingSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('shares_sold', models.PositiveIntegerField(default=0)),
+                ('raised', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('investor_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='funding_snapshots', to='projects.project')),
+            ],
+            options={
+                'db_table': 'project_funding_snapshots',
+                'ordering': ['project', 'day'],
+                'constraints': [models.UniqueConstraint(fields=('project', 'day'), name='project_funding_snapshot_day')],
+            },
+        ),
+    ]
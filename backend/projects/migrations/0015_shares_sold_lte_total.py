@@ -0,0 +1,30 @@
+# Generated by Django 6.0 on 2026-10-17 04:25
+
+from django.db import migrations, models
+
+
+def clamp_oversold(apps, schema_editor):
+    # Rows oversold before the constraint existed are capped at total_shares.
+    Project = apps.get_model('projects', 'Project')
+    Project.objects.filter(shares_sold__gt=models.F('total_shares')).update(
+        shares_sold=models.F('total_shares'),
+        remaining_shares_value=0,
+        funding_progress_value=models.Case(
+            models.When(total_shares__gt=0, then=models.Value(100.0)), default=models.Value(0.0),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0014_project_funding_snapshot'),
+    ]
+
+    operations = [
+        migrations.RunPython(clamp_oversold, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='project',
+            constraint=models.CheckConstraint(condition=models.Q(('shares_sold__lte', models.F('total_shares'))), name='projects_shares_sold_lte_total'),
+        ),
+    ]
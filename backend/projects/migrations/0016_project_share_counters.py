@@ -0,0 +1,34 @@
+# Generated by Django 6.0 on 2026-10-17 04:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0015_shares_sold_lte_total'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='counter_slots',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.CreateModel(
+            name='ProjectShareCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slot', models.PositiveSmallIntegerField()),
+                ('sold', models.IntegerField(default=0)),
+                ('capacity', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='share_counters', to='projects.project')),
+            ],
+            options={
+                'db_table': 'project_share_counters',
+                'constraints': [models.UniqueConstraint(fields=('project', 'slot'), name='project_share_counter_slot'), models.CheckConstraint(condition=models.Q(('capacity__gte', 0)), name='share_counter_capacity_gte_0')],
+            },
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 6.0 on 2026-10-17 04:39
+
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def fold_and_reserve(apps, schema_editor):
+    # Slots lose their capacity, so fold their sales first; then reserve the
+    # shares of every investment still in progress.
+    Project = apps.get_model('projects', 'Project')
+    ProjectShareCounter = apps.get_model('projects', 'ProjectShareCounter')
+    Investment = apps.get_model('investments', 'Investment')
+    folded = ProjectShareCounter.objects.values('project').annotate(total=Sum('sold')).values_list('project', 'total')
+    for project_id, sold in folded:
+        project = Project.objects.get(pk=project_id)
+        project.shares_sold = min(project.total_shares, max(0, project.shares_sold + (sold or 0)))
+        project.remaining_shares_value = project.total_shares - project.shares_sold
+        project.funding_progress_value = (
+            project.shares_sold / project.total_shares * 100 if project.total_shares else 0
+        )
+        project.save(update_fields=['shares_sold', 'remaining_shares_value', 'funding_progress_value'])
+    ProjectShareCounter.objects.update(sold=0)
+
+    reserved = (
+        Investment.objects.filter(status__in=['REQUESTED', 'APPROVED', 'PROCESSING'])
+        .values('project')
+        .annotate(total=Sum('shares'))
+        .values_list('project', 'total')
+    )
+    for project_id, shares in reserved:
+        Project.objects.filter(pk=project_id).update(reserved_shares=shares)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0016_project_share_counters'),
+        ('investments', '0006_investment_updated_at'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='projectsharecounter',
+            name='share_counter_capacity_gte_0',
+        ),
+        migrations.RemoveField(
+            model_name='projectsharecounter',
+            name='capacity',
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='reserved_shares',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='projectsharecounter',
+            name='settled',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(fold_and_reserve, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0 on 2026-10-17 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0017_project_reserved_shares'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RankingEpoch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('epoch', models.FloatField()),
+            ],
+            options={
+                'db_table': 'project_ranking_epoch',
+            },
+        ),
+    ]
@@ -1,7 +1,21 @@
 from django.db import models
+from django.db.models import OuterRef, Subquery
 from django.conf import settings
 
 
+class ProjectQuerySet(models.QuerySet):
+    def for_listing(self):
+        """
+        Load what ProjectListSerializer reads in the same query: the developer
+        (joined) and the first gallery image URL (`first_image_url`, a subquery),
+        so a page costs the same number of queries whatever its size.
+        """
+        first_image = ProjectImage.objects.filter(project=OuterRef('pk')).order_by('order', 'id')
+        return self.select_related('developer').annotate(
+            first_image_url=Subquery(first_image.values('image_url')[:1])
+        )
+
+
 class Project(models.Model):
     """Project model for crowdfunding projects."""
     
@@ -26,6 +40,8 @@ class Project(models.Model):
     
     # Basic Info
     title = models.CharField(max_length=255)
+    # Stable ID from an external source (seed/import files); upserts key on it.
+    external_id = models.CharField(max_length=100, unique=True, null=True, blank=True, editable=False)
     description = models.TextField()
     short_description = models.CharField(max_length=500)
     category = models.CharField(max_length=50, choices=Category.choices, default=Category.OTHER)
@@ -42,6 +58,16 @@ class Project(models.Model):
     total_value = models.DecimalField(max_digits=15, decimal_places=2)
     total_shares = models.PositiveIntegerField()
     shares_sold = models.PositiveIntegerField(default=0)
+
+    # Stored funding metrics (derived from the financial fields in save())
+    per_share_price_value = models.FloatField(default=0, editable=False)
+    funding_progress_value = models.FloatField(default=0, editable=False)
+    remaining_shares_value = models.PositiveIntegerField(default=0, editable=False)
+    # Shares held by REQUESTED/APPROVED/PROCESSING investments (projects/shares.py).
+    reserved_shares = models.PositiveIntegerField(default=0, editable=False)
+    # Sharded sales (projects/shares.py): 0 sells straight from shares_sold,
+    # N > 0 spreads sales over N ProjectShareCounter rows folded back later.
+    counter_slots = models.PositiveSmallIntegerField(default=0, editable=False)
     
     # Duration
     duration_days = models.PositiveIntegerField()
@@ -69,12 +95,50 @@ class Project(models.Model):
     reviewed_at = models.DateTimeField(null=True, blank=True)
     review_note = models.TextField(blank=True, null=True)
     
+    objects = ProjectQuerySet.as_manager()
+
+    FUNDING_SOURCE_FIELDS = frozenset({'total_value', 'total_shares', 'shares_sold'})
+    FUNDING_METRIC_FIELDS = ('per_share_price_value', 'funding_progress_value', 'remaining_shares_value')
+
     class Meta:
         db_table = 'projects'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', '-created_at'], name='projects_status_created_idx'),
+            models.Index(fields=['status', 'funding_progress_value'], name='projects_status_progress_idx'),
+            models.Index(fields=['status', 'per_share_price_value'], name='projects_status_price_idx'),
+            models.Index(fields=['status', 'remaining_shares_value'], name='projects_status_remaining_idx'),
+        ]
+        constraints = [
+            # Share sales go through projects/shares.py; this stops any writer overselling.
+            models.CheckConstraint(
+                condition=models.Q(shares_sold__lte=models.F('total_shares')),
+                name='projects_shares_sold_lte_total',
+            ),
+        ]
     
     def __str__(self):
         return self.title
+
+    def save(self, *args, **kwargs):
+        """
+        Keep the stored funding metrics in step with the financial fields, and
+        bump updated_at on partial saves too (it validates conditional GETs).
+        """
+        self.refresh_funding_metrics()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields) | {'updated_at'}
+            if self.FUNDING_SOURCE_FIELDS.intersection(update_fields):
+                update_fields |= set(self.FUNDING_METRIC_FIELDS)
+            kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
+
+    def refresh_funding_metrics(self):
+        """Recalculate the stored metrics (needed before bulk_create/bulk_update)."""
+        self.per_share_price_value = self.per_share_price
+        self.funding_progress_value = self.funding_progress
+        self.remaining_shares_value = max(0, self.remaining_shares)
     
     @property
     def per_share_price(self):
@@ -138,6 +202,78 @@ class Compare(models.Model):
         unique_together = ['user', 'project']
 
 
+class ProjectRanking(models.Model):
+    """
+    Trending score per project, kept current by investment and favorite events.
+
+    See projects/ranking.py for how the time-decayed score is stored so that
+    ordering by it needs no recomputation.
+    """
+    project = models.OneToOneField(Project, on_delete=models.CASCADE, primary_key=True, related_name='ranking')
+    score = models.FloatField(default=0.0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'project_rankings'
+        indexes = [
+            models.Index(fields=['-score', '-project'], name='project_rankings_score_idx'),
+        ]
+
+
+class RankingEpoch(models.Model):
+    """
+    The moment (Unix time) stored trending scores are scaled against; one row.
+    Moved forward by projects/ranking.py before the scale factor gets too large.
+    """
+    epoch = models.FloatField()
+
+    class Meta:
+        db_table = 'project_ranking_epoch'
+
+
+class ProjectShareCounter(models.Model):
+    """
+    One slot of a sharded Project.shares_sold (see projects/shares.py).
+
+    Since the last fold, `sold` is the net number of shares sold through the
+    slot and `settled` the reserved shares those sales consumed, so the live
+    figures are `shares_sold + sum(sold)` and `reserved_shares - sum(settled)`.
+    """
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='share_counters')
+    slot = models.PositiveSmallIntegerField()
+    sold = models.IntegerField(default=0)
+    settled = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'project_share_counters'
+        constraints = [
+            models.UniqueConstraint(fields=['project', 'slot'], name='project_share_counter_slot'),
+        ]
+
+
+class ProjectFundingSnapshot(models.Model):
+    """
+    End-of-day funding state of a project (one row per day with activity).
+
+    Written by projects.funding: incrementally on investment completion and
+    release, and in bulk by `manage.py rollup_funding_snapshots`.
+    """
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='funding_snapshots')
+    day = models.DateField()
+    shares_sold = models.PositiveIntegerField(default=0)
+    raised = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    investor_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'project_funding_snapshots'
+        ordering = ['project', 'day']
+        constraints = [
+            models.UniqueConstraint(fields=['project', 'day'], name='project_funding_snapshot_day'),
+        ]
+
+
 class ProjectEditRequest(models.Model):
     """Edit requests for published projects."""
 
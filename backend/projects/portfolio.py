@@ -0,0 +1,70 @@
+"""
+Developer portfolio: every project of a developer with its funding and demand
+figures, plus the developer dashboard totals, from one grouped query.
+
+Investment figures are conditional aggregates over a single join to
+investments (grouped by project). Access requests are counted with a
+correlated subquery so they do not multiply the investment rows, and the
+portfolio-wide distinct investor count (which cannot be summed from
+per-project counts) rides along as a scalar subquery.
+"""
+from django.db.models import Count, ExpressionWrapper, F, FloatField, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from access_requests.models import AccessRequest
+from investments.models import Investment
+
+from .models import Project
+
+
+def portfolio_queryset(developer):
+    completed = Q(investments__status=Investment.Status.COMPLETED)
+    access_requests = (
+        AccessRequest.objects.filter(project=OuterRef('pk'))
+        .order_by()
+        .values('project')
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    portfolio_investors = (
+        Investment.objects.filter(project__developer=developer, status=Investment.Status.COMPLETED)
+        .order_by()
+        .values('project__developer')
+        .annotate(total=Count('investor', distinct=True))
+        .values('total')
+    )
+    return (
+        Project.objects.for_listing()
+        .filter(developer=developer)
+        .annotate(
+            raised_amount=ExpressionWrapper(F('shares_sold') * F('per_share_price_value'), output_field=FloatField()),
+            investor_count=Count('investments__investor', filter=completed, distinct=True),
+            pending_request_count=Count(
+                'investments', filter=Q(investments__status=Investment.Status.REQUESTED), distinct=True,
+            ),
+            access_request_count=Coalesce(Subquery(access_requests, output_field=IntegerField()), Value(0)),
+            portfolio_investors=Coalesce(Subquery(portfolio_investors, output_field=IntegerField()), Value(0)),
+        )
+        .order_by('-created_at', '-id')
+    )
+
+
+def portfolio_totals(projects):
+    """Dashboard totals for a developer, folded from the evaluated portfolio rows."""
+    return {
+        'total_projects': len(projects),
+        'active_projects': sum(1 for project in projects if project.status == Project.Status.APPROVED),
+        'completed_projects': sum(1 for project in projects if project.shares_sold == project.total_shares),
+        'archived_projects': sum(1 for project in projects if project.status == Project.Status.ARCHIVED),
+        'total_funds_secured': sum(project.raised_amount or 0 for project in projects),
+        'total_investors': projects[0].portfolio_investors if projects else 0,
+        'total_shares_sold': sum(project.shares_sold for project in projects),
+        'pending_requests': sum(project.pending_request_count for project in projects),
+        'access_requests': sum(project.access_request_count for project in projects),
+    }
+
+
+def developer_portfolio(developer):
+    """(projects with aggregates, dashboard totals) in one query."""
+    projects = list(portfolio_queryset(developer))
+    return projects, portfolio_totals(projects)
@@ -0,0 +1,251 @@
+"""
+Trending ("hot projects") ranking, maintained incrementally.
+
+Every investment request, completion and favorite adds a weighted amount to
+the project's ProjectRanking.score; withdrawals/refunds/reversals of a
+completed investment and favorite removals subtract exactly what the
+original event added. Scores decay with a half-life of
+TRENDING_HALF_LIFE_HOURS, but instead of rewriting every row as time passes,
+each event is stored pre-scaled by 2 ** (age of the event relative to the
+ranking epoch / half-life). Newer events therefore weigh exponentially more,
+the relative order of all scores at any moment equals the order of their
+decayed values, and `ORDER BY score DESC` (index-backed) is the trending order.
+
+Updates are single `UPDATE ... SET score = score + delta` statements, so
+concurrent events never lose increments. `rebuild_project_rankings` recomputes
+every score from the Investment and Favorite tables (after changing the
+weights or the half-life, or to repair drift from deletions that bypass the
+views).
+
+The epoch is stored (RankingEpoch) rather than fixed, because the scale
+factor doubles every half-life: once an event is more than MAX_EXPONENT
+half-lives past it, `rebase_rankings` rescales every score to an epoch of
+now in one UPDATE. Rebuilds also store an epoch of now. Each process caches
+the epoch, so deltas are computed against the epoch last read and converted
+to the stored epoch inside the UPDATE; a stale cache costs nothing.
+"""
+from collections import defaultdict
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core import checks
+from django.db import connection, transaction
+from django.db.models import Case, F, FloatField, Subquery, Value, When
+from django.db.models.functions import Coalesce, Power
+from django.utils import timezone
+
+from investments.models import Investment
+
+from .cache import bump_ranking_version
+from .models import Favorite, Project, ProjectRanking, RankingEpoch
+
+# Scale of scores written before the epoch was stored.
+DEFAULT_EPOCH = datetime(2026, 1, 1, tzinfo=dt_timezone.utc).timestamp()
+# 2 ** 512 leaves float range (2 ** 1024) for the weights and their sums.
+MAX_EXPONENT = 512
+MIN_HALF_LIFE_HOURS = 1
+
+EVENT_WEIGHTS = {
+    'favorite': 1.0,
+    'investment_requested': 3.0,
+    'investment_completed': 5.0,
+}
+
+TRENDING_ORDERING = 'trending'
+REBUILD_BATCH_SIZE = 1000
+
+EPOCH_CACHE = {}
+
+
+def get_half_life_seconds():
+    return getattr(settings, 'TRENDING_HALF_LIFE_HOURS', 48) * 3600.0
+
+
+def check_half_life(app_configs=None, **kwargs):
+    """System check: the half-life must be a number of at least MIN_HALF_LIFE_HOURS."""
+    half_life = getattr(settings, 'TRENDING_HALF_LIFE_HOURS', 48)
+    if isinstance(half_life, (int, float)) and not isinstance(half_life, bool) and half_life >= MIN_HALF_LIFE_HOURS:
+        return []
+    return [checks.Error(
+        f'TRENDING_HALF_LIFE_HOURS must be a number of at least {MIN_HALF_LIFE_HOURS}, not {half_life!r}.',
+        hint='Shorter half-lives rebase the ranking epoch too often to be useful.',
+        id='projects.E001',
+    )]
+
+
+def stored_epoch():
+    epoch = RankingEpoch.objects.values_list('epoch', flat=True).first()
+    return DEFAULT_EPOCH if epoch is None else epoch
+
+
+def current_epoch(refresh=False):
+    """The ranking epoch (Unix time) as last read by this process."""
+    if refresh or 'epoch' not in EPOCH_CACHE:
+        EPOCH_CACHE['epoch'] = stored_epoch()
+    return EPOCH_CACHE['epoch']
+
+
+def exponent(moment, epoch):
+    return (moment.timestamp() - epoch) / get_half_life_seconds()
+
+
+def scaling_epoch(moment):
+    """An epoch `moment` can be scaled against without overflow, rebasing the rankings when needed."""
+    epoch = current_epoch()
+    if exponent(moment, epoch) > MAX_EXPONENT:
+        epoch = current_epoch(refresh=True)
+        if exponent(moment, epoch) > MAX_EXPONENT:
+            epoch = rebase_rankings()
+    return epoch
+
+
+def to_stored_scale(epoch):
+    """SQL factor converting scores scaled against `epoch` to the stored epoch's scale."""
+    stored = Coalesce(Subquery(RankingEpoch.objects.values('epoch')[:1]), Value(DEFAULT_EPOCH))
+    return Power(Value(2.0), (Value(float(epoch)) - stored) / Value(get_half_life_seconds()), output_field=FloatField())
+
+
+def lock_rankings():
+    """Make concurrent score updates wait for a rescale to commit (they then read the new epoch)."""
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(f'LOCK TABLE {ProjectRanking._meta.db_table} IN EXCLUSIVE MODE')
+
+
+def store_epoch(epoch):
+    RankingEpoch.objects.update_or_create(pk=1, defaults={'epoch': epoch})
+    EPOCH_CACHE['epoch'] = epoch
+
+
+@transaction.atomic
+def rebase_rankings(now=None):
+    """Rescale every stored score to an epoch of `now` in one UPDATE; returns the new epoch."""
+    epoch = (now or timezone.now()).timestamp()
+    lock_rankings()
+    old = RankingEpoch.objects.select_for_update().values_list('epoch', flat=True).first()
+    old = DEFAULT_EPOCH if old is None else old
+    ProjectRanking.objects.update(score=F('score') * Value(2.0 ** ((old - epoch) / get_half_life_seconds())))
+    store_epoch(epoch)
+    bump_ranking_version()
+    return epoch
+
+
+def event_score(event, moment, epoch=None):
+    """Contribution of one `event` that happened at `moment`, scaled against `epoch` (default: current)."""
+    epoch = current_epoch() if epoch is None else epoch
+    return EVENT_WEIGHTS[event] * 2.0 ** exponent(moment, epoch)
+
+
+def decayed_score(score, now=None):
+    """A stored score expressed as of `now` (for display; ordering never needs it)."""
+    return score * 2.0 ** -exponent(now or timezone.now(), stored_epoch())
+
+
+def record_event(project_id, event, moment=None, undo=False):
+    """Add (or, with `undo`, subtract) one event's contribution to the project's score."""
+    moment = moment or timezone.now()
+    epoch = scaling_epoch(moment)
+    delta = event_score(event, moment, epoch)
+    if undo:
+        delta = -delta
+    rankings = ProjectRanking.objects.filter(project_id=project_id)
+    score = F('score') + Value(delta) * to_stored_scale(epoch)
+    if not rankings.update(score=score, updated_at=timezone.now()):
+        ensure_rankings([project_id])
+        rankings.update(score=score, updated_at=timezone.now())
+    bump_ranking_version()
+
+
+def record_events(events):
+    """
+    Apply many (project_id, event, moment, undo) events in one UPDATE.
+
+    Used by bulk endpoints; deltas for the same project are summed first.
+    """
+    events = list(events)
+    if not events:
+        return
+    epoch = scaling_epoch(max(moment for _, _, moment, _ in events))
+    deltas = defaultdict(float)
+    for project_id, event, moment, undo in events:
+        delta = event_score(event, moment, epoch)
+        deltas[project_id] += -delta if undo else delta
+    ensure_rankings(deltas)
+    ProjectRanking.objects.filter(project_id__in=deltas).update(
+        score=F('score') + Case(
+            *(When(project_id=project_id, then=Value(delta)) for project_id, delta in deltas.items()),
+            default=Value(0.0),
+            output_field=FloatField(),
+        ) * to_stored_scale(epoch),
+        updated_at=timezone.now(),
+    )
+    bump_ranking_version()
+
+
+def investment_requested(investment):
+    record_event(investment.project_id, 'investment_requested', investment.created_at)
+
+
+def investment_completed(investment):
+    record_event(investment.project_id, 'investment_completed', investment.completed_at)
+
+
+def investment_released(investment):
+    """A completed investment was withdrawn, refunded or reversed: take its completion back out."""
+    if investment.completed_at:
+        record_event(investment.project_id, 'investment_completed', investment.completed_at, undo=True)
+
+
+def favorite_added(favorite):
+    record_event(favorite.project_id, 'favorite', favorite.created_at)
+
+
+def favorite_removed(favorite):
+    record_event(favorite.project_id, 'favorite', favorite.created_at, undo=True)
+
+
+def ensure_rankings(project_ids):
+    """Create zero-score rows for new projects (bulk inserts skip the post_save signal)."""
+    ProjectRanking.objects.bulk_create(
+        [ProjectRanking(project_id=project_id) for project_id in project_ids],
+        ignore_conflicts=True,
+    )
+
+
+def compute_scores(epoch=None):
+    """{project_id: score} recomputed from the source tables in streamed queries, scaled against `epoch`."""
+    epoch = current_epoch() if epoch is None else epoch
+    scores = dict.fromkeys(Project.objects.order_by().values_list('id', flat=True).iterator(), 0.0)
+    for project_id, created_at in Favorite.objects.order_by().values_list('project_id', 'created_at').iterator():
+        scores[project_id] = scores.get(project_id, 0.0) + event_score('favorite', created_at, epoch)
+    investments = Investment.objects.order_by().values_list('project_id', 'created_at', 'status', 'completed_at')
+    for project_id, created_at, status, completed_at in investments.iterator():
+        score = event_score('investment_requested', created_at, epoch)
+        if status == Investment.Status.COMPLETED and completed_at:
+            score += event_score('investment_completed', completed_at, epoch)
+        scores[project_id] = scores.get(project_id, 0.0) + score
+    return scores
+
+
+def rebuild_rankings():
+    """Recompute and upsert every project's score against an epoch of now; returns the number of rows written."""
+    now = timezone.now()
+    scores = compute_scores(now.timestamp())
+    rows = [ProjectRanking(project_id=project_id, score=score, updated_at=now) for project_id, score in scores.items()]
+    with transaction.atomic():
+        lock_rankings()
+        ProjectRanking.objects.bulk_create(
+            rows,
+            batch_size=REBUILD_BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=['project'],
+            update_fields=['score', 'updated_at'],
+        )
+        store_epoch(now.timestamp())
+    bump_ranking_version()
+    return len(rows)
+
+
+def orders_by_trending(request, ordering_param='ordering'):
+    terms = request.query_params.get(ordering_param, '').split(',')
+    return any(term.strip().lstrip('-') == TRENDING_ORDERING for term in terms)
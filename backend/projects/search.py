@@ -0,0 +1,130 @@
+"""
+Full-text search over the project catalog.
+
+PostgreSQL keeps a stored, generated ``projects.search_vector`` tsvector column
+(title weighted A, short_description B, description C) behind a GIN index.
+SQLite keeps an FTS5 external-content table, ``projects_search``, in sync with
+triggers; its bm25() column weights mirror the PostgreSQL weights.
+
+Neither structure is a model field: both are created by migration
+0011_project_search and queried here with raw SQL fragments. On any other
+database the search falls back to case-insensitive substring filters
+(every term must appear in one of the three fields) with a constant rank.
+"""
+import re
+
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+SEARCH_CONFIG = 'english'
+SEARCH_TABLE = 'projects_search'
+SQLITE_WEIGHTS = (10.0, 4.0, 1.0)
+MAX_TERMS = 8
+
+TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+SQLITE_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_ai AFTER INSERT ON projects BEGIN
+        INSERT INTO {SEARCH_TABLE}(rowid, title, short_description, description)
+        VALUES (new.id, new.title, new.short_description, new.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_ad AFTER DELETE ON projects BEGIN
+        INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, title, short_description, description)
+        VALUES ('delete', old.id, old.title, old.short_description, old.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_au AFTER UPDATE OF title, short_description, description ON projects BEGIN
+        INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, title, short_description, description)
+        VALUES ('delete', old.id, old.title, old.short_description, old.description);
+        INSERT INTO {SEARCH_TABLE}(rowid, title, short_description, description)
+        VALUES (new.id, new.title, new.short_description, new.description);
+    END
+    """,
+]
+
+
+def ensure_sqlite_triggers(using='default'):
+    """
+    Re-create the FTS5 sync triggers on SQLite if a table rebuild dropped them.
+
+    SQLite migrations that alter ``projects`` copy it into a new table, which
+    discards its triggers; this runs after every migrate (see apps.py).
+    """
+    from django.db import connections
+
+    db = connections[using]
+    if db.vendor != 'sqlite':
+        return
+    with db.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name = %s", [SEARCH_TABLE]
+        )
+        if cursor.fetchone() is None:
+            return
+        cursor.execute(
+            "SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'projects' AND name LIKE %s",
+            [f'{SEARCH_TABLE}_%'],
+        )
+        if cursor.fetchone()[0] == len(SQLITE_TRIGGERS):
+            return
+        for statement in SQLITE_TRIGGERS:
+            cursor.execute(statement)
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('rebuild')")
+
+
+def parse_terms(query):
+    """Split a user query into at most MAX_TERMS lower-cased word tokens."""
+    return TERM_RE.findall((query or '').lower())[:MAX_TERMS]
+
+
+def search_projects(queryset, query):
+    """
+    Restrict a Project queryset to full-text matches for ``query``.
+
+    Every term must match, and terms are matched as prefixes so type-ahead
+    queries work. Matches are annotated with ``search_rank``
+    (higher is more relevant).
+    """
+    terms = parse_terms(query)
+    if not terms:
+        return queryset
+
+    if connection.vendor == 'postgresql':
+        tsquery = ' & '.join(f'{term}:*' for term in terms)
+        params = (SEARCH_CONFIG, tsquery)
+        match = RawSQL(
+            "projects.search_vector @@ to_tsquery(%s::regconfig, %s)",
+            params,
+            output_field=BooleanField(),
+        )
+        rank = RawSQL(
+            "ts_rank_cd(projects.search_vector, to_tsquery(%s::regconfig, %s))",
+            params,
+            output_field=FloatField(),
+        )
+    elif connection.vendor == 'sqlite':
+        # MATCH drives the scan through the FTS5 table; bm25() is only defined
+        # in a query that MATCHes, so the rank is a correlated lookup by rowid.
+        fts_query = ' '.join(f'"{term}"*' for term in terms)
+        weights = ', '.join(str(weight) for weight in SQLITE_WEIGHTS)
+        queryset = queryset.filter(
+            id__in=RawSQL(f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s', (fts_query,))
+        )
+        return queryset.annotate(search_rank=RawSQL(
+            f'SELECT -bm25({SEARCH_TABLE}, {weights}) FROM {SEARCH_TABLE} '
+            f'WHERE {SEARCH_TABLE} MATCH %s AND {SEARCH_TABLE}.rowid = projects.id',
+            (fts_query,),
+            output_field=FloatField(),
+        ))
+    else:
+        match = Q()
+        for term in terms:
+            match &= Q(title__icontains=term) | Q(short_description__icontains=term) | Q(description__icontains=term)
+        rank = Value(0.0, output_field=FloatField())
+
+    return queryset.filter(match).annotate(search_rank=rank)
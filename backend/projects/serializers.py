@@ -1,7 +1,12 @@
+from contextlib import nullcontext
+
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.db import transaction
 from .models import Project, ProjectImage, Favorite, Compare, ProjectEditRequest, ProjectArchiveRequest
-from investments.models import Investment
+from .images import sync_project_images
+from .shares import fold_counters
+from .access import get_restricted_access
 
 User = get_user_model()
 
@@ -20,7 +25,14 @@ class ProjectListSerializer(serializers.ModelSerializer):
     remaining_shares = serializers.IntegerField(read_only=True)
     funding_progress = serializers.FloatField(read_only=True)
     thumbnail_url = serializers.SerializerMethodField()
-    
+    # Viewer state, annotated by projects.membership.with_viewer_state (defaults for guests).
+    is_favorited = serializers.SerializerMethodField()
+    is_compared = serializers.SerializerMethodField()
+    my_access_status = serializers.SerializerMethodField()
+    my_position = serializers.SerializerMethodField()
+
+    etag_version = 2
+
     class Meta:
         model = Project
         fields = [
@@ -28,15 +40,45 @@ class ProjectListSerializer(serializers.ModelSerializer):
             'developer_id', 'developer_name', 'total_value', 'total_shares', 'shares_sold',
             'per_share_price', 'remaining_shares', 'funding_progress',
             'duration_days', 'start_date', 'end_date', 'thumbnail_url',
-            'has_3d_model', 'is_3d_public', 'created_at'
+            'has_3d_model', 'is_3d_public', 'created_at',
+            'is_favorited', 'is_compared', 'my_access_status', 'my_position',
         ]
 
     def get_thumbnail_url(self, obj):
         if obj.thumbnail_url:
             return obj.thumbnail_url
-        first_image = obj.images.order_by('order').first()
+        if hasattr(obj, 'first_image_url'):
+            # Annotated by Project.objects.for_listing().
+            return obj.first_image_url
+        first_image = obj.images.order_by('order', 'id').first()
         return first_image.image_url if first_image else None
 
+    def get_is_favorited(self, obj):
+        return bool(getattr(obj, 'is_favorited', False))
+
+    def get_is_compared(self, obj):
+        return bool(getattr(obj, 'is_compared', False))
+
+    def get_my_access_status(self, obj):
+        return getattr(obj, 'my_access_status', None)
+
+    def get_my_position(self, obj):
+        return getattr(obj, 'my_position', None) or 0
+
+
+class PortfolioProjectSerializer(ProjectListSerializer):
+    """A developer's own project with its funding and demand aggregates (see projects/portfolio.py)."""
+    raised_amount = serializers.FloatField(read_only=True)
+    investor_count = serializers.IntegerField(read_only=True)
+    pending_request_count = serializers.IntegerField(read_only=True)
+    access_request_count = serializers.IntegerField(read_only=True)
+
+    class Meta(ProjectListSerializer.Meta):
+        fields = [
+            field for field in ProjectListSerializer.Meta.fields
+            if field not in ('is_favorited', 'is_compared', 'my_access_status', 'my_position')
+        ] + ['raised_amount', 'investor_count', 'pending_request_count', 'access_request_count']
+
 
 class ProjectDetailSerializer(serializers.ModelSerializer):
     """Serializer for project detail view."""
@@ -67,53 +109,19 @@ class ProjectDetailSerializer(serializers.ModelSerializer):
         if not obj.has_restricted_fields:
             return None
         
-        # Check if user has access
+        # Owner, admin, PROCESSING/COMPLETED investment or approved access request;
+        # resolved once per request (see projects/access.py).
         request = self.context.get('request')
-        if not request or not request.user.is_authenticated:
+        if not request or not get_restricted_access(request).allows(obj):
             return None
         
-        user = request.user
-        # Developer owner, admin, or approved access request
-        if user == obj.developer or user.role == 'ADMIN' or getattr(user, 'is_staff', False) or getattr(user, 'is_superuser', False):
-            return {
-                'financial_projections': obj.financial_projections,
-                'business_plan': obj.business_plan,
-                'team_details': obj.team_details,
-                'legal_documents': obj.legal_documents,
-                'risk_assessment': obj.risk_assessment,
-            }
-        
-        # Allow investors with completed/processing investments to view restricted data
-        has_investment_access = Investment.objects.filter(
-            investor=user,
-            project=obj,
-            status__in=[Investment.Status.PROCESSING, Investment.Status.COMPLETED],
-        ).exists()
-
-        if has_investment_access:
-            return {
-                'financial_projections': obj.financial_projections,
-                'business_plan': obj.business_plan,
-                'team_details': obj.team_details,
-                'legal_documents': obj.legal_documents,
-                'risk_assessment': obj.risk_assessment,
-            }
-
-        # Check for approved access request
-        has_access = obj.access_requests.filter(
-            investor=user, status='APPROVED'
-        ).exists()
-        
-        if has_access:
-            return {
-                'financial_projections': obj.financial_projections,
-                'business_plan': obj.business_plan,
-                'team_details': obj.team_details,
-                'legal_documents': obj.legal_documents,
-                'risk_assessment': obj.risk_assessment,
-            }
-        
-        return None
+        return {
+            'financial_projections': obj.financial_projections,
+            'business_plan': obj.business_plan,
+            'team_details': obj.team_details,
+            'legal_documents': obj.legal_documents,
+            'risk_assessment': obj.risk_assessment,
+        }
 
 
 class ProjectCreateSerializer(serializers.ModelSerializer):
@@ -142,34 +150,42 @@ class ProjectCreateSerializer(serializers.ModelSerializer):
         if images and not validated_data.get('thumbnail_url'):
             validated_data['thumbnail_url'] = images[0]
         project = Project.objects.create(**validated_data)
-        
-        for order, image_url in enumerate(images):
-            ProjectImage.objects.create(
-                project=project,
-                image_url=image_url,
-                order=order
-            )
-        
+        ProjectImage.objects.bulk_create(
+            [ProjectImage(project=project, image_url=image_url, order=order) for order, image_url in enumerate(images)]
+        )
         return project
 
+    def validate_total_shares(self, value):
+        committed = self.instance.shares_sold + self.instance.reserved_shares if self.instance is not None else 0
+        if value < committed:
+            raise serializers.ValidationError(f'Cannot be lower than the {committed} shares already sold or reserved')
+        return value
+
     def update(self, instance, validated_data):
         images = validated_data.pop('images', None)
 
         if images is not None and images and not validated_data.get('thumbnail_url'):
             validated_data['thumbnail_url'] = images[0]
 
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-        instance.save()
+        funding_changed = bool(Project.FUNDING_SOURCE_FIELDS.intersection(validated_data))
+        with transaction.atomic() if funding_changed else nullcontext():
+            if funding_changed:
+                # shares_sold moves under concurrent sales (projects/shares.py); the
+                # metrics must be derived from its current value, read (and folded) under a lock.
+                fold_counters(instance)
+                if validated_data.get('total_shares', instance.total_shares) < instance.shares_sold:
+                    raise serializers.ValidationError({
+                        'total_shares': f'Cannot be lower than the {instance.shares_sold} shares already sold'
+                    })
+            for attr, value in validated_data.items():
+                setattr(instance, attr, value)
+            # Only the edited fields: a full save would write back a stale shares_sold.
+            instance.save(update_fields=list(validated_data))
+            if funding_changed and instance.counter_slots:
+                fold_counters(instance)  # Split the new remainder between the slots.
 
         if images is not None:
-            instance.images.all().delete()
-            for order, image_url in enumerate(images):
-                ProjectImage.objects.create(
-                    project=instance,
-                    image_url=image_url,
-                    order=order
-                )
+            sync_project_images(instance, images)
 
         return instance
 
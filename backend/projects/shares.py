@@ -0,0 +1,362 @@
+"""
+Atomic share accounting for Project.shares_sold and Project.reserved_shares.
+
+Completions and releases never read-modify-write the project row: each is
+one conditional UPDATE computed by the database from the current values
+(`F('shares_sold')`), so concurrent writers cannot lose each other's
+updates. The `projects_shares_sold_lte_total` check constraint backs the
+conditions up for any other writer.
+
+Reservations
+------------
+An investment holds its shares from the moment it is requested until it
+completes or is dropped (Investment.RESERVING_STATUSES). `reserve_shares`
+takes them with one UPDATE that only matches while
+`shares_sold + reserved_shares + shares <= total_shares`, so requests and
+approvals can never promise more than is available. Completing moves the
+shares from reserved to sold (`sell_shares(..., reserved=True)`); rejection,
+expiry, cancellation and withdrawal give them back (`release_reservation`).
+`rebuild_reservations` recomputes the aggregate from the project ledger and
+`reservation_drift` compares it with the investments table in one query.
+
+The stored funding metrics (see Project.save()) are updated in the same
+statement as shares_sold. Queryset updates skip post_save, so the catalog
+cache is bumped explicitly.
+
+Sharded mode
+------------
+Every write above still queues on the project's row lock. A very hot project
+can instead be given `counter_slots` ProjectShareCounter rows
+(`configure_counters`). A reserved sale then only touches a random slot
+(`sold` and `settled` += shares), guarded by a read of the project row
+that checks the reservations not yet settled through the slots still cover
+it; the project row keeps counting the shares as reserved until the slots
+are folded back (`fold_counters`), so availability checks stay exact.
+Unreserved or uncovered sales, and sales when the slots were switched off
+meanwhile, fold under the project lock instead. Folding clamps the total at
+zero and refuses to write one above total_shares.
+
+The live count is `shares_sold + sum(counter.sold)` (`live_shares_sold`);
+the project detail and funding snapshots read it. The stored column and
+metrics used by catalog lists, filters and sorts lag until the next fold
+(`manage.py fold_share_counters`, run periodically).
+"""
+import logging
+import random
+from itertools import groupby
+
+from django.db import DatabaseError, transaction
+from django.db.models import Case, Exists, F, FloatField, IntegerField, Max, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from audit.models import ProjectLedgerEntry
+
+from .cache import bump_catalog_version
+from .models import Project, ProjectShareCounter
+
+logger = logging.getLogger(__name__)
+
+MAX_COUNTER_SLOTS = 64
+
+# Ledger entries that put an investment in (or take it out of) a reserving status.
+RESERVING_ENTRIES = frozenset({
+    ProjectLedgerEntry.EntryType.INVESTMENT_REQUESTED,
+    ProjectLedgerEntry.EntryType.INVESTMENT_APPROVED,
+    ProjectLedgerEntry.EntryType.INVESTMENT_PROCESSING,
+})
+RELEASING_ENTRIES = frozenset({
+    ProjectLedgerEntry.EntryType.INVESTMENT_COMPLETED,
+    ProjectLedgerEntry.EntryType.INVESTMENT_REJECTED,
+    ProjectLedgerEntry.EntryType.INVESTMENT_EXPIRED,
+    ProjectLedgerEntry.EntryType.INVESTMENT_CANCELLED,
+    ProjectLedgerEntry.EntryType.INVESTMENT_REFUNDED,
+    ProjectLedgerEntry.EntryType.INVESTMENT_WITHDRAWN,
+    ProjectLedgerEntry.EntryType.INVESTMENT_REVERSED,
+})
+
+
+class InsufficientShares(Exception):
+    """The project does not have enough available shares."""
+
+
+def funding_updates(shares_sold):
+    """UPDATE assignments for shares_sold and the metrics derived from it."""
+    return {
+        'shares_sold': shares_sold,
+        'remaining_shares_value': F('total_shares') - shares_sold,
+        'funding_progress_value': Case(
+            When(total_shares__gt=0, then=shares_sold * Value(100.0) / F('total_shares')),
+            default=Value(0.0),
+            output_field=FloatField(),
+        ),
+        'updated_at': timezone.now(),
+    }
+
+
+def refresh_shares(project):
+    project.refresh_from_db(fields=[
+        'shares_sold', 'reserved_shares', *Project.FUNDING_METRIC_FIELDS, 'counter_slots', 'updated_at',
+    ])
+
+
+def available_shares(project):
+    """Shares neither sold nor reserved, from the project row."""
+    row = Project.objects.filter(pk=project.pk).values('total_shares', 'shares_sold', 'reserved_shares').first()
+    return max(0, row['total_shares'] - row['shares_sold'] - row['reserved_shares']) if row else 0
+
+
+def reserve_shares(project, shares):
+    """Hold `shares` for an investment request, or raise InsufficientShares (nothing is written)."""
+    reserved = Project.objects.filter(
+        pk=project.pk, shares_sold__lte=F('total_shares') - F('reserved_shares') - shares,
+    ).update(reserved_shares=F('reserved_shares') + shares)
+    if not reserved:
+        raise InsufficientShares(f'Only {available_shares(project)} shares available')
+    project.reserved_shares += shares
+
+
+def release_reservation(project, shares):
+    """Give back the reservation of an investment that will not complete."""
+    release_reservations({project.pk: shares})
+
+
+def release_reservations(shares_by_project):
+    """Give back reservations of many projects ({project_id: shares}) in one UPDATE."""
+    shares_by_project = {project_id: shares for project_id, shares in shares_by_project.items() if shares}
+    if not shares_by_project:
+        return
+    Project.objects.filter(pk__in=shares_by_project).update(reserved_shares=Greatest(
+        Case(
+            *[When(pk=project_id, then=F('reserved_shares') - shares) for project_id, shares in shares_by_project.items()],
+            output_field=IntegerField(),
+        ),
+        Value(0),
+    ))
+
+
+def counter_total(project, field):
+    """Subquery summing `field` over the project's counter slots (NULL without slots)."""
+    return Subquery(
+        ProjectShareCounter.objects.filter(project=project.pk)
+        .order_by()
+        .values('project')
+        .annotate(total=Sum(field))
+        .values('total'),
+        output_field=IntegerField(),
+    )
+
+
+def sell_shares(project, shares, reserved=False):
+    """
+    Add `shares` to the project's sold shares. With `reserved`, they move out
+    of the project's reservations (the investment's own); otherwise they must
+    fit beside them. Raises InsufficientShares (nothing is written) if they do
+    not. Refreshes `project`.
+    """
+    sold = False
+    if project.counter_slots and reserved:
+        # Only while the reservations not settled through the slots yet cover the sale.
+        covered = Project.objects.filter(
+            pk=project.pk,
+            reserved_shares__gte=Coalesce(counter_total(project, 'settled'), Value(0)) + shares,
+            shares_sold__lte=F('total_shares') - Coalesce(counter_total(project, 'sold'), Value(0)) - shares,
+        )
+        sold = ProjectShareCounter.objects.filter(
+            Exists(covered), project=project, slot=random.randrange(project.counter_slots),
+        ).update(sold=F('sold') + shares, settled=F('settled') + shares, updated_at=timezone.now())
+    elif not project.counter_slots:
+        sales = Project.objects.filter(pk=project.pk, counter_slots=0)
+        if reserved:
+            sales = sales.filter(reserved_shares__gte=shares, shares_sold__lte=F('total_shares') - shares)
+            updates = {'reserved_shares': F('reserved_shares') - shares}
+        else:
+            sales = sales.filter(shares_sold__lte=F('total_shares') - F('reserved_shares') - shares)
+            updates = {}
+        sold = sales.update(**updates, **funding_updates(F('shares_sold') + shares))
+    if not sold:
+        # Unreserved sale of a sharded project, a missing reservation, an
+        # oversell, or the slots were switched on or off meanwhile.
+        with transaction.atomic():
+            fold_counters(project, sell=shares, reserved=reserved)
+    refresh_shares(project)
+    bump_catalog_version()
+
+
+def release_shares(project, shares):
+    """Give `shares` of a completed investment back (never below zero sold). Refreshes `project`."""
+    released = False
+    if project.counter_slots:
+        # Only while the live count covers the release; otherwise clamp on the project row.
+        covered = Project.objects.filter(
+            pk=project.pk, shares_sold__gte=Value(shares) - Coalesce(counter_total(project, 'sold'), Value(0)),
+        )
+        released = ProjectShareCounter.objects.filter(
+            Exists(covered), project=project, slot=random.randrange(project.counter_slots),
+        ).update(sold=F('sold') - shares, updated_at=timezone.now())
+    if not released:
+        Project.objects.filter(pk=project.pk).update(**funding_updates(Greatest(F('shares_sold') - shares, Value(0))))
+    refresh_shares(project)
+    bump_catalog_version()
+
+
+def fold_counters(project, sell=0, reserved=False):
+    """
+    Lock the project and its counters and fold the counters' sales into
+    shares_sold and reserved_shares, together with a sale of `sell` shares
+    (taken from the reservations when `reserved` and they cover it). Raises
+    InsufficientShares, writing nothing, if the sale does not fit. Returns the
+    new shares_sold. Also raises it if the counters alone oversold the project
+    (see fold_all_counters). Must run inside a transaction.
+    """
+    locked = Project.objects.select_for_update().only(
+        'id', 'shares_sold', 'reserved_shares', 'total_shares', 'counter_slots',
+    ).get(pk=project.pk)
+    counters = list(ProjectShareCounter.objects.select_for_update().filter(project=locked).order_by('slot'))
+    shares_sold = max(0, locked.shares_sold + sum(counter.sold for counter in counters)) + sell
+    reserved_shares = max(0, locked.reserved_shares - sum(counter.settled for counter in counters))
+    if reserved and reserved_shares >= sell:
+        reserved_shares -= sell
+    if sell and shares_sold + reserved_shares > locked.total_shares:
+        raise InsufficientShares(f'Only {max(0, locked.total_shares - shares_sold + sell - reserved_shares)} shares available')
+    if shares_sold > locked.total_shares:
+        raise InsufficientShares(f'Counters hold {shares_sold} sold shares of {locked.total_shares}')
+
+    updates = {}
+    if shares_sold != locked.shares_sold:
+        updates.update(funding_updates(Value(shares_sold)))
+    if reserved_shares != locked.reserved_shares:
+        updates['reserved_shares'] = reserved_shares
+    if updates:
+        Project.objects.filter(pk=locked.pk).update(**updates)
+    if any(counter.sold or counter.settled for counter in counters):
+        ProjectShareCounter.objects.filter(project=locked).update(sold=0, settled=0, updated_at=timezone.now())
+    project.shares_sold, project.reserved_shares = shares_sold, reserved_shares
+    return shares_sold
+
+
+@transaction.atomic
+def configure_counters(project, slots):
+    """Switch the project to `slots` counter slots (0 turns sharding off), folding the current ones."""
+    slots = max(0, min(slots, MAX_COUNTER_SLOTS))
+    fold_counters(project)
+    ProjectShareCounter.objects.filter(project=project).delete()
+    ProjectShareCounter.objects.bulk_create([ProjectShareCounter(project=project, slot=slot) for slot in range(slots)])
+    Project.objects.filter(pk=project.pk).update(counter_slots=slots, updated_at=timezone.now())
+    project.counter_slots = slots
+    bump_catalog_version()
+
+
+def fold_all_counters():
+    """
+    Fold every sharded project's counters into shares_sold. A project that
+    cannot be folded is logged and left for the next run without holding up
+    the others. Returns how many projects were folded.
+    """
+    folded = 0
+    for project in Project.objects.filter(counter_slots__gt=0).only('id', 'title', 'counter_slots').iterator():
+        try:
+            with transaction.atomic():
+                fold_counters(project)
+        except (InsufficientShares, DatabaseError):
+            logger.exception('Could not fold the share counters of project %s', project.pk)
+            continue
+        folded += 1
+    if folded:
+        bump_catalog_version()
+    return folded
+
+
+def live_shares_sold(project):
+    """shares_sold including sales not folded back from the counters yet."""
+    if not project.counter_slots:
+        return project.shares_sold
+    unfolded = ProjectShareCounter.objects.filter(project=project).aggregate(total=Sum('sold'))['total']
+    return max(0, project.shares_sold + (unfolded or 0))
+
+
+def live_updated_at(project_id):
+    """The later of the project's updated_at and its counters' (a sale through a slot leaves the project row alone)."""
+    row = (
+        Project.objects.filter(pk=project_id)
+        .annotate(counters_updated_at=Max('share_counters__updated_at'))
+        .values('updated_at', 'counters_updated_at')
+        .first()
+    )
+    if row is None:
+        return None
+    return max(filter(None, (row['updated_at'], row['counters_updated_at'])))
+
+
+def reservation_drift():
+    """
+    Projects whose reserved_shares disagrees with their in-progress
+    investments, as (id, reserved_shares, expected) rows, from one query.
+    """
+    from investments.models import Investment
+
+    in_progress = (
+        Investment.objects.filter(project=OuterRef('pk'), status__in=Investment.RESERVING_STATUSES)
+        .order_by()
+        .values('project')
+        .annotate(total=Sum('shares'))
+        .values('total')
+    )
+    # Unfolded reserved sales are still counted in reserved_shares.
+    settled = (
+        ProjectShareCounter.objects.filter(project=OuterRef('pk'))
+        .order_by()
+        .values('project')
+        .annotate(total=Sum('settled'))
+        .values('total')
+    )
+    return (
+        Project.objects.annotate(
+            expected=Coalesce(Subquery(in_progress, output_field=IntegerField()), Value(0))
+            + Coalesce(Subquery(settled, output_field=IntegerField()), Value(0)),
+        )
+        .exclude(reserved_shares=F('expected'))
+        .order_by('id')
+        .values_list('id', 'reserved_shares', 'expected')
+    )
+
+
+def ledger_reservations(entries):
+    """Shares still reserved after replaying one project's ledger entries (oldest first)."""
+    held = {}
+    for entry in entries:
+        metadata = entry.metadata or {}
+        investment_id = metadata.get('investment_id')
+        if entry.entry_type in RESERVING_ENTRIES:
+            # Older INVESTMENT_PROCESSING entries carry no share count.
+            held[investment_id] = int(metadata.get('shares') or held.get(investment_id) or 0)
+        else:
+            held.pop(investment_id, None)
+    return sum(held.values())
+
+
+def rebuild_reservations(project_ids=None):
+    """
+    Recompute reserved_shares from the project ledger (all projects, or
+    `project_ids`). Returns {project_id: (old, new)} for the projects changed.
+    """
+    projects = Project.objects.all() if project_ids is None else Project.objects.filter(pk__in=project_ids)
+    entries = (
+        ProjectLedgerEntry.objects.filter(
+            project__in=projects, entry_type__in=RESERVING_ENTRIES | RELEASING_ENTRIES,
+        )
+        .only('project_id', 'entry_type', 'metadata', 'created_at')
+        .order_by('project_id', 'created_at', 'id')
+    )
+    expected = {project_id: 0 for project_id in projects.values_list('id', flat=True)}
+    for project_id, project_entries in groupby(entries.iterator(), key=lambda entry: entry.project_id):
+        expected[project_id] = ledger_reservations(project_entries)
+
+    changed = {}
+    for project in projects.filter(pk__in=expected).only('id', 'reserved_shares', 'counter_slots').iterator():
+        with transaction.atomic():
+            fold_counters(project)
+            if project.reserved_shares != expected[project.pk]:
+                Project.objects.filter(pk=project.pk).update(reserved_shares=expected[project.pk])
+                changed[project.pk] = (project.reserved_shares, expected[project.pk])
+    return changed
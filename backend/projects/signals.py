@@ -0,0 +1,58 @@
+"""
+Keep the catalog response cache (projects/cache.py) in step with the database,
+and give every new project its (zero) trending ranking row.
+"""
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+
+from .cache import bump_access_version, bump_catalog_version, bump_membership_version
+
+# Saves that cannot change anything the catalog shows.
+IGNORED_USER_UPDATES = frozenset({'last_login'})
+
+
+def project_changed(sender, **kwargs):
+    bump_catalog_version()
+
+
+def project_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        from .models import ProjectRanking
+
+        ProjectRanking.objects.get_or_create(project=instance)
+
+
+def developer_changed(sender, instance, update_fields=None, **kwargs):
+    # developer_name is part of every list/detail payload.
+    if getattr(instance, 'role', None) != 'DEVELOPER':
+        return
+    if update_fields is not None and set(update_fields) <= IGNORED_USER_UPDATES:
+        return
+    bump_catalog_version()
+
+
+def investor_access_changed(sender, instance, **kwargs):
+    bump_access_version(instance.investor_id)
+    bump_membership_version(instance.investor_id)
+
+
+def membership_changed(sender, instance, **kwargs):
+    bump_membership_version(instance.user_id)
+
+
+def connect_cache_signals():
+    from access_requests.models import AccessRequest
+    from investments.models import Investment
+    from .models import Compare, Favorite, Project, ProjectImage
+
+    for model in (Project, ProjectImage):
+        post_save.connect(project_changed, sender=model, dispatch_uid=f'catalog-cache-{model.__name__}-save')
+        post_delete.connect(project_changed, sender=model, dispatch_uid=f'catalog-cache-{model.__name__}-delete')
+    post_save.connect(project_created, sender=Project, dispatch_uid='project-ranking-create')
+    post_save.connect(developer_changed, sender=settings.AUTH_USER_MODEL, dispatch_uid='catalog-cache-developer')
+    for model in (Investment, AccessRequest):
+        post_save.connect(investor_access_changed, sender=model, dispatch_uid=f'access-cache-{model.__name__}-save')
+        post_delete.connect(investor_access_changed, sender=model, dispatch_uid=f'access-cache-{model.__name__}-delete')
+    for model in (Favorite, Compare):
+        post_save.connect(membership_changed, sender=model, dispatch_uid=f'membership-cache-{model.__name__}-save')
+        post_delete.connect(membership_changed, sender=model, dispatch_uid=f'membership-cache-{model.__name__}-delete')
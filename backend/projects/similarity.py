@@ -0,0 +1,369 @@
+"""
+Precomputed "similar projects" index.
+
+Every APPROVED project gets an L2-normalized feature vector:
+
+- a category one-hot;
+- standardized log total value, log per-share price, duration and funding
+  progress;
+- a signed feature-hashing embedding of its search text (title weighted over
+  the descriptions, tokenized like projects.search).
+
+Cosine nearest neighbours are computed offline (build_similarity_index) and
+stored as NumPy arrays in a versioned directory:
+
+    ids.npy        int64 (N,)      project id of each row, ascending
+    positions.npy  int32 (max_id+1) row of each project id, -1 if absent
+    neighbors.npy  int64 (N, K)    neighbour project ids, best first, -1 padded
+    scores.npy     float32 (N, K)  cosine similarity of each neighbour
+    vectors.npy    float32 (N, D)  feature vectors, for incremental refreshes
+    meta.json      build time, standardization stats, K
+
+The files are memory-mapped when served, so a lookup is two array reads.
+The CURRENT file in the index directory names the live version; writers
+build a new version directory and swap CURRENT atomically. Old versions are
+deleted only once they are neither current nor the one before it and are
+older than SIMILARITY_INDEX_GRACE_SECONDS, so a reader that has just read
+CURRENT can still open the version it names; `load_index` retries if one
+disappears anyway.
+"""
+import json
+import math
+import os
+import shutil
+import threading
+import time
+import zlib
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Project
+from .search import TERM_RE
+
+INDEX_VERSION = 1
+DEFAULT_NEIGHBORS = 20
+TEXT_DIMS = 64
+MIN_TERM_LENGTH = 3
+# Similarity cells computed per block (float32), bounding build memory to ~64 MB.
+BLOCK_CELLS = 1 << 24
+# Above this share of changed rows an incremental refresh falls back to a full build.
+FULL_REBUILD_RATIO = 0.2
+
+CATEGORIES = [value for value, _ in Project.Category.choices]
+NUMERIC_FEATURES = ('log_total_value', 'log_per_share_price', 'duration_days', 'funding_progress')
+NUMERIC_WEIGHT = 0.5
+TEXT_WEIGHT = 1.0
+TEXT_FIELD_WEIGHTS = (('title', 2.0), ('short_description', 1.0), ('description', 0.5))
+
+SOURCE_FIELDS = (
+    'id', 'category', 'total_value', 'per_share_price_value', 'duration_days', 'funding_progress_value',
+    'title', 'short_description', 'description',
+)
+CURRENT_FILE = 'CURRENT'
+# Versions kept on disk: the current one and the one before it.
+KEEP_VERSIONS = 2
+DEFAULT_GRACE_SECONDS = 600
+LOAD_ATTEMPTS = 3
+
+_loaded = None
+_loaded_lock = threading.Lock()
+
+
+def get_index_dir():
+    return Path(getattr(settings, 'SIMILARITY_INDEX_DIR', Path(settings.BASE_DIR) / 'var' / 'similarity'))
+
+
+# --- Features -------------------------------------------------------------
+
+def text_embedding(row):
+    """Signed hashed term frequencies of the search text, L2-normalized."""
+    vector = np.zeros(TEXT_DIMS, dtype=np.float32)
+    for field, weight in TEXT_FIELD_WEIGHTS:
+        for term in TERM_RE.findall((row.get(field) or '').lower()):
+            if len(term) < MIN_TERM_LENGTH:
+                continue
+            digest = zlib.crc32(term.encode('utf-8'))
+            sign = 1.0 if digest & 0x80000000 else -1.0
+            vector[digest % TEXT_DIMS] += sign * weight
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def raw_numeric(row):
+    return [
+        math.log1p(max(float(row['total_value'] or 0), 0.0)),
+        math.log1p(max(float(row['per_share_price_value'] or 0), 0.0)),
+        float(row['duration_days'] or 0),
+        float(row['funding_progress_value'] or 0),
+    ]
+
+
+def numeric_stats(rows):
+    raw = np.array([raw_numeric(row) for row in rows], dtype=np.float64).reshape(-1, len(NUMERIC_FEATURES))
+    mean = raw.mean(axis=0) if len(raw) else np.zeros(len(NUMERIC_FEATURES))
+    std = raw.std(axis=0) if len(raw) else np.ones(len(NUMERIC_FEATURES))
+    std[std == 0] = 1.0
+    return {'mean': mean.tolist(), 'std': std.tolist()}
+
+
+def feature_vectors(rows, stats):
+    """(len(rows), D) float32 matrix of unit feature vectors."""
+    dims = len(CATEGORIES) + len(NUMERIC_FEATURES) + TEXT_DIMS
+    vectors = np.zeros((len(rows), dims), dtype=np.float32)
+    if not rows:
+        return vectors
+    category_index = {category: index for index, category in enumerate(CATEGORIES)}
+    mean, std = np.array(stats['mean']), np.array(stats['std'])
+    numeric_start = len(CATEGORIES)
+    text_start = numeric_start + len(NUMERIC_FEATURES)
+    for index, row in enumerate(rows):
+        if row['category'] in category_index:
+            vectors[index, category_index[row['category']]] = 1.0
+        vectors[index, numeric_start:text_start] = (np.array(raw_numeric(row)) - mean) / std * NUMERIC_WEIGHT
+        vectors[index, text_start:] = text_embedding(row) * TEXT_WEIGHT
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def load_rows(queryset):
+    return list(queryset.order_by('id').values(*SOURCE_FIELDS))
+
+
+# --- Neighbours -----------------------------------------------------------
+
+def top_neighbors(query_vectors, vectors, ids, k, self_columns=None):
+    """
+    Best `k` neighbours of each query vector among `vectors` (labelled `ids`).
+
+    `self_columns[i]` is query row i's own column in `vectors`, excluded from
+    its neighbours. Rows are processed in blocks bounded by BLOCK_CELLS.
+    """
+    count = len(query_vectors)
+    neighbors = np.full((count, k), -1, dtype=np.int64)
+    scores = np.full((count, k), -np.inf, dtype=np.float32)
+    if not len(ids) or not count:
+        return neighbors, scores
+    take = min(k, len(ids))
+    block = max(1, BLOCK_CELLS // len(ids))
+    for start in range(0, count, block):
+        stop = min(start + block, count)
+        sims = query_vectors[start:stop] @ vectors.T
+        if self_columns is not None:
+            sims[np.arange(stop - start), self_columns[start:stop]] = -np.inf
+        candidates = np.argpartition(-sims, take - 1, axis=1)[:, :take]
+        candidate_scores = np.take_along_axis(sims, candidates, axis=1)
+        order = np.argsort(-candidate_scores, axis=1)
+        candidates = np.take_along_axis(candidates, order, axis=1)
+        candidate_scores = np.take_along_axis(candidate_scores, order, axis=1)
+        neighbors[start:stop, :take] = np.where(np.isfinite(candidate_scores), ids[candidates], -1)
+        scores[start:stop, :take] = candidate_scores
+    return neighbors, scores
+
+
+def merge_neighbors(neighbors, scores, extra_neighbors, extra_scores, k):
+    """Row-wise union of two neighbour lists, keeping the best `k`."""
+    all_neighbors = np.concatenate([neighbors, extra_neighbors], axis=1)
+    all_scores = np.concatenate([scores, extra_scores], axis=1)
+    all_scores = np.where(all_neighbors < 0, -np.inf, all_scores)
+    order = np.argsort(-all_scores, axis=1, kind='stable')[:, :k]
+    merged = np.take_along_axis(all_neighbors, order, axis=1)
+    merged_scores = np.take_along_axis(all_scores, order, axis=1)
+    return np.where(np.isfinite(merged_scores), merged, -1), merged_scores.astype(np.float32)
+
+
+# --- Storage --------------------------------------------------------------
+
+def positions_for(ids):
+    size = int(ids.max()) + 1 if len(ids) else 0
+    positions = np.full(size, -1, dtype=np.int32)
+    positions[ids] = np.arange(len(ids), dtype=np.int32)
+    return positions
+
+
+def write_index(ids, vectors, neighbors, scores, meta):
+    """Write a new index version and make it current."""
+    root = get_index_dir()
+    root.mkdir(parents=True, exist_ok=True)
+    version = timezone.now().strftime('%Y%m%dT%H%M%S%f')
+    target = root / version
+    target.mkdir()
+    np.save(target / 'ids.npy', ids.astype(np.int64))
+    np.save(target / 'positions.npy', positions_for(ids))
+    np.save(target / 'neighbors.npy', neighbors.astype(np.int64))
+    np.save(target / 'scores.npy', scores.astype(np.float32))
+    np.save(target / 'vectors.npy', vectors.astype(np.float32))
+    (target / 'meta.json').write_text(json.dumps({**meta, 'index_version': INDEX_VERSION}))
+
+    pointer = root / f'{CURRENT_FILE}.tmp'
+    pointer.write_text(version)
+    os.replace(pointer, root / CURRENT_FILE)
+
+    prune_versions(root)
+    return target
+
+
+def prune_versions(root, now=None):
+    """Delete versions older than the last KEEP_VERSIONS that are past the grace period."""
+    grace = getattr(settings, 'SIMILARITY_INDEX_GRACE_SECONDS', DEFAULT_GRACE_SECONDS)
+    now = time.time() if now is None else now
+    try:
+        current = (root / CURRENT_FILE).read_text().strip()
+    except FileNotFoundError:
+        current = None
+    versions = sorted((path for path in root.iterdir() if path.is_dir()), key=lambda path: path.name)
+    for stale in versions[:-KEEP_VERSIONS]:
+        if stale.name == current:
+            continue
+        try:
+            if now - stale.stat().st_mtime < grace:
+                continue
+        except FileNotFoundError:
+            continue
+        shutil.rmtree(stale, ignore_errors=True)
+
+
+class SimilarityIndex:
+    def __init__(self, path, mmap_mode='r'):
+        self.path = Path(path)
+        self.meta = json.loads((self.path / 'meta.json').read_text())
+        self.ids = np.load(self.path / 'ids.npy', mmap_mode=mmap_mode)
+        self.positions = np.load(self.path / 'positions.npy', mmap_mode=mmap_mode)
+        self.neighbors = np.load(self.path / 'neighbors.npy', mmap_mode=mmap_mode)
+        self.scores = np.load(self.path / 'scores.npy', mmap_mode=mmap_mode)
+        self._mmap_mode = mmap_mode
+
+    @property
+    def vectors(self):
+        return np.load(self.path / 'vectors.npy', mmap_mode=self._mmap_mode)
+
+    def similar(self, project_id, limit):
+        """[(project_id, score), ...] best first; empty if the project is not indexed."""
+        if project_id < 0 or project_id >= len(self.positions):
+            return []
+        row = int(self.positions[project_id])
+        if row < 0:
+            return []
+        neighbors = self.neighbors[row, :limit]
+        scores = self.scores[row, :limit]
+        return [(int(neighbor), float(score)) for neighbor, score in zip(neighbors, scores) if neighbor >= 0]
+
+
+def current_index_path():
+    try:
+        version = (get_index_dir() / CURRENT_FILE).read_text().strip()
+    except FileNotFoundError:
+        return None
+    path = get_index_dir() / version
+    return path if path.is_dir() else None
+
+
+def load_index():
+    """The live index (memory-mapped, reloaded when CURRENT moves), or None."""
+    global _loaded
+    for _ in range(LOAD_ATTEMPTS):
+        path = current_index_path()
+        if path is None:
+            return None
+        loaded = _loaded
+        if loaded is not None and loaded.path == path:
+            return loaded
+        with _loaded_lock:
+            try:
+                if _loaded is None or _loaded.path != path:
+                    _loaded = SimilarityIndex(path)
+                return _loaded
+            except FileNotFoundError:
+                # Pruned between reading CURRENT and opening it; CURRENT has moved on.
+                continue
+    return None
+
+
+# --- Builds ---------------------------------------------------------------
+
+def approved_projects():
+    return Project.objects.filter(status=Project.Status.APPROVED)
+
+
+def build_index(k=DEFAULT_NEIGHBORS):
+    """Full rebuild over the APPROVED catalog."""
+    started = timezone.now()
+    rows = load_rows(approved_projects())
+    stats = numeric_stats(rows)
+    ids = np.array([row['id'] for row in rows], dtype=np.int64)
+    vectors = feature_vectors(rows, stats)
+    neighbors, scores = top_neighbors(vectors, vectors, ids, k, self_columns=np.arange(len(ids)))
+    write_index(ids, vectors, neighbors, scores, {
+        'built_at': started.isoformat(), 'neighbors': k, 'stats': stats, 'full_build_at': started.isoformat(),
+    })
+    return {'mode': 'full', 'indexed': len(ids), 'updated': len(ids), 'removed': 0}
+
+
+def refresh_index(k=DEFAULT_NEIGHBORS, max_changed_ratio=FULL_REBUILD_RATIO):
+    """
+    Fold projects changed since the last build into the index.
+
+    Changed and new projects get fresh vectors and full neighbour lists; every
+    other row drops neighbours that changed or left the catalog and merges in
+    its similarity to the changed ones. Rows that lose a neighbour this way may
+    miss a candidate beyond their top K until the next full build, which also
+    refreshes the standardization stats.
+    """
+    path = current_index_path()
+    if path is None:
+        return build_index(k)
+    index = SimilarityIndex(path, mmap_mode=None)
+    if index.meta.get('index_version') != INDEX_VERSION or index.meta.get('neighbors') != k:
+        return build_index(k)
+
+    started = timezone.now()
+    since = parse_datetime(index.meta['built_at'])
+    stats = index.meta['stats']
+    approved_ids = set(approved_projects().values_list('id', flat=True))
+    old_ids = index.ids
+    removed = set(old_ids.tolist()) - approved_ids
+    changed_rows = load_rows(approved_projects().filter(updated_at__gte=since))
+    added = approved_ids - set(old_ids.tolist()) - {row['id'] for row in changed_rows}
+    if added:
+        changed_rows += load_rows(approved_projects().filter(id__in=added))
+    if not removed and not changed_rows:
+        return {'mode': 'incremental', 'indexed': len(old_ids), 'updated': 0, 'removed': 0}
+    if len(changed_rows) + len(removed) > max_changed_ratio * max(len(approved_ids), 1):
+        return build_index(k)
+
+    changed_ids = np.array(sorted(row['id'] for row in changed_rows), dtype=np.int64)
+    changed_rows.sort(key=lambda row: row['id'])
+    changed_vectors = feature_vectors(changed_rows, stats)
+
+    # Old rows that stay and did not change, then the changed/new rows, sorted by id.
+    dropped = np.isin(old_ids, np.array(sorted(removed | set(changed_ids.tolist())), dtype=np.int64))
+    keep = ~dropped
+    ids = np.concatenate([old_ids[keep], changed_ids])
+    vectors = np.concatenate([index.vectors[keep], changed_vectors])
+    kept_neighbors = index.neighbors[keep]
+    kept_scores = index.scores[keep]
+    order = np.argsort(ids, kind='stable')
+    kept_count = int(keep.sum())
+
+    # Unchanged rows: drop stale neighbours, merge in similarity to changed rows.
+    stale = np.isin(kept_neighbors, np.array(sorted(removed | set(changed_ids.tolist())), dtype=np.int64))
+    kept_neighbors = np.where(stale, -1, kept_neighbors)
+    kept_scores = np.where(stale, -np.inf, kept_scores)
+    extra_neighbors, extra_scores = top_neighbors(vectors[:kept_count], changed_vectors, changed_ids, k)
+    kept_neighbors, kept_scores = merge_neighbors(kept_neighbors, kept_scores, extra_neighbors, extra_scores, k)
+
+    # Changed rows: full neighbour lists against the whole index.
+    fresh_neighbors, fresh_scores = top_neighbors(
+        changed_vectors, vectors, ids, k, self_columns=kept_count + np.arange(len(changed_ids))
+    )
+
+    neighbors = np.concatenate([kept_neighbors, fresh_neighbors])[order]
+    scores = np.concatenate([kept_scores, fresh_scores])[order]
+    write_index(ids[order], vectors[order], neighbors, scores, {
+        **index.meta, 'built_at': started.isoformat(), 'neighbors': k,
+    })
+    return {'mode': 'incremental', 'indexed': len(ids), 'updated': len(changed_ids), 'removed': len(removed)}
@@ -4,20 +4,26 @@ from . import views
 urlpatterns = [
     # Projects
     path('', views.ProjectListCreateView.as_view(), name='project-list'),
+    path('facets/', views.ProjectFacetsView.as_view(), name='project-facets'),
     path('<int:pk>/', views.ProjectDetailView.as_view(), name='project-detail'),
+    path('<int:pk>/similar/', views.SimilarProjectsView.as_view(), name='project-similar'),
+    path('<int:pk>/funding-history/', views.ProjectFundingHistoryView.as_view(), name='project-funding-history'),
     path('<int:pk>/submit/', views.ProjectSubmitView.as_view(), name='project-submit'),
     path('<int:pk>/review/', views.ProjectReviewView.as_view(), name='project-review'),
     path('<int:pk>/archive/', views.ProjectArchiveView.as_view(), name='project-archive'),
     
     # Developer's projects
     path('my/', views.DeveloperProjectsView.as_view(), name='my-projects'),
+    path('my/portfolio/', views.DeveloperPortfolioView.as_view(), name='developer-portfolio'),
     
     # Favorites
     path('favorites/', views.FavoriteListCreateView.as_view(), name='favorites'),
+    path('favorites/bulk/', views.FavoriteBulkView.as_view(), name='favorites-bulk'),
     path('favorites/<int:project_id>/', views.FavoriteDeleteView.as_view(), name='favorite-delete'),
 
     # Compare
     path('compare/', views.CompareListCreateView.as_view(), name='compare'),
+    path('compare/bulk/', views.CompareBulkView.as_view(), name='compare-bulk'),
     path('compare/<int:project_id>/', views.CompareDeleteView.as_view(), name='compare-delete'),
 
     # Project edit requests
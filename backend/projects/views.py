@@ -1,17 +1,34 @@
-from rest_framework import generics, permissions, status, filters
+from rest_framework import generics, permissions, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from datetime import timedelta
-from django.db.models import Q, F, FloatField, ExpressionWrapper, Case, When
+from functools import partial
+from django.db.models import Prefetch, Q
 from django.core.serializers.json import DjangoJSONEncoder
 import json
 
 from .models import Project, Favorite, Compare, ProjectEditRequest, ProjectArchiveRequest
+from .cache import (
+    cached_catalog_response, cached_catalog_value, get_catalog_version, get_ranking_version, normalize_query,
+    viewer_access_state, viewer_membership_state, viewer_scope,
+)
+from .comparator import MAX_COMPARE, compare_projects
+from .facets import catalog_facets
+from . import ranking
+from .similarity import load_index
+from .portfolio import developer_portfolio
+from .shares import live_shares_sold, live_updated_at
+from .funding import INTERVALS, funding_series
+from .membership import MAX_BULK_PROJECTS, BulkMembership, overlay_viewer_state, with_viewer_state
+from .filters import ProjectOrderingFilter, ProjectSearchFilter
 from investments.models import Investment
 from investments.utils import apply_investment_action
+from config.conditional import conditional_response, list_fingerprint, make_etag, serializer_version
+from config.pagination import KeysetPagination
 from config.permissions import IsAdminRole
 from audit.models import AuditLog, ProjectLedgerEntry
 from notifications.models import Notification
@@ -19,7 +36,8 @@ from django.contrib.auth import get_user_model
 from .serializers import (
     ProjectListSerializer, ProjectDetailSerializer, 
     ProjectCreateSerializer, FavoriteSerializer, FavoriteCreateSerializer,
-    CompareSerializer, CompareCreateSerializer, ProjectEditRequestSerializer, ProjectArchiveRequestSerializer
+    CompareSerializer, CompareCreateSerializer, ProjectEditRequestSerializer, ProjectArchiveRequestSerializer,
+    PortfolioProjectSerializer,
 )
 
 def to_json_safe(data):
@@ -91,33 +109,34 @@ class IsOwnerOrReadOnly(permissions.BasePermission):
         return obj.developer == request.user
 
 
-class ProjectListCreateView(generics.ListCreateAPIView):
+class ProjectCatalogMixin:
     """
-    API View to list projects and create new ones.
-    
-    Features:
-    - Lists all 'APPROVED' projects for public/investor users.
-    - Lists all projects (including drafts) for ADMIN users.
-    - Lists own projects (mixed status) + all 'APPROVED' projects for DEVELOPER users.
-    - Supports advanced filtering by:
-        - Category and Status (exact match)
-        - Search (title, description)
-        - Numeric ranges (funding progress, share price, total value, duration)
-    - Supports sorting by calculated fields (funding_progress, per_share_price).
+    Role-scoped, filterable project catalog shared by the list and facets views.
+
+    - 'APPROVED' projects for public/investor users.
+    - All projects (including drafts) for ADMIN users.
+    - Own projects (mixed status) + all 'APPROVED' projects for DEVELOPER users.
     """
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, ProjectSearchFilter, ProjectOrderingFilter]
     filterset_fields = ['category', 'status']
-    search_fields = ['title', 'short_description', 'description']
-    ordering_fields = ['created_at', 'total_value', 'per_share_price_value', 'funding_progress_value', 'end_date']
+    ordering_fields = [
+        'created_at', 'total_value', 'per_share_price_value', 'funding_progress_value',
+        'remaining_shares_value', 'end_date', 'ranking__score',
+    ]
     ordering = ['-created_at']
-    
+
+    def get_base_queryset(self):
+        return Project.objects.for_listing()
+
     def get_queryset(self):
         """
-        Build the queryset with dynamic annotations and role-based filtering.
+        Build the queryset with role-based filtering and numeric range filters.
         
-        Annotations are used to calculate fields on the fly at the database level for efficient sorting/filtering:
-        - per_share_price_value: Calculated as total_value / total_shares (handles division by zero).
-        - funding_progress_value: Calculated as (shares_sold / total_shares) * 100.
+        Funding metrics are stored columns on Project (kept current in Project.save()),
+        so range filters and sorts on them are served by the (status, metric) indexes:
+        - per_share_price_value: total_value / total_shares (0 when there are no shares).
+        - funding_progress_value: (shares_sold / total_shares) * 100.
+        - remaining_shares_value: total_shares - shares_sold.
         """
         def is_admin(user):
             return user.is_authenticated and (
@@ -126,19 +145,7 @@ class ProjectListCreateView(generics.ListCreateAPIView):
                 or getattr(user, 'is_superuser', False)
             )
 
-        # Base queryset with calculated fields for sorting/filtering
-        queryset = Project.objects.all().annotate(
-            per_share_price_value=Case(
-                When(total_shares__gt=0, then=ExpressionWrapper(F('total_value') / F('total_shares'), output_field=FloatField())),
-                default=0,
-                output_field=FloatField(),
-            ),
-            funding_progress_value=Case(
-                When(total_shares__gt=0, then=ExpressionWrapper(F('shares_sold') * 100.0 / F('total_shares'), output_field=FloatField())),
-                default=0,
-                output_field=FloatField(),
-            ),
-        )
+        queryset = self.get_base_queryset()
         user = self.request.user
         
         # --- Role-Based Filtering ---
@@ -179,14 +186,16 @@ class ProjectListCreateView(generics.ListCreateAPIView):
         max_duration = parse_int(self.request.query_params.get('max_duration'))
 
         # --- Apply Filters ---
+        # Progress, share price and duration ranges are half-open (min <= value < max) like the
+        # facet buckets (projects/facets.py), whose bounds are passed back here unchanged.
         if min_progress is not None:
             queryset = queryset.filter(funding_progress_value__gte=min_progress)
         if max_progress is not None:
-            queryset = queryset.filter(funding_progress_value__lte=max_progress)
+            queryset = queryset.filter(funding_progress_value__lt=max_progress)
         if min_share_price is not None:
             queryset = queryset.filter(per_share_price_value__gte=min_share_price)
         if max_share_price is not None:
-            queryset = queryset.filter(per_share_price_value__lte=max_share_price)
+            queryset = queryset.filter(per_share_price_value__lt=max_share_price)
         if min_total_value is not None:
             queryset = queryset.filter(total_value__gte=min_total_value)
         if max_total_value is not None:
@@ -194,22 +203,64 @@ class ProjectListCreateView(generics.ListCreateAPIView):
         if min_duration is not None:
             queryset = queryset.filter(duration_days__gte=min_duration)
         if max_duration is not None:
-            queryset = queryset.filter(duration_days__lte=max_duration)
-
-        # --- Apply Custom Ordering ---
-        # Map frontend sort keys to our annotated database fields
-        ordering = self.request.query_params.get('ordering')
-        if ordering:
-            ordering_map = {
-                'per_share_price': 'per_share_price_value',
-                '-per_share_price': '-per_share_price_value',
-                'funding_progress': 'funding_progress_value',
-                '-funding_progress': '-funding_progress_value',
-            }
-            queryset = queryset.order_by(ordering_map.get(ordering, ordering))
+            queryset = queryset.filter(duration_days__lt=max_duration)
 
         return queryset
+
+
+class ProjectListCreateView(ProjectCatalogMixin, generics.ListCreateAPIView):
+    """
+    API View to list projects and create new ones.
     
+    Features:
+    - Role-based visibility (see ProjectCatalogMixin).
+    - Supports advanced filtering by:
+        - Category and Status (exact match)
+        - Full-text search (`q`/`search`) over title, short and long description, ranked by relevance
+        - Numeric ranges (funding progress, share price, total value, duration); `max_*` is
+          exclusive except for total value, matching the facet buckets
+    - Supports sorting by stored funding metrics (funding_progress, per_share_price, remaining_shares)
+      and by trending score (`ordering=trending`, see projects/ranking.py).
+    - Keyset pagination (`cursor`) by default; `page` keeps page-number pagination with `count`.
+    - Responses for guests and investors are cached per catalog version (see projects/cache.py).
+    """
+    pagination_class = KeysetPagination
+
+    def list(self, request, *args, **kwargs):
+        """
+        Guests and investors share the APPROVED catalog, so their pages are cached.
+
+        The ETag fingerprints the filtered catalog (latest updated_at + count) for
+        this viewer and query string; a matching If-None-Match skips serialization.
+        It also carries the catalog version, which moves on changes updated_at
+        does not see (a developer rename, image rows written by signals).
+        Trending pages also change when scores do, so they carry the ranking version.
+        Per-viewer card flags are overlaid on the (shared) page after the cache.
+        """
+        ranking_version = get_ranking_version() if ranking.orders_by_trending(request) else ''
+        latest, count = cached_catalog_value(
+            request, 'list-fingerprint',
+            lambda: list_fingerprint(self.filter_queryset(self.get_queryset())),
+            ranking_version,
+            all_viewers=True,
+        )
+        etag = make_etag(
+            'projects', serializer_version(ProjectListSerializer), viewer_scope(request.user),
+            normalize_query(request), latest, count, ranking_version, viewer_membership_state(request.user),
+            get_catalog_version(),
+        )
+        page = partial(
+            cached_catalog_response, request, 'list', partial(super().list, request, *args, **kwargs), ranking_version,
+        )
+
+        def build():
+            response = page()
+            if response.status_code == status.HTTP_200_OK:
+                overlay_viewer_state(response.data['results'], request.user)
+            return response
+
+        return conditional_response(request, build, etag=etag, last_modified=latest)
+
     def get_serializer_class(self):
         """Use different serializers for reading (List) vs writing (Create)."""
         if self.request.method == 'POST':
@@ -259,6 +310,106 @@ class ProjectListCreateView(generics.ListCreateAPIView):
         )
 
 
+class ProjectFacetsView(ProjectCatalogMixin, generics.GenericAPIView):
+    """
+    Facet counts for the catalog filter sidebar.
+
+    Accepts the same filters as the project list and returns counts per
+    category, funding-progress bucket, share-price band and duration band
+    from a single aggregate query. Cached per role and filter combination.
+    """
+    permission_classes = [permissions.AllowAny]
+    pagination_class = None
+
+    def get_base_queryset(self):
+        return Project.objects.all()
+
+    def get(self, request):
+        return cached_catalog_response(request, 'facets', self.build_response, all_viewers=True)
+
+    def build_response(self):
+        return Response(catalog_facets(self.filter_queryset(self.get_queryset())))
+
+
+class SimilarProjectsView(APIView):
+    """
+    Projects most similar to the given one, from the precomputed index
+    (see projects/similarity.py; rebuilt by `build_similarity_index`).
+    """
+    permission_classes = [permissions.AllowAny]
+    default_limit = 10
+
+    def get(self, request, pk):
+        try:
+            limit = int(request.query_params.get('limit', self.default_limit))
+        except (TypeError, ValueError):
+            limit = self.default_limit
+
+        index = load_index()
+        neighbours = index.similar(pk, max(1, limit)) if index is not None else []
+        scores = dict(neighbours)
+        projects = with_viewer_state(
+            Project.objects.for_listing().filter(id__in=scores, status=Project.Status.APPROVED), request.user,
+        )
+        projects = sorted(projects, key=lambda project: -scores[project.id])
+        results = ProjectListSerializer(projects, many=True, context={'request': request}).data
+        for item in results:
+            item['similarity'] = round(scores[item['id']], 4)
+        return Response({'project_id': pk, 'indexed': index is not None, 'results': results})
+
+
+class ProjectFundingHistoryView(APIView):
+    """
+    Daily funding snapshots of a project (see projects/funding.py).
+
+    Query params: `from` / `to` (YYYY-MM-DD, inclusive) and `interval`
+    (day, week or month; each point carries the last state of its bucket).
+    Visible for approved projects, and to the owner and admins otherwise.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request, pk):
+        try:
+            project = Project.objects.only('id', 'status', 'developer_id').get(pk=pk)
+        except Project.DoesNotExist:
+            return Response({'error': 'Project not found'}, status=status.HTTP_404_NOT_FOUND)
+        user = request.user
+        if project.status != Project.Status.APPROVED and not (
+            user.is_authenticated and (project.developer_id == user.id or is_admin_user(user))
+        ):
+            return Response({'error': 'Project not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        bounds = {}
+        for param in ('from', 'to'):
+            value = request.query_params.get(param)
+            if not value:
+                bounds[param] = None
+                continue
+            try:
+                bounds[param] = parse_date(value)
+            except ValueError:
+                bounds[param] = None
+            if bounds[param] is None:
+                return Response({'error': f'{param} must be a date (YYYY-MM-DD)'}, status=status.HTTP_400_BAD_REQUEST)
+        if bounds['from'] and bounds['to'] and bounds['from'] > bounds['to']:
+            return Response({'error': 'from must not be after to'}, status=status.HTTP_400_BAD_REQUEST)
+
+        interval = request.query_params.get('interval', 'day')
+        if interval not in INTERVALS:
+            return Response(
+                {'error': f"interval must be one of: {', '.join(INTERVALS)}"}, status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        points = funding_series(project, bounds['from'], bounds['to'], interval)
+        return Response({
+            'project_id': project.id,
+            'interval': interval,
+            'from': bounds['from'],
+            'to': bounds['to'],
+            'points': points,
+        })
+
+
 class ProjectDetailView(generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update, or delete a project."""
     queryset = Project.objects.all()
@@ -269,6 +420,25 @@ class ProjectDetailView(generics.RetrieveUpdateDestroyAPIView):
             return ProjectCreateSerializer
         return ProjectDetailSerializer
 
+    def get_object(self):
+        project = super().get_object()
+        if self.request.method in permissions.SAFE_METHODS:
+            # Sharded projects: include sales not folded back into shares_sold yet.
+            project.shares_sold = live_shares_sold(project)
+        return project
+
+    def retrieve(self, request, *args, **kwargs):
+        pk = kwargs.get('pk')
+        build = partial(cached_catalog_response, request, 'detail', partial(super().retrieve, request, *args, **kwargs), pk)
+        updated_at = cached_catalog_value(request, 'detail-updated', partial(live_updated_at, pk), pk, all_viewers=True)
+        if updated_at is None:
+            return build()
+        etag = make_etag(
+            'project', pk, updated_at, serializer_version(ProjectDetailSerializer),
+            viewer_scope(request.user), viewer_access_state(request.user), get_catalog_version(),
+        )
+        return conditional_response(request, build, etag=etag, last_modified=updated_at)
+
     def update(self, request, *args, **kwargs):
         project = self.get_object()
         if project.status == Project.Status.APPROVED and request.user == project.developer and request.user.role == 'DEVELOPER':
@@ -536,7 +706,24 @@ class DeveloperProjectsView(generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        return Project.objects.filter(developer=self.request.user)
+        return with_viewer_state(Project.objects.for_listing(), self.request.user).filter(developer=self.request.user)
+
+
+class DeveloperPortfolioView(APIView):
+    """
+    The authenticated developer's projects with raised amount, investor count,
+    pending investment requests and access requests, plus the dashboard totals.
+
+    Everything comes from one grouped query (see projects/portfolio.py).
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        projects, totals = developer_portfolio(request.user)
+        return Response({
+            'totals': totals,
+            'projects': PortfolioProjectSerializer(projects, many=True, context={'request': request}).data,
+        })
 
 
 class FavoriteListCreateView(generics.ListCreateAPIView):
@@ -544,7 +731,9 @@ class FavoriteListCreateView(generics.ListCreateAPIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        return Favorite.objects.filter(user=self.request.user)
+        return Favorite.objects.filter(user=self.request.user).prefetch_related(
+            Prefetch('project', queryset=with_viewer_state(Project.objects.for_listing(), self.request.user))
+        )
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -552,7 +741,8 @@ class FavoriteListCreateView(generics.ListCreateAPIView):
         return FavoriteSerializer
     
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        favorite = serializer.save(user=self.request.user)
+        ranking.favorite_added(favorite)
 
 
 class FavoriteDeleteView(generics.DestroyAPIView):
@@ -566,6 +756,7 @@ class FavoriteDeleteView(generics.DestroyAPIView):
         try:
             favorite = Favorite.objects.get(user=request.user, project_id=project_id)
             favorite.delete()
+            ranking.favorite_removed(favorite)
             return Response(status=status.HTTP_204_NO_CONTENT)
         except Favorite.DoesNotExist:
             return Response({'error': 'Favorite not found'}, status=status.HTTP_404_NOT_FOUND)
@@ -576,7 +767,9 @@ class CompareListCreateView(generics.ListCreateAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return Compare.objects.filter(user=self.request.user)
+        return Compare.objects.filter(user=self.request.user).prefetch_related(
+            Prefetch('project', queryset=with_viewer_state(Project.objects.for_listing(), self.request.user))
+        )
 
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -603,6 +796,59 @@ class CompareDeleteView(generics.DestroyAPIView):
             return Response({'error': 'Compare item not found'}, status=status.HTTP_404_NOT_FOUND)
 
 
+class BulkMembershipView(APIView):
+    """
+    Add and/or remove up to MAX_BULK_PROJECTS projects in one request.
+
+    Body: {"add": [project ids], "remove": [project ids]}; each list is written
+    with a single statement. Unknown project IDs are ignored.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    model = None
+    record_ranking = False
+
+    def parse_ids(self, request, key):
+        raw_ids = request.data.get(key) or []
+        if not isinstance(raw_ids, list):
+            raise ValueError(f'{key} must be a list of project IDs')
+        try:
+            return list(dict.fromkeys(int(value) for value in raw_ids))
+        except (TypeError, ValueError):
+            raise ValueError(f'{key} must be a list of project IDs')
+
+    def post(self, request):
+        try:
+            add_ids = self.parse_ids(request, 'add')
+            remove_ids = self.parse_ids(request, 'remove')
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        if not add_ids and not remove_ids:
+            return Response({'error': 'add or remove is required'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(add_ids) + len(remove_ids) > MAX_BULK_PROJECTS:
+            return Response(
+                {'error': f'At most {MAX_BULK_PROJECTS} projects per request'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if set(add_ids) & set(remove_ids):
+            return Response({'error': 'A project cannot be both added and removed'}, status=status.HTTP_400_BAD_REQUEST)
+
+        membership = BulkMembership(self.model, request.user, record_ranking=self.record_ranking)
+        added = membership.add(add_ids) if add_ids else []
+        removed = membership.remove(remove_ids) if remove_ids else []
+        return Response({'added': added, 'removed': removed})
+
+
+class FavoriteBulkView(BulkMembershipView):
+    """Bulk add/remove favorites."""
+    model = Favorite
+    record_ranking = True
+
+
+class CompareBulkView(BulkMembershipView):
+    """Bulk add/remove compare items."""
+    model = Compare
+
+
 class ProjectEditRequestListCreateView(generics.ListCreateAPIView):
     """List or create project edit requests."""
     permission_classes = [permissions.IsAuthenticated]
@@ -931,58 +1177,29 @@ class ProjectArchiveRequestReviewView(APIView):
 
 
 class ProjectComparatorView(APIView):
-    """Return normalized comparison data for projects."""
+    """
+    Return comparison data for projects.
+
+    Scores are normalized across the selection and ranked (percentiles,
+    z-scores) against the APPROVED catalog; see projects/comparator.py.
+    """
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request):
         project_ids = request.data.get('project_ids') or []
         if not isinstance(project_ids, list) or not project_ids:
             return Response({'error': 'project_ids list is required'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            project_ids = {int(project_id) for project_id in project_ids}
+        except (TypeError, ValueError):
+            return Response({'error': 'project_ids must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(project_ids) > MAX_COMPARE:
+            return Response(
+                {'error': f'At most {MAX_COMPARE} projects can be compared at once'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
-        projects = Project.objects.filter(id__in=project_ids)
-        if not projects.exists():
+        data = compare_projects(project_ids)
+        if data is None:
             return Response({'error': 'No projects found'}, status=status.HTTP_404_NOT_FOUND)
-
-        def metric_values(attr):
-            return [float(getattr(project, attr)) for project in projects]
-
-        per_share_values = [project.per_share_price for project in projects]
-        funding_values = [project.funding_progress for project in projects]
-        total_values = metric_values('total_value')
-
-        def normalize(value, min_val, max_val):
-            if max_val == min_val:
-                return 1
-            return (value - min_val) / (max_val - min_val)
-
-        min_per_share, max_per_share = min(per_share_values), max(per_share_values)
-        min_funding, max_funding = min(funding_values), max(funding_values)
-        min_total, max_total = min(total_values), max(total_values)
-
-        data = []
-        for project in projects:
-            data.append({
-                'id': project.id,
-                'title': project.title,
-                'category': project.category,
-                'status': project.status,
-                'total_value': float(project.total_value),
-                'total_shares': project.total_shares,
-                'shares_sold': project.shares_sold,
-                'per_share_price': project.per_share_price,
-                'funding_progress': project.funding_progress,
-                'normalized': {
-                    'per_share_price': normalize(project.per_share_price, min_per_share, max_per_share),
-                    'funding_progress': normalize(project.funding_progress, min_funding, max_funding),
-                    'total_value': normalize(float(project.total_value), min_total, max_total),
-                },
-            })
-
-        return Response({
-            'projects': data,
-            'metrics': {
-                'per_share_price': {'min': min_per_share, 'max': max_per_share},
-                'funding_progress': {'min': min_funding, 'max': max_funding},
-                'total_value': {'min': min_total, 'max': max_total},
-            },
-        })
+        return Response(data)
@@ -4,7 +4,12 @@ from rest_framework import status
 from django.urls import reverse
 from users.models import User
 from projects.models import Project
+from investments.gateways import MockGateway
 from investments.models import Investment, Payment
+from investments.payments import process_payment_queue
+from django.db import DatabaseError
+from django.db.models import F
+from audit.models import AuditLog, ProjectLedgerEntry
 from django.utils import timezone
 
 @pytest.mark.django_db
@@ -68,9 +73,14 @@ class TestInvestmentFlow:
         self.client.force_authenticate(user=self.investor)
         payment_url = reverse('process-payment', args=[investment_id])
         response = self.client.post(payment_url, {'payment_method': 'credit_card'})
-        assert response.status_code == status.HTTP_200_OK
-        assert response.data['investment']['status'] == 'PROCESSING'
-        assert response.data['payment']['status'] == 'SUCCESS'
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        assert response.data['investment']['status'] == 'APPROVED'
+        assert response.data['payment']['status'] == 'QUEUED'
+
+        # The payment worker charges it; the gateway's answer moves the investment on.
+        assert process_payment_queue(MockGateway())['succeeded'] == 1
+        assert Investment.objects.get(pk=investment_id).status == 'PROCESSING'
+        assert Payment.objects.get(investment_id=investment_id).status == 'SUCCESS'
         
         # 4. Admin completes investment
         self.client.force_authenticate(user=self.admin)
@@ -81,7 +91,26 @@ class TestInvestmentFlow:
         
         # Verify shares sold updated
         self.project.refresh_from_db()
-        assert self.project.shares_sold == 10
+        assert (self.project.shares_sold, self.project.reserved_shares) == (10, 0)
+
+    def test_requests_reserve_shares_until_they_are_dropped(self):
+        self.client.force_authenticate(user=self.investor)
+        response = self.client.post(self.list_url, {'project': self.project.id, 'shares': 600})
+        assert response.status_code == status.HTTP_201_CREATED
+        first = response.data['id']
+        response = self.client.post(self.list_url, {'project': self.project.id, 'shares': 500})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'Only 400 shares available' in str(response.data['shares'])
+        second = self.client.post(self.list_url, {'project': self.project.id, 'shares': 400}).data['id']
+        self.project.refresh_from_db()
+        assert self.project.reserved_shares == 1000
+
+        self.client.force_authenticate(user=self.admin)
+        self.client.post(reverse('investment-review', args=[first]), {'action': 'reject'})
+        self.client.force_authenticate(user=self.investor)
+        self.client.post(reverse('investment-revoke', args=[second]))
+        self.project.refresh_from_db()
+        assert self.project.reserved_shares == 0
 
     def test_revoke_investment(self):
         # Create request first
@@ -117,6 +146,28 @@ class TestInvestmentFlow:
         assert response.status_code == status.HTTP_200_OK
         assert len(response.data['results']) >= 1
 
+    def test_investment_conditional_get(self):
+        investment = Investment.objects.create(
+            investor=self.investor,
+            project=self.project,
+            shares=5,
+            price_per_share=100,
+            total_amount=500,
+            status='REQUESTED'
+        )
+        detail_url = reverse('investment-detail', args=[investment.id])
+        self.client.force_authenticate(user=self.investor)
+
+        etag = self.client.get(detail_url)['ETag']
+        assert self.client.get(detail_url, HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_304_NOT_MODIFIED
+        list_etag = self.client.get(self.list_url)['ETag']
+        assert self.client.get(self.list_url, HTTP_IF_NONE_MATCH=list_etag).status_code == status.HTTP_304_NOT_MODIFIED
+
+        investment.status = 'APPROVED'
+        investment.save(update_fields=['status'])
+        assert self.client.get(detail_url, HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_200_OK
+        assert self.client.get(self.list_url, HTTP_IF_NONE_MATCH=list_etag).status_code == status.HTTP_200_OK
+
     def test_admin_reject_investment(self):
         self.client.force_authenticate(user=self.admin)
         inv = Investment.objects.create(
@@ -132,3 +183,196 @@ class TestInvestmentFlow:
         assert response.status_code == status.HTTP_200_OK
         inv.refresh_from_db()
         assert inv.status == 'REJECTED'
+
+    def test_review_survives_a_failed_audit_write(self, monkeypatch):
+        inv = Investment.objects.create(
+            investor=self.investor, project=self.project, shares=5, price_per_share=100, total_amount=500,
+            status='REQUESTED',
+        )
+
+        def broken_create(**kwargs):
+            raise DatabaseError('audit table unavailable')
+
+        monkeypatch.setattr(AuditLog.objects, 'create', broken_create)
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.post(reverse('investment-review', args=[inv.id]), {'action': 'approve'})
+        assert response.status_code == status.HTTP_200_OK
+        inv.refresh_from_db()
+        assert inv.status == 'APPROVED'
+        assert inv.payments.filter(status='PENDING').exists()
+        assert ProjectLedgerEntry.objects.filter(entry_type='INVESTMENT_APPROVED').exists()
+
+    def test_list_is_a_pure_read(self):
+        Investment.objects.create(
+            investor=self.investor, project=self.project, shares=5, price_per_share=100, total_amount=500,
+            status='APPROVED', approval_expires_at=timezone.now() - timezone.timedelta(days=1),
+        )
+        self.client.force_authenticate(user=self.investor)
+        response = self.client.get(self.list_url)
+        assert [item['status'] for item in response.data['results']] == ['APPROVED']
+
+
+@pytest.mark.django_db
+class TestExpireInvestmentsCommand:
+    def setup_method(self):
+        self.investor = User.objects.create_user(
+            username='expiry-investor', email='expiry-investor@example.com', password='password123', role='INVESTOR'
+        )
+        developer = User.objects.create_user(
+            username='expiry-dev', email='expiry-dev@example.com', password='password123', role='DEVELOPER'
+        )
+        self.project = Project.objects.create(
+            developer=developer, title="Expiring", description="Desc", short_description="Short",
+            total_value=100000, total_shares=1000, duration_days=60, status='APPROVED'
+        )
+
+    def approve(self, expires_in_days, with_payment=False):
+        investment = Investment.objects.create(
+            investor=self.investor, project=self.project, shares=5, price_per_share=100, total_amount=500,
+            status='APPROVED', approval_expires_at=timezone.now() + timezone.timedelta(days=expires_in_days),
+        )
+        if with_payment:
+            Payment.objects.create(
+                transaction_id=f'TXN-EXPIRY-{investment.id}', investor=self.investor, investment=investment,
+                amount=500, status='PENDING',
+            )
+        return investment
+
+    def expire(self, **options):
+        from io import StringIO
+        from django.core.management import call_command
+
+        out = StringIO()
+        call_command('expire_investments', stdout=out, **options)
+        return out.getvalue()
+
+    def test_expires_due_approvals_in_bulk(self, django_assert_max_num_queries):
+        from audit.models import AuditLog, ProjectLedgerEntry
+        from notifications.models import Notification
+
+        due = [self.approve(-1, with_payment=True) for _ in range(5)]
+        pending = self.approve(3, with_payment=True)
+
+        Project.objects.filter(pk=self.project.pk).update(reserved_shares=30)
+
+        # SELECT + 3 UPDATEs + 3 INSERTs + two savepoint pairs, whatever the number of rows.
+        with django_assert_max_num_queries(11):
+            assert 'Expired 5 investments' in self.expire()
+
+        assert set(Investment.objects.filter(status='EXPIRED').values_list('id', flat=True)) == {
+            investment.id for investment in due
+        }
+        assert Payment.objects.get(investment=pending).status == 'PENDING'
+        assert Payment.objects.filter(investment__in=due, status='FAILED').count() == 5
+        assert Notification.objects.filter(user=self.investor, type='INVESTMENT_EXPIRED').count() == 5
+        assert AuditLog.objects.filter(action_type='INVESTMENT_EXPIRED').count() == 5
+        entry = ProjectLedgerEntry.objects.get(
+            entry_type='INVESTMENT_EXPIRED', metadata__investment_id=str(due[0].id),
+        )
+        assert entry.metadata['expires_at'] == str(due[0].approval_expires_at)
+        self.project.refresh_from_db()
+        assert self.project.reserved_shares == 5
+        assert 'Expired 0 investments' in self.expire()
+
+    def test_batches(self):
+        for _ in range(5):
+            self.approve(-1)
+        assert 'Expired 5 investments' in self.expire(batch_size=2)
+        assert not Investment.objects.filter(status='APPROVED').exists()
+
+
+@pytest.mark.django_db
+class TestBulkInvestmentEndpoints:
+    def setup_method(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_user(
+            username='bulk-admin', email='bulk-admin@example.com', password='password123', role='ADMIN'
+        )
+        self.investor = User.objects.create_user(
+            username='bulk-investor', email='bulk-investor@example.com', password='password123', role='INVESTOR'
+        )
+        developer = User.objects.create_user(
+            username='bulk-dev', email='bulk-dev@example.com', password='password123', role='DEVELOPER'
+        )
+        self.projects = [
+            Project.objects.create(
+                developer=developer, title=f"Bulk {index}", description="Desc", short_description="Short",
+                total_value=10000, total_shares=100, duration_days=60, status='APPROVED'
+            )
+            for index in range(2)
+        ]
+        self.client.force_authenticate(user=self.admin)
+
+    def invest(self, project, shares, state):
+        Project.objects.filter(pk=project.pk).update(reserved_shares=F('reserved_shares') + shares)
+        return Investment.objects.create(
+            investor=self.investor, project=project, shares=shares, price_per_share=100,
+            total_amount=shares * 100, status=state,
+        )
+
+    def test_bulk_review_is_set_based(self, django_assert_max_num_queries):
+        from audit.models import AuditLog, ProjectLedgerEntry
+        from notifications.models import Notification
+
+        requested = [self.invest(self.projects[index % 2], 2, 'REQUESTED') for index in range(20)]
+        completed = self.invest(self.projects[0], 1, 'COMPLETED')
+        ids = [investment.id for investment in requested] + [completed.id, 999999]
+
+        with django_assert_max_num_queries(16):
+            response = self.client.post(
+                reverse('investment-bulk-review'), {'ids': ids, 'action': 'approve'}, format='json',
+            )
+        assert response.status_code == status.HTTP_200_OK
+        assert (response.data['succeeded'], response.data['failed']) == (20, 2)
+        assert [result['id'] for result in response.data['results']] == ids
+        assert response.data['results'][-2:] == [
+            {'id': completed.id, 'ok': False, 'error': 'Investment is not awaiting review'},
+            {'id': 999999, 'ok': False, 'error': 'Investment not found'},
+        ]
+        assert Investment.objects.filter(status='APPROVED', approval_expires_at__isnull=False).count() == 20
+        assert Payment.objects.filter(status='PENDING').count() == 20
+        assert Notification.objects.filter(type='INVESTMENT_APPROVED').count() == 20
+        assert AuditLog.objects.filter(action_type='INVESTMENT_APPROVED').count() == 20
+        assert ProjectLedgerEntry.objects.filter(entry_type='INVESTMENT_APPROVED').count() == 20
+
+        response = self.client.post(
+            reverse('investment-bulk-review'), {'ids': ids[:10], 'action': 'reject'}, format='json',
+        )
+        assert response.data['failed'] == 10
+        assert Payment.objects.filter(status='PENDING').count() == 20
+
+    def test_bulk_reject_releases_reservations(self):
+        investments = [self.invest(self.projects[0], 10, 'REQUESTED') for _ in range(3)]
+        response = self.client.post(
+            reverse('investment-bulk-review'),
+            {'ids': [investment.id for investment in investments], 'action': 'reject'},
+            format='json',
+        )
+        assert response.data['succeeded'] == 3
+        self.projects[0].refresh_from_db()
+        assert self.projects[0].reserved_shares == 0
+
+    def test_bulk_complete_reports_partial_failures(self):
+        first, second, third = (self.invest(self.projects[0], shares, 'PROCESSING') for shares in (40, 40, 30))
+        other = self.invest(self.projects[1], 5, 'PROCESSING')
+        ids = [first.id, second.id, third.id, other.id]
+
+        response = self.client.post(reverse('investment-bulk-complete'), {'ids': ids}, format='json')
+        assert response.status_code == status.HTTP_200_OK
+        assert [result['ok'] for result in response.data['results']] == [True, True, False, True]
+        assert response.data['results'][2]['error'] == 'Only 20 shares remain in this project'
+        assert set(Investment.objects.filter(status='COMPLETED').values_list('id', flat=True)) == {
+            first.id, second.id, other.id,
+        }
+        for project in self.projects:
+            project.refresh_from_db()
+        assert (self.projects[0].shares_sold, self.projects[0].reserved_shares) == (80, 30)
+        assert (self.projects[1].shares_sold, self.projects[1].reserved_shares) == (5, 0)
+
+    def test_rejects_bad_payloads(self):
+        url = reverse('investment-bulk-complete')
+        assert self.client.post(url, {'ids': 'x'}, format='json').status_code == status.HTTP_400_BAD_REQUEST
+        response = self.client.post(url, {'ids': list(range(1, 502))}, format='json')
+        assert response.data == {'error': 'At most 500 investments per request'}
+        self.client.force_authenticate(user=self.investor)
+        assert self.client.post(url, {'ids': [1]}, format='json').status_code == status.HTTP_403_FORBIDDEN
@@ -0,0 +1,106 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from audit.models import IdempotencyKey
+from investments.models import Investment, Payment
+from projects.models import Project
+from users.models import User
+
+
+@pytest.mark.django_db
+class TestIdempotencyKeys:
+    def setup_method(self):
+        self.client = APIClient()
+        self.investor = User.objects.create_user(
+            username='idem-investor', email='idem-investor@example.com', password='password123', role='INVESTOR'
+        )
+        developer = User.objects.create_user(
+            username='idem-dev', email='idem-dev@example.com', password='password123', role='DEVELOPER'
+        )
+        self.project = Project.objects.create(
+            developer=developer, title="Retried", description="Desc", short_description="Short",
+            total_value=10000, total_shares=100, duration_days=60, status='APPROVED'
+        )
+        self.client.force_authenticate(user=self.investor)
+
+    def test_retried_payment_is_replayed(self, django_assert_num_queries):
+        investment = Investment.objects.create(
+            investor=self.investor, project=self.project, shares=5, price_per_share=100, total_amount=500,
+            status='APPROVED', approval_expires_at=timezone.now() + timezone.timedelta(days=1),
+        )
+        url = reverse('process-payment', args=[investment.id])
+        first = self.client.post(url, {'payment_method': 'card'}, HTTP_IDEMPOTENCY_KEY='pay-1')
+        assert first.status_code == status.HTTP_202_ACCEPTED
+
+        # The replay is one lookup on the key table.
+        with django_assert_num_queries(1):
+            retry = self.client.post(url, {'payment_method': 'card'}, HTTP_IDEMPOTENCY_KEY='pay-1')
+        assert retry.status_code == status.HTTP_202_ACCEPTED
+        assert retry['Idempotent-Replayed'] == 'true'
+        assert retry.json() == first.json()
+        assert list(Payment.objects.filter(investment=investment).values_list('status', flat=True)) == ['QUEUED']
+
+        # Without the key the retry is a new request, refused while the charge is queued.
+        assert self.client.post(url, {'payment_method': 'card'}).status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_retried_request_reserves_once(self):
+        payload = {'project': self.project.id, 'shares': 10}
+        url = reverse('investment-list')
+        first = self.client.post(url, payload, HTTP_IDEMPOTENCY_KEY='request-1')
+        retry = self.client.post(url, payload, HTTP_IDEMPOTENCY_KEY='request-1')
+        assert (first.status_code, retry.status_code) == (status.HTTP_201_CREATED, status.HTTP_201_CREATED)
+        assert retry.data['id'] == first.data['id']
+        self.project.refresh_from_db()
+        assert (Investment.objects.count(), self.project.reserved_shares) == (1, 10)
+
+        response = self.client.post(url, {**payload, 'shares': 11}, HTTP_IDEMPOTENCY_KEY='request-1')
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    def test_keys_are_scoped_per_user(self):
+        other = User.objects.create_user(
+            username='idem-other', email='idem-other@example.com', password='password123', role='INVESTOR'
+        )
+        url = reverse('investment-list')
+        self.client.post(url, {'project': self.project.id, 'shares': 1}, HTTP_IDEMPOTENCY_KEY='shared')
+        self.client.force_authenticate(user=other)
+        self.client.post(url, {'project': self.project.id, 'shares': 1}, HTTP_IDEMPOTENCY_KEY='shared')
+        assert Investment.objects.count() == 2
+
+    def test_in_flight_and_failed_requests(self):
+        import json
+        from config.idempotency import digest
+
+        url = reverse('investment-list')
+        response = self.client.post(url, {'project': self.project.id, 'shares': 0}, HTTP_IDEMPOTENCY_KEY='bad')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        # Validation errors wrote nothing, so the key is free for a corrected retry.
+        assert not IdempotencyKey.objects.exists()
+
+        # A first request with this key is still running (claimed, no response yet).
+        payload = {'project': self.project.id, 'shares': 1}
+        IdempotencyKey.objects.create(
+            key_digest=digest(self.investor.pk, 'POST', url, 'running'),
+            request_fingerprint=digest('POST', url, json.dumps(payload, sort_keys=True)),
+            expires_at=timezone.now() + timezone.timedelta(hours=1),
+        )
+        response = self.client.post(url, payload, format='json', HTTP_IDEMPOTENCY_KEY='running')
+        assert response.status_code == status.HTTP_409_CONFLICT
+        assert not Investment.objects.exists()
+
+    def test_purge_deletes_expired_keys(self):
+        now = timezone.now()
+        for index in range(5):
+            IdempotencyKey.objects.create(
+                key_digest=f'{index:032d}', request_fingerprint='f' * 32, status_code=200,
+                expires_at=now + timezone.timedelta(hours=-1 if index < 3 else 1),
+            )
+        out = StringIO()
+        call_command('purge_idempotency_keys', batch_size=2, stdout=out)
+        assert 'Purged 3 idempotency keys' in out.getvalue()
+        assert IdempotencyKey.objects.count() == 2
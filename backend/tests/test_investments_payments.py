@@ -0,0 +1,187 @@
+import threading
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from audit.models import AuditLog
+from investments.gateways import ChargeResult, GatewayError, HttpGateway, MockGateway, serve_mock_gateway
+from investments.models import Investment, Payment
+from investments.payments import MAX_RETRY_DELAY, process_payment_queue, retry_delay
+from investments.utils import expire_due_investments
+from projects.models import Project
+from users.models import User, Wallet
+
+
+class ScriptedGateway(MockGateway):
+    """Answers charges from a list of outcomes: a ChargeResult or an exception to raise."""
+
+    def __init__(self, *outcomes):
+        super().__init__()
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def charge(self, payment):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+@pytest.mark.django_db
+class TestPaymentQueue:
+    def setup_method(self):
+        self.client = APIClient()
+        self.investor = User.objects.create_user(
+            username='pay-investor', email='pay-investor@example.com', password='password123', role='INVESTOR'
+        )
+        developer = User.objects.create_user(
+            username='pay-dev', email='pay-dev@example.com', password='password123', role='DEVELOPER'
+        )
+        self.project = Project.objects.create(
+            developer=developer, title="Queued", description="Desc", short_description="Short",
+            total_value=10000, total_shares=100, reserved_shares=10, duration_days=60, status='APPROVED'
+        )
+        self.investment = Investment.objects.create(
+            investor=self.investor, project=self.project, shares=10, price_per_share=100, total_amount=1000,
+            status='APPROVED', approval_expires_at=timezone.now() + timezone.timedelta(days=1),
+        )
+        self.client.force_authenticate(user=self.investor)
+
+    def pay(self):
+        return self.client.post(reverse('process-payment', args=[self.investment.id]), {'payment_method': 'card'})
+
+    def test_payment_is_queued_and_applied_on_callback(self):
+        Payment.objects.create(
+            transaction_id='PENDING-1', investor=self.investor, investment=self.investment, amount=1000,
+        )
+        response = self.pay()
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        assert response.data['payment']['status'] == 'QUEUED'
+        assert not AuditLog.objects.filter(action_type='PAYMENT_PROCESSED').exists()
+
+        # A second request while the charge is queued is refused, as is revoking.
+        assert self.pay().status_code == status.HTTP_400_BAD_REQUEST
+        revoke = self.client.post(reverse('investment-revoke', args=[self.investment.id]))
+        assert revoke.status_code == status.HTTP_400_BAD_REQUEST
+
+        assert process_payment_queue(MockGateway(), workers=2)['succeeded'] == 1
+        payment = Payment.objects.get(investment=self.investment)
+        assert (payment.status, payment.attempts, payment.next_attempt_at) == ('SUCCESS', 1, None)
+        assert payment.gateway_reference.startswith('ch_')
+        self.investment.refresh_from_db()
+        assert self.investment.status == 'PROCESSING'
+        assert AuditLog.objects.filter(action_type='PAYMENT_PROCESSED', target_id=str(payment.id)).count() == 1
+
+        # Nothing is left to charge.
+        assert not any(process_payment_queue(MockGateway()).values())
+
+    def test_gateway_errors_back_off_then_fail(self, settings):
+        settings.PAYMENT_MAX_ATTEMPTS = 2
+        self.pay()
+        gateway = ScriptedGateway(GatewayError('timeout'), GatewayError('timeout again'))
+
+        assert process_payment_queue(gateway)['retried'] == 1
+        payment = Payment.objects.get(investment=self.investment)
+        assert (payment.status, payment.attempts, payment.last_error) == ('QUEUED', 1, 'timeout')
+        assert payment.next_attempt_at > timezone.now()
+
+        # Not due yet; once it is, the last attempt fails the payment but not the investment.
+        assert not any(process_payment_queue(gateway).values())
+        Payment.objects.filter(pk=payment.pk).update(next_attempt_at=timezone.now())
+        assert process_payment_queue(gateway)['failed'] == 1
+        payment.refresh_from_db()
+        assert (payment.status, payment.attempts, payment.last_error) == ('FAILED', 2, 'timeout again')
+        self.investment.refresh_from_db()
+        assert self.investment.status == 'APPROVED'
+        assert gateway.calls == 2
+
+        # The investor can pay again.
+        assert self.pay().status_code == status.HTTP_202_ACCEPTED
+
+    def test_declined_payment_is_final(self):
+        self.pay()
+        outcomes = process_payment_queue(ScriptedGateway(ChargeResult(False, 'ch_1', 'Insufficient funds')))
+        assert outcomes['declined'] == 1
+        payment = Payment.objects.get(investment=self.investment)
+        assert (payment.status, payment.last_error) == ('FAILED', 'Insufficient funds')
+        assert self.investor.notifications.filter(type='PAYMENT_FAILED').exists()
+
+    def test_charge_for_a_closed_investment_is_refunded(self):
+        self.pay()
+        # The investment is released while its charge is in flight.
+        Investment.objects.filter(pk=self.investment.pk).update(status='REFUNDED')
+        assert process_payment_queue(ScriptedGateway(ChargeResult(True, 'ch_2')))['refunded'] == 1
+        assert Payment.objects.get(investment=self.investment).status == 'REFUNDED'
+        assert Wallet.objects.get(user=self.investor).balance == 1000
+
+    def test_expiry_waits_for_a_queued_charge(self):
+        self.pay()
+        Investment.objects.filter(pk=self.investment.pk).update(approval_expires_at=timezone.now())
+        assert expire_due_investments() == 0
+        process_payment_queue(MockGateway())
+        self.investment.refresh_from_db()
+        assert self.investment.status == 'PROCESSING'
+
+    def test_admin_cannot_release_an_investment_with_a_queued_charge(self):
+        admin = User.objects.create_user(
+            username='pay-admin', email='pay-admin@example.com', password='password123', role='ADMIN'
+        )
+        self.pay()
+        self.client.force_authenticate(user=admin)
+        response = self.client.post(
+            reverse('investment-admin-action', args=[self.investment.id]), {'action': 'refund'}
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+        # The charge goes through once, and nothing is credited back.
+        assert process_payment_queue(MockGateway())['succeeded'] == 1
+        self.investment.refresh_from_db()
+        assert self.investment.status == 'PROCESSING'
+        assert not Wallet.objects.filter(user=self.investor, balance__gt=0).exists()
+
+        # Once the charge has settled the refund goes through, crediting the wallet once.
+        response = self.client.post(
+            reverse('investment-admin-action', args=[self.investment.id]), {'action': 'refund'}
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert Wallet.objects.get(user=self.investor).balance == 1000
+        assert Payment.objects.get(investment=self.investment).status == 'REFUNDED'
+
+    def test_retry_delay_doubles_with_jitter(self):
+        for attempt in range(1, 6):
+            assert 2 ** (attempt - 1) / 2 <= retry_delay(attempt, base=1) <= 2 ** (attempt - 1)
+        assert retry_delay(30, base=1) <= MAX_RETRY_DELAY
+
+
+class TestHttpGateway:
+    def setup_method(self):
+        self.gateway = MockGateway(seed=1)
+        self.server = serve_mock_gateway(gateway=self.gateway)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        host, port = self.server.server_address[:2]
+        self.client = HttpGateway(f'http://{host}:{port}', timeout=5)
+
+    def teardown_method(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def payment(self, transaction_id):
+        return Payment(transaction_id=transaction_id, amount=100, payment_method='card')
+
+    def test_charges_are_idempotent_per_transaction(self):
+        first = self.client.charge(self.payment('TXN-A'))
+        assert first.approved and first.reference.startswith('ch_')
+        assert self.client.charge(self.payment('TXN-A')) == first
+        assert self.client.charge(self.payment('TXN-B')).reference != first.reference
+
+    def test_failures_raise_and_declines_return(self):
+        self.gateway.failure_rate = 1
+        with pytest.raises(GatewayError):
+            self.client.charge(self.payment('TXN-C'))
+        self.gateway.failure_rate, self.gateway.decline_rate = 0, 1
+        result = self.client.charge(self.payment('TXN-C'))
+        assert (result.approved, result.message) == (False, 'Card declined')
@@ -0,0 +1,100 @@
+import pytest
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from investments.models import Investment, Payment
+from investments.transitions import INVESTMENT_TRANSITIONS, can_transition, transition, transition_queryset
+from investments.utils import apply_investment_action
+from projects.models import Project
+from users.models import User, Wallet
+
+
+@pytest.mark.django_db
+class TestInvestmentTransitions:
+    def setup_method(self):
+        self.admin = User.objects.create_user(
+            username='fsm-admin', email='fsm-admin@example.com', password='password123', role='ADMIN'
+        )
+        self.investor = User.objects.create_user(
+            username='fsm-investor', email='fsm-investor@example.com', password='password123', role='INVESTOR'
+        )
+        developer = User.objects.create_user(
+            username='fsm-dev', email='fsm-dev@example.com', password='password123', role='DEVELOPER'
+        )
+        self.project = Project.objects.create(
+            developer=developer, title="Machine", description="Desc", short_description="Short",
+            total_value=10000, total_shares=100, reserved_shares=10, duration_days=60, status='APPROVED'
+        )
+
+    def invest(self, state='REQUESTED', shares=10):
+        return Investment.objects.create(
+            investor=self.investor, project=self.project, shares=shares, price_per_share=100,
+            total_amount=shares * 100, status=state,
+        )
+
+    def test_every_transition_targets_a_real_status(self):
+        statuses = set(Investment.Status.values)
+        for spec in INVESTMENT_TRANSITIONS.values():
+            assert spec.target in statuses
+            assert spec.sources <= statuses
+
+    def test_a_stale_copy_loses_without_writing(self, django_assert_num_queries):
+        investment = self.invest()
+        stale = Investment.objects.get(pk=investment.pk)
+        assert transition(investment, 'approve', admin_note='ok')
+        assert investment.status == 'APPROVED'
+
+        # The stale copy still believes the row is REQUESTED; its UPDATE matches nothing.
+        with django_assert_num_queries(1):
+            assert not transition(stale, 'reject')
+        assert stale.status == 'REQUESTED'
+        investment.refresh_from_db()
+        assert (investment.status, investment.admin_note) == ('APPROVED', 'ok')
+
+        # A status the table does not allow is refused without a query.
+        with django_assert_num_queries(0):
+            assert not can_transition(investment, 'complete')
+            assert not transition(investment, 'complete')
+
+    def test_queryset_transitions_skip_rows_that_moved(self):
+        movable = [self.invest('APPROVED') for _ in range(3)]
+        self.invest('COMPLETED')
+        assert transition_queryset(Investment.objects.all(), 'expire') == 3
+        assert set(Investment.objects.filter(status='EXPIRED').values_list('id', flat=True)) == {
+            investment.id for investment in movable
+        }
+
+    def test_racing_revoke_and_reject_release_once(self):
+        investment = self.invest()
+        stale = Investment.objects.get(pk=investment.pk)
+        client = APIClient()
+        client.force_authenticate(user=self.admin)
+        assert client.post(
+            reverse('investment-review', args=[investment.id]), {'action': 'reject'}
+        ).status_code == status.HTTP_200_OK
+
+        # The revoke read the row before the rejection landed.
+        assert not transition(stale, 'cancel')
+        self.project.refresh_from_db()
+        assert self.project.reserved_shares == 0
+
+    def test_admin_action_cannot_refund_twice(self):
+        investment = self.invest('PROCESSING')
+        Payment.objects.create(
+            transaction_id='TXN-FSM', investor=self.investor, investment=investment, amount=1000, status='SUCCESS',
+        )
+        stale = Investment.objects.get(pk=investment.pk)
+        client = APIClient()
+        client.force_authenticate(user=self.admin)
+        url = reverse('investment-admin-action', args=[investment.id])
+        assert client.post(url, {'action': 'refund'}).status_code == status.HTTP_200_OK
+        response = client.post(url, {'action': 'refund'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data == {'error': 'Investment cannot be refunded'}
+        assert not apply_investment_action(stale, 'withdraw', actor=self.admin)
+
+        assert Wallet.objects.get(user=self.investor).balance == 1000
+        assert Payment.objects.get(investment=investment).status == 'REFUNDED'
+        self.project.refresh_from_db()
+        assert self.project.reserved_shares == 0
@@ -0,0 +1,152 @@
+import json
+import time
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from audit.models import AuditLog
+from investments.gateways import ChargeResult, MockGateway, sign_webhook
+from investments.models import Investment, Payment, PaymentWebhookEvent
+from investments.payments import process_payment_queue
+from investments.webhooks import apply_webhook_events
+from projects.models import Project
+from users.models import User
+
+SECRET = 'whsec-test'
+
+
+class PendingGateway(MockGateway):
+    def charge(self, payment):
+        return ChargeResult(None)
+
+
+@pytest.mark.django_db
+class TestPaymentWebhooks:
+    @pytest.fixture(autouse=True)
+    def webhook_secret(self, settings):
+        settings.PAYMENT_WEBHOOK_SECRET = SECRET
+
+    def setup_method(self):
+        self.client = APIClient()
+        self.url = reverse('payment-webhook')
+        self.investor = User.objects.create_user(
+            username='hook-investor', email='hook-investor@example.com', password='password123', role='INVESTOR'
+        )
+        User.objects.create_user(
+            username='hook-admin', email='hook-admin@example.com', password='password123', role='ADMIN'
+        )
+        developer = User.objects.create_user(
+            username='hook-dev', email='hook-dev@example.com', password='password123', role='DEVELOPER'
+        )
+        self.project = Project.objects.create(
+            developer=developer, title="Hooked", description="Desc", short_description="Short",
+            total_value=10000, total_shares=100, reserved_shares=40, duration_days=60, status='APPROVED'
+        )
+
+    def queue_payments(self, count):
+        payments = []
+        for index in range(count):
+            investment = Investment.objects.create(
+                investor=self.investor, project=self.project, shares=1, price_per_share=100, total_amount=100,
+                status='APPROVED', approval_expires_at=timezone.now() + timezone.timedelta(days=1),
+            )
+            payments.append(Payment.objects.create(
+                transaction_id=f'TXN-HOOK-{index}', investor=self.investor, investment=investment, amount=100,
+                status='QUEUED', payment_method='card', next_attempt_at=timezone.now(),
+            ))
+        return payments
+
+    def deliver(self, event_id, event_type, transaction_id, signature=None, **data):
+        body = json.dumps({
+            'id': event_id, 'type': event_type, 'data': {'idempotency_key': transaction_id, **data},
+        }).encode('utf-8')
+        return self.client.post(
+            self.url, body, content_type='application/json',
+            HTTP_GATEWAY_SIGNATURE=signature or sign_webhook(body, SECRET),
+        )
+
+    def test_ingestion_is_one_insert(self, django_assert_num_queries):
+        with django_assert_num_queries(1):
+            response = self.deliver('evt_1', 'charge.succeeded', 'TXN-X', id='ch_1')
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        # A resent event is stored once.
+        assert self.deliver('evt_1', 'charge.succeeded', 'TXN-X', id='ch_1').status_code == status.HTTP_202_ACCEPTED
+        event = PaymentWebhookEvent.objects.get()
+        assert (event.event_type, event.transaction_id, event.applied_at) == ('charge.succeeded', 'TXN-X', None)
+
+    def test_unsigned_or_stale_webhooks_are_refused(self):
+        forged = self.deliver('evt_2', 'charge.succeeded', 'TXN-X', signature='t=1,v1=00')
+        body = b'{"id": "evt_3"}'
+        stale = self.client.post(
+            self.url, body, content_type='application/json',
+            HTTP_GATEWAY_SIGNATURE=sign_webhook(body, SECRET, timestamp=time.time() - 3600),
+        )
+        assert (forged.status_code, stale.status_code) == (status.HTTP_400_BAD_REQUEST, status.HTTP_400_BAD_REQUEST)
+        assert not PaymentWebhookEvent.objects.exists()
+
+    def test_batch_is_deduplicated_and_applied_set_wise(self, django_assert_max_num_queries):
+        payments = self.queue_payments(20)
+        for index, payment in enumerate(payments[:19]):
+            self.deliver(f'evt_ok_{index}', 'charge.succeeded', payment.transaction_id, id=f'ch_{index}')
+        self.deliver('evt_no', 'charge.declined', payments[19].transaction_id, error='Insufficient funds')
+        # A second outcome for a settled payment, an unknown type and an unknown payment.
+        self.deliver('evt_dup', 'charge.declined', payments[0].transaction_id)
+        self.deliver('evt_refund', 'charge.refunded', payments[1].transaction_id)
+        self.deliver('evt_other', 'charge.succeeded', 'TXN-UNKNOWN')
+
+        # The query count does not grow with the batch.
+        with django_assert_max_num_queries(25):
+            assert apply_webhook_events() == 23
+
+        assert Payment.objects.filter(status='SUCCESS').count() == 19
+        declined = Payment.objects.get(pk=payments[19].pk)
+        assert (declined.status, declined.last_error) == ('FAILED', 'Insufficient funds')
+        assert Payment.objects.get(pk=payments[0].pk).gateway_reference == 'ch_0'
+        assert Investment.objects.filter(status='PROCESSING').count() == 19
+        assert AuditLog.objects.filter(action_type='PAYMENT_PROCESSED').count() == 19
+        results = dict(PaymentWebhookEvent.objects.values_list('event_id', 'result'))
+        assert (results['evt_ok_0'], results['evt_dup'], results['evt_refund'], results['evt_other']) == (
+            'APPLIED', 'DUPLICATE', 'IGNORED', 'IGNORED',
+        )
+        assert not PaymentWebhookEvent.objects.filter(applied_at__isnull=True).exists()
+
+        # Late redelivery with a new event ID changes nothing.
+        self.deliver('evt_late', 'charge.declined', payments[2].transaction_id)
+        apply_webhook_events()
+        assert Payment.objects.get(pk=payments[2].pk).status == 'SUCCESS'
+        assert PaymentWebhookEvent.objects.get(event_id='evt_late').result == 'IGNORED'
+
+    def test_pending_charge_waits_for_its_webhook(self):
+        payment, = self.queue_payments(1)
+        assert process_payment_queue(PendingGateway())['pending'] == 1
+        payment.refresh_from_db()
+        assert (payment.status, payment.attempts) == ('QUEUED', 1)
+        assert payment.next_attempt_at > timezone.now()
+
+        self.deliver('evt_pending', 'charge.succeeded', payment.transaction_id, id='ch_late')
+        apply_webhook_events()
+        payment.refresh_from_db()
+        assert (payment.status, payment.gateway_reference) == ('SUCCESS', 'ch_late')
+        assert payment.investment.status == 'PROCESSING'
+
+    def test_purge_deletes_applied_events_past_retention(self, settings):
+        settings.PAYMENT_WEBHOOK_RETENTION_DAYS = 7
+        for index in range(4):
+            self.deliver(f'evt_old_{index}', 'charge.succeeded', f'TXN-OLD-{index}')
+        self.deliver('evt_recent', 'charge.succeeded', 'TXN-RECENT')
+        apply_webhook_events()
+        self.deliver('evt_inbox', 'charge.succeeded', 'TXN-INBOX')
+        PaymentWebhookEvent.objects.filter(event_id__startswith='evt_old').update(
+            applied_at=timezone.now() - timezone.timedelta(days=8)
+        )
+
+        out = StringIO()
+        call_command('purge_payment_webhooks', batch_size=3, stdout=out)
+        assert 'Purged 4 webhook events' in out.getvalue()
+        # Recently applied events and the unapplied inbox stay.
+        assert set(PaymentWebhookEvent.objects.values_list('event_id', flat=True)) == {'evt_recent', 'evt_inbox'}
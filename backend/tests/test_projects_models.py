@@ -43,6 +43,26 @@ class TestProjectModel:
         assert project.per_share_price == 0
         assert project.funding_progress == 0
 
+    def test_stored_funding_metrics_follow_shares_sold(self, developer):
+        project = Project.objects.create(
+            developer=developer,
+            title='Stored Metrics',
+            description='Description',
+            total_value=1000.00,
+            total_shares=100,
+            shares_sold=10,
+            duration_days=30
+        )
+        assert project.per_share_price_value == 10.0
+        assert project.funding_progress_value == 10.0
+        assert project.remaining_shares_value == 90
+
+        project.shares_sold = 40
+        project.save(update_fields=['shares_sold'])
+        project.refresh_from_db()
+        assert project.funding_progress_value == 40.0
+        assert project.remaining_shares_value == 60
+
 @pytest.mark.django_db
 class TestProjectEditRequest:
     def test_create_edit_request(self, developer):
@@ -62,3 +82,126 @@ class TestProjectEditRequest:
         assert request.status == ProjectEditRequest.Status.PENDING
         assert request.changes['description'] == 'Updated'
         assert str(request) == f"Edit request for Edit Me by {developer.email}"
+
+
+@pytest.mark.django_db
+class TestSeedProjectsCommand:
+    def seed(self, path, **options):
+        from io import StringIO
+        from django.core.management import call_command
+
+        out = StringIO()
+        call_command('seed_projects', path=str(path), stdout=out, stderr=out, **options)
+        return out.getvalue()
+
+    def records(self):
+        return [
+            {'id': 'solar', 'title': 'Solar', 'developerId': 'dev-1', 'developerName': 'Jane Dev',
+             'status': 'APPROVED', 'totalValue': 1000, 'totalShares': 100, 'sharesSold': 25,
+             'durationDays': 30, 'images': ['https://example.com/a.jpg', 'https://example.com/b.jpg']},
+            {'id': 'wind', 'title': 'Wind', 'developerId': 'dev-1', 'developerName': 'Jane Dev',
+             'totalValue': 500, 'totalShares': 50, 'durationDays': 60},
+            {'title': 'No ID', 'developerId': 'dev-2', 'totalValue': 10, 'totalShares': 1, 'durationDays': 1},
+        ]
+
+    def test_streams_json_and_upserts_on_external_id(self, tmp_path, monkeypatch):
+        import json
+        from projects import importer
+        from projects.models import ProjectImage, ProjectRanking
+
+        # Tiny reads so records straddle chunk boundaries.
+        monkeypatch.setattr(importer, 'READ_CHUNK_SIZE', 7)
+        path = tmp_path / 'projects.json'
+        path.write_text(json.dumps(self.records(), indent=2))
+
+        output = self.seed(path, batch_size=2)
+        assert 'Created: 3, Updated: 0, Images: 2' in output
+        solar = Project.objects.get(external_id='solar')
+        assert (solar.developer.email, solar.developer.first_name) == ('dev-1@seed.local', 'Jane')
+        assert solar.funding_progress_value == 25.0
+        assert ProjectRanking.objects.count() == 3
+
+        output = self.seed(path, batch_size=2)
+        assert 'Created: 0, Updated: 3' in output
+        assert Project.objects.count() == 3
+        assert ProjectImage.objects.filter(project=solar).count() == 2
+
+    def test_ndjson_updates_in_place_and_adopts_legacy_rows(self, tmp_path):
+        import json
+
+        legacy_developer = User.objects.create(email='dev-1@seed.local', username='dev-1@seed.local', role='DEVELOPER')
+        legacy = Project.objects.create(developer=legacy_developer, title='Solar', description='Old',
+                                        total_value=1, total_shares=1, duration_days=1)
+        records = self.records()
+        records[0]['description'] = 'New'
+        records[0]['images'] = ['https://example.com/c.jpg']
+        path = tmp_path / 'projects.ndjson'
+        path.write_text('\n'.join(json.dumps(record) for record in records) + '\n')
+
+        output = self.seed(path)
+        assert 'Created: 2, Updated: 1' in output
+        legacy.refresh_from_db()
+        assert (legacy.external_id, legacy.description) == ('solar', 'New')
+        assert list(legacy.images.values_list('image_url', flat=True)) == ['https://example.com/c.jpg']
+
+    def test_reports_malformed_input(self, tmp_path):
+        path = tmp_path / 'broken.json'
+        path.write_text('[{"id": "a", "title": "A", "totalShares": 1, "durationDays": 1, "totalValue": 1}, {"id": ')
+        output = self.seed(path, batch_size=1)
+        assert 'Invalid JSON' in output
+        assert Project.objects.filter(external_id='a').exists()
+
+
+@pytest.mark.django_db
+class TestProjectImageSync:
+    def urls(self, *names):
+        return [f'https://example.com/{name}.jpg' for name in names]
+
+    def create(self, developer, images):
+        from projects.serializers import ProjectCreateSerializer
+
+        serializer = ProjectCreateSerializer(data={
+            'title': 'Gallery', 'description': 'Desc', 'short_description': 'Short',
+            'total_value': 1000, 'total_shares': 100, 'duration_days': 30, 'images': images,
+        })
+        serializer.is_valid(raise_exception=True)
+        return serializer.save(developer=developer)
+
+    def update(self, project, images):
+        from projects.serializers import ProjectCreateSerializer
+
+        serializer = ProjectCreateSerializer(project, data={'images': images}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+    def test_update_keeps_unchanged_rows(self, developer):
+        project = self.create(developer, self.urls('a', 'b', 'c'))
+        before = dict(project.images.values_list('image_url', 'id'))
+
+        self.update(project, self.urls('c', 'a', 'd'))
+        after = list(project.images.order_by('order').values_list('image_url', 'id'))
+        assert [url for url, _ in after] == self.urls('c', 'a', 'd')
+        assert after[0][1] == before[self.urls('c')[0]]
+        assert after[1][1] == before[self.urls('a')[0]]
+        assert after[2][1] not in before.values()
+
+    @pytest.mark.parametrize('size', [3, 60])
+    def test_update_runs_a_fixed_number_of_queries(self, developer, django_assert_num_queries, size):
+        names = [str(index) for index in range(size)]
+        project = self.create(developer, self.urls(*names))
+        # Reverse, drop the first and add one: a move, a delete and an insert.
+        changed = self.urls(*reversed(names[1:]), 'new')
+        # project UPDATE + image SELECT + delete()'s SELECT and DELETE + bulk UPDATE + INSERT
+        with django_assert_num_queries(6):
+            self.update(project, changed)
+        assert list(project.images.order_by('order').values_list('image_url', flat=True)) == changed
+
+    def test_repeated_urls_are_matched_one_to_one(self):
+        from projects.images import diff_images
+        from projects.models import ProjectImage
+
+        existing = [ProjectImage(id=1, image_url='x', order=0), ProjectImage(id=2, image_url='x', order=1)]
+        moved, created, removed = diff_images(existing, ['y', 'x'])
+        assert [(image.id, image.order) for image in moved] == [(1, 1)]
+        assert [(image.image_url, image.order) for image in created] == [('y', 0)]
+        assert removed == [2]
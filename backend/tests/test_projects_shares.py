@@ -0,0 +1,315 @@
+import multiprocessing
+import threading
+
+import pytest
+from django.db import IntegrityError, connection, connections, transaction
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from investments.models import Investment
+from projects.models import Project, ProjectShareCounter
+from projects.shares import (
+    InsufficientShares, configure_counters, fold_all_counters, live_shares_sold, release_reservation,
+    release_shares, reservation_drift, reserve_shares, sell_shares,
+)
+from users.models import User
+
+SHARES_PER_SALE = 3
+SALES_PER_WORKER = 50
+WORKERS = 8
+
+
+def make_project(total_shares=1000, shares_sold=0, reserved_shares=0):
+    developer = User.objects.create_user(
+        username=f'shares-dev-{total_shares}-{shares_sold}',
+        email=f'shares-dev-{total_shares}-{shares_sold}@example.com',
+        password='password123',
+        role='DEVELOPER'
+    )
+    return Project.objects.create(
+        developer=developer,
+        title="Hot Project",
+        description="Desc",
+        short_description="Short Desc",
+        total_value=total_shares * 100,
+        total_shares=total_shares,
+        shares_sold=shares_sold,
+        reserved_shares=reserved_shares,
+        duration_days=30,
+        status='APPROVED'
+    )
+
+
+def hammer(project_id):
+    """Reserve and sell SHARES_PER_SALE shares SALES_PER_WORKER times on a fresh connection; returns the sales made."""
+    project = Project.objects.get(pk=project_id)
+    sold = 0
+    try:
+        for _ in range(SALES_PER_WORKER):
+            try:
+                reserve_shares(project, SHARES_PER_SALE)
+                sell_shares(project, SHARES_PER_SALE, reserved=True)
+                sold += 1
+            except InsufficientShares:
+                pass
+    finally:
+        connections.close_all()
+    return sold
+
+
+@pytest.mark.django_db
+class TestShareAccounting:
+    def test_sell_and_release_update_the_stored_metrics(self):
+        project = make_project(total_shares=100, shares_sold=10)
+        sell_shares(project, 40)
+        assert (project.shares_sold, project.remaining_shares_value, project.funding_progress_value) == (50, 50, 50.0)
+        release_shares(project, 70)
+        assert (project.shares_sold, project.remaining_shares_value, project.funding_progress_value) == (0, 100, 0.0)
+
+    def test_overselling_is_refused(self):
+        project = make_project(total_shares=100, shares_sold=90)
+        with pytest.raises(InsufficientShares):
+            sell_shares(project, 11)
+        sell_shares(project, 10)
+        project.refresh_from_db()
+        assert project.shares_sold == 100
+
+        with pytest.raises(IntegrityError), transaction.atomic():
+            Project.objects.filter(pk=project.pk).update(shares_sold=101)
+
+    def test_complete_view_refuses_to_oversell(self):
+        project = make_project(total_shares=100, shares_sold=95)
+        admin = User.objects.create_user(
+            username='shares-admin', email='shares-admin@example.com', password='password123', role='ADMIN'
+        )
+        investor = User.objects.create_user(
+            username='shares-investor', email='shares-investor@example.com', password='password123', role='INVESTOR'
+        )
+        investment = Investment.objects.create(
+            investor=investor, project=project, shares=10, price_per_share=100, total_amount=1000,
+            status='PROCESSING',
+        )
+        client = APIClient()
+        client.force_authenticate(user=admin)
+        response = client.post(reverse('investment-complete', args=[investment.id]))
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        investment.refresh_from_db()
+        project.refresh_from_db()
+        assert (investment.status, project.shares_sold) == ('PROCESSING', 95)
+
+    def test_edit_cannot_drop_total_shares_below_sold(self):
+        from projects.serializers import ProjectCreateSerializer
+
+        project = make_project(total_shares=100, shares_sold=60)
+        serializer = ProjectCreateSerializer(project, data={'total_shares': 50}, partial=True)
+        assert not serializer.is_valid()
+        assert 'total_shares' in serializer.errors
+
+        serializer = ProjectCreateSerializer(project, data={'total_shares': 200}, partial=True)
+        assert serializer.is_valid()
+        serializer.save()
+        project.refresh_from_db()
+        assert (project.shares_sold, project.funding_progress_value) == (60, 30.0)
+
+
+@pytest.mark.django_db
+class TestShareReservations:
+    def test_reservations_count_against_availability(self):
+        project = make_project(total_shares=100, shares_sold=50)
+        reserve_shares(project, 30)
+        with pytest.raises(InsufficientShares, match='Only 20 shares available'):
+            reserve_shares(project, 21)
+        with pytest.raises(InsufficientShares):
+            sell_shares(project, 21)
+
+        sell_shares(project, 30, reserved=True)
+        assert (project.shares_sold, project.reserved_shares, project.remaining_shares_value) == (80, 0, 20)
+        release_reservation(project, 5)
+        project.refresh_from_db()
+        assert project.reserved_shares == 0
+
+    def test_edit_cannot_drop_total_shares_below_reserved(self):
+        from projects.serializers import ProjectCreateSerializer
+
+        project = make_project(total_shares=100, shares_sold=20, reserved_shares=40)
+        serializer = ProjectCreateSerializer(project, data={'total_shares': 59}, partial=True)
+        assert not serializer.is_valid()
+        assert 'total_shares' in serializer.errors
+
+    def test_drift_is_found_in_one_query_and_fixed(self, django_assert_num_queries):
+        from io import StringIO
+        from django.core.management import call_command
+
+        project = make_project(total_shares=100, reserved_shares=3)
+        investor = User.objects.create_user(
+            username='drift-investor', email='drift-investor@example.com', password='password123', role='INVESTOR'
+        )
+        for shares, state in [(5, 'REQUESTED'), (7, 'PROCESSING'), (11, 'COMPLETED')]:
+            Investment.objects.create(
+                investor=investor, project=project, shares=shares, price_per_share=100, total_amount=shares * 100,
+                status=state,
+            )
+        with django_assert_num_queries(1):
+            assert list(reservation_drift()) == [(project.id, 3, 12)]
+
+        out = StringIO()
+        call_command('check_share_reservations', '--fix', stdout=out)
+        assert 'Fixed 1 projects' in out.getvalue()
+        project.refresh_from_db()
+        assert project.reserved_shares == 12
+        assert not reservation_drift().exists()
+
+    def test_rebuild_replays_the_ledger(self):
+        from io import StringIO
+        from audit.models import ProjectLedgerEntry
+        from django.core.management import call_command
+
+        project = make_project(total_shares=100, reserved_shares=50)
+        for investment_id, entry_type, metadata in [
+            (1, 'INVESTMENT_REQUESTED', {'shares': 5}),
+            (2, 'INVESTMENT_REQUESTED', {'shares': 7}),
+            (3, 'INVESTMENT_REQUESTED', {'shares': 9}),
+            (2, 'INVESTMENT_PROCESSING', {}),
+            (1, 'INVESTMENT_REJECTED', {'shares': 5}),
+            (3, 'INVESTMENT_COMPLETED', {'shares': 9}),
+        ]:
+            ProjectLedgerEntry.objects.create(
+                project=project, entry_type=entry_type, metadata={'investment_id': str(investment_id), **metadata},
+            )
+
+        out = StringIO()
+        call_command('rebuild_share_reservations', str(project.id), stdout=out)
+        assert f'Project {project.id}: reserved_shares 50 -> 7' in out.getvalue()
+        project.refresh_from_db()
+        assert project.reserved_shares == 7
+
+
+@pytest.mark.django_db
+class TestShardedShareCounters:
+    def counters(self, project):
+        return list(ProjectShareCounter.objects.filter(project=project).order_by('slot').values_list('sold', 'settled'))
+
+    def test_reserved_sales_go_through_the_slots_and_fold_back(self):
+        project = make_project(total_shares=100, shares_sold=10, reserved_shares=20)
+        configure_counters(project, 4)
+        assert self.counters(project) == [(0, 0)] * 4
+
+        updated_at = Project.objects.get(pk=project.pk).updated_at
+        sell_shares(project, 5, reserved=True)
+        release_shares(project, 2)
+        assert (project.shares_sold, project.reserved_shares, live_shares_sold(project)) == (10, 20, 13)
+        assert Project.objects.get(pk=project.pk).updated_at == updated_at
+        counters = self.counters(project)
+        assert (sum(sold for sold, _ in counters), sum(settled for _, settled in counters)) == (3, 5)
+
+        assert fold_all_counters() == 1
+        project.refresh_from_db()
+        assert (project.shares_sold, project.reserved_shares, project.remaining_shares_value) == (13, 15, 87)
+        assert self.counters(project) == [(0, 0)] * 4
+
+    def test_unreserved_sales_fold_under_the_lock(self):
+        project = make_project(total_shares=100, shares_sold=90, reserved_shares=4)
+        configure_counters(project, 4)
+        sell_shares(project, 6)
+        assert project.shares_sold == 96
+        with pytest.raises(InsufficientShares):
+            sell_shares(project, 1)
+        sell_shares(project, 4, reserved=True)
+        assert live_shares_sold(project) == 100
+
+    def test_slots_refuse_sales_the_reservations_do_not_cover(self):
+        project = make_project(total_shares=10)
+        configure_counters(project, 2)
+        with pytest.raises(InsufficientShares):
+            sell_shares(project, 20, reserved=True)
+        assert self.counters(project) == [(0, 0)] * 2
+
+        # Without a reservation behind it the sale folds under the lock, as an unreserved one.
+        sell_shares(project, 4, reserved=True)
+        assert (project.shares_sold, project.reserved_shares, live_shares_sold(project)) == (4, 0, 4)
+        assert self.counters(project) == [(0, 0)] * 2
+
+    def test_releases_never_take_the_count_below_zero(self):
+        project = make_project(total_shares=100, shares_sold=3)
+        configure_counters(project, 2)
+        release_shares(project, 5)
+        assert live_shares_sold(project) == 0
+        assert fold_all_counters() == 1
+        project.refresh_from_db()
+        assert (project.shares_sold, project.remaining_shares_value) == (0, 100)
+
+    def test_one_bad_project_does_not_stop_the_fold(self):
+        broken, healthy = make_project(total_shares=10), make_project(total_shares=100, reserved_shares=5)
+        configure_counters(broken, 2)
+        configure_counters(healthy, 2)
+        ProjectShareCounter.objects.filter(project=broken, slot=0).update(sold=20)
+        sell_shares(healthy, 5, reserved=True)
+
+        assert fold_all_counters() == 1
+        broken.refresh_from_db()
+        healthy.refresh_from_db()
+        assert (broken.shares_sold, healthy.shares_sold, healthy.reserved_shares) == (0, 5, 0)
+
+    def test_switching_off_folds_the_slots(self):
+        project = make_project(total_shares=100, reserved_shares=7)
+        configure_counters(project, 2)
+        sell_shares(project, 7, reserved=True)
+        configure_counters(project, 0)
+        project.refresh_from_db()
+        assert (project.counter_slots, project.shares_sold, project.reserved_shares) == (0, 7, 0)
+        assert not ProjectShareCounter.objects.filter(project=project).exists()
+
+    def test_detail_shows_unfolded_sales(self):
+        project = make_project(total_shares=100, reserved_shares=30)
+        configure_counters(project, 2)
+        client = APIClient()
+        url = reverse('project-detail', args=[project.id])
+        etag = client.get(url)['ETag']
+        sell_shares(project, 30, reserved=True)
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        assert (response.data['shares_sold'], response.data['remaining_shares']) == (30, 70)
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.skipif(
+    connection.vendor == 'sqlite',
+    reason='needs a database shared between processes (the SQLite test database is in memory)',
+)
+class TestShareAccountingUnderContention:
+    """
+    Over-subscribe one project (WORKERS x SALES_PER_WORKER sales of
+    SHARES_PER_SALE shares > total_shares) and check that every sale that
+    succeeded is counted and none went past total_shares.
+    """
+    total_shares = 1000
+
+    def assert_no_lost_updates(self, project, sales):
+        fold_all_counters()
+        project.refresh_from_db()
+        assert (project.shares_sold, project.reserved_shares) == (sales * SHARES_PER_SALE, 0)
+        assert sales == self.total_shares // SHARES_PER_SALE
+        assert project.remaining_shares_value == self.total_shares - project.shares_sold
+
+    @pytest.mark.parametrize('slots', [0, 4])
+    def test_threads(self, slots):
+        project = make_project(total_shares=self.total_shares)
+        configure_counters(project, slots)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(hammer(project.pk))) for _ in range(WORKERS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assert_no_lost_updates(project, sum(results))
+
+    @pytest.mark.parametrize('slots', [0, 4])
+    def test_processes(self, slots):
+        project = make_project(total_shares=self.total_shares)
+        configure_counters(project, slots)
+        # Children must not share the parent's connection.
+        connections.close_all()
+        with multiprocessing.get_context('fork').Pool(WORKERS) as pool:
+            sales = sum(pool.map(hammer, [project.pk] * WORKERS))
+        self.assert_no_lost_updates(project, sales)
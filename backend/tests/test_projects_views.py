@@ -2,8 +2,9 @@ import pytest
 from rest_framework.test import APIClient
 from rest_framework import status
 from django.urls import reverse
+from django.utils import timezone
 from users.models import User
-from projects.models import Project
+from projects.models import Compare, Favorite, Project, ProjectImage
 
 @pytest.mark.django_db
 class TestProjectListCreateView:
@@ -53,6 +54,108 @@ class TestProjectListCreateView:
         assert len(response.data['results']) == 1
         assert response.data['results'][0]['title'] == "Public Project"
 
+    def test_progress_filter_and_ordering_use_stored_metrics(self):
+        for title, sold in [('Low', 100), ('High', 900), ('Mid', 500)]:
+            Project.objects.create(
+                developer=self.user,
+                title=title,
+                description="Desc",
+                short_description="Short Desc",
+                total_value=10000,
+                total_shares=1000,
+                shares_sold=sold,
+                duration_days=30,
+                status='APPROVED'
+            )
+
+        response = self.client.get(self.url, {'min_progress': 40, 'ordering': '-funding_progress'})
+        assert response.status_code == status.HTTP_200_OK
+        assert [item['title'] for item in response.data['results']] == ['High', 'Mid']
+
+    def test_full_text_search_ranks_title_matches_first(self):
+        common = dict(
+            developer=self.user,
+            total_value=10000,
+            total_shares=1000,
+            duration_days=30,
+            status='APPROVED',
+        )
+        Project.objects.create(title="Community Garden", short_description="Urban farming",
+                               description="A solar powered greenhouse", **common)
+        Project.objects.create(title="Solar Farm", short_description="Clean energy",
+                               description="Panels on farmland", **common)
+        Project.objects.create(title="Coffee Shop", short_description="Retail",
+                               description="Espresso bar", **common)
+
+        response = self.client.get(self.url, {'q': 'sol'})
+        assert response.status_code == status.HTTP_200_OK
+        assert [item['title'] for item in response.data['results']] == ['Solar Farm', 'Community Garden']
+
+        response = self.client.get(self.url, {'search': 'espresso'})
+        assert [item['title'] for item in response.data['results']] == ['Coffee Shop']
+
+    def test_search_falls_back_to_substring_filters(self, monkeypatch):
+        from django.db import connection
+        from projects.search import search_projects
+
+        common = dict(developer=self.user, total_value=10000, total_shares=1000, duration_days=30, status='APPROVED')
+        Project.objects.create(title="Solar Farm", short_description="Clean energy", description="Panels", **common)
+        Project.objects.create(title="Coffee Shop", short_description="Retail", description="Solar roof", **common)
+        monkeypatch.setattr(connection, 'vendor', 'mysql')
+
+        results = search_projects(Project.objects.order_by('title'), 'SOLAR pan')
+        assert [(project.title, project.search_rank) for project in results] == [('Solar Farm', 0.0)]
+
+    def test_cursor_pagination_walks_ties_in_both_directions(self):
+        # Two projects per progress level, so the id tie-breaker matters.
+        for index, sold in enumerate([100, 100, 500, 500, 900]):
+            Project.objects.create(
+                developer=self.user,
+                title=f"Project {index}",
+                description="Desc",
+                short_description="Short Desc",
+                total_value=10000,
+                total_shares=1000,
+                shares_sold=sold,
+                duration_days=30,
+                status='APPROVED'
+            )
+        params = {'ordering': '-funding_progress', 'page_size': 2}
+
+        seen, pages, url = [], [], self.url
+        while url:
+            response = self.client.get(url, params if url == self.url else None)
+            assert response.status_code == status.HTTP_200_OK
+            assert 'count' not in response.data
+            pages.append(response.data)
+            seen.extend(item['title'] for item in response.data['results'])
+            url = response.data['next']
+        assert seen == ['Project 4', 'Project 3', 'Project 2', 'Project 1', 'Project 0']
+        assert pages[0]['previous'] is None
+
+        response = self.client.get(pages[-1]['previous'])
+        assert [item['title'] for item in response.data['results']] == ['Project 2', 'Project 1']
+
+        response = self.client.get(self.url, {'cursor': 'not-a-cursor'})
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_page_param_keeps_page_number_pagination(self):
+        Project.objects.create(
+            developer=self.user,
+            title="Public Project",
+            description="Desc",
+            short_description="Short Desc",
+            total_value=10000,
+            total_shares=1000,
+            duration_days=30,
+            status='APPROVED'
+        )
+
+        response = self.client.get(self.url, {'page': 1})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['count'] == 1
+        assert len(response.data['results']) == 1
+
     def test_create_project_developer(self):
         self.client.force_authenticate(user=self.user)
         data = {
@@ -99,3 +202,997 @@ class TestProjectListCreateView:
              pass
         else:
              assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.django_db
+class TestProjectListQueryBudget:
+    """List endpoints load developers and first images in a fixed number of queries."""
+
+    def setup_method(self):
+        self.client = APIClient()
+        self.developer = User.objects.create_user(
+            username='budget-dev',
+            email='budget-dev@example.com',
+            password='password123',
+            role='DEVELOPER'
+        )
+        self.investor = User.objects.create_user(
+            username='budget-investor',
+            email='budget-investor@example.com',
+            password='password123',
+            role='INVESTOR'
+        )
+        for index in range(6):
+            project = Project.objects.create(
+                developer=self.developer,
+                title=f"Budget Project {index}",
+                description="Desc",
+                short_description="Short Desc",
+                total_value=10000,
+                total_shares=1000,
+                duration_days=30,
+                status='APPROVED'
+            )
+            ProjectImage.objects.create(project=project, image_url=f"https://img.example.com/{index}/b.jpg", order=1)
+            ProjectImage.objects.create(project=project, image_url=f"https://img.example.com/{index}/a.jpg", order=0)
+            Favorite.objects.create(user=self.investor, project=project)
+            Compare.objects.create(user=self.investor, project=project)
+
+    def test_project_list(self, django_assert_num_queries):
+        # ETag fingerprint + the page itself.
+        with django_assert_num_queries(2):
+            response = self.client.get(reverse('project-list'))
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data['results']) == 6
+        first = response.data['results'][0]
+        assert first['developer_name'] == self.developer.name
+        assert first['thumbnail_url'] == 'https://img.example.com/5/a.jpg'
+
+    def test_developer_projects(self, django_assert_num_queries):
+        self.client.force_authenticate(user=self.developer)
+        with django_assert_num_queries(2):
+            response = self.client.get(reverse('my-projects'))
+        assert response.status_code == status.HTTP_200_OK
+        assert all(item['thumbnail_url'].endswith('/a.jpg') for item in response.data['results'])
+
+    def test_favorites(self, django_assert_num_queries):
+        self.client.force_authenticate(user=self.investor)
+        with django_assert_num_queries(3):
+            response = self.client.get(reverse('favorites'))
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data['results']) == 6
+        assert all(item['project']['thumbnail_url'].endswith('/a.jpg') for item in response.data['results'])
+
+    def test_compare(self, django_assert_num_queries):
+        self.client.force_authenticate(user=self.investor)
+        with django_assert_num_queries(3):
+            response = self.client.get(reverse('compare'))
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data['results']) == 6
+
+
+@pytest.mark.django_db
+class TestProjectCatalogCache:
+    def setup_method(self):
+        self.client = APIClient()
+        self.developer = User.objects.create_user(
+            username='cache-dev',
+            email='cache-dev@example.com',
+            password='password123',
+            role='DEVELOPER'
+        )
+        self.investor = User.objects.create_user(
+            username='cache-investor',
+            email='cache-investor@example.com',
+            password='password123',
+            role='INVESTOR'
+        )
+        self.project = Project.objects.create(
+            developer=self.developer,
+            title="Cached Project",
+            description="Desc",
+            short_description="Short Desc",
+            total_value=10000,
+            total_shares=1000,
+            duration_days=30,
+            status='APPROVED',
+            has_restricted_fields=True,
+            business_plan="Plan",
+        )
+
+    def test_list_is_served_from_cache_until_a_project_changes(self, django_assert_num_queries):
+        url = reverse('project-list')
+        first = self.client.get(url, {'ordering': '-created_at', 'category': ''})
+        with django_assert_num_queries(0):
+            cached = self.client.get(url, {'ordering': '-created_at'})
+        assert cached.data == first.data
+
+        self.project.shares_sold = 250
+        self.project.save(update_fields=['shares_sold'])
+        response = self.client.get(url, {'ordering': '-created_at'})
+        assert response.data['results'][0]['shares_sold'] == 250
+
+    def test_investor_shares_list_cache_but_developer_does_not(self, django_assert_num_queries):
+        url = reverse('project-list')
+        self.client.get(url)
+        self.client.force_authenticate(user=self.investor)
+        # The shared page comes from the cache; only the investor's card flags are queried.
+        with django_assert_num_queries(1):
+            self.client.get(url)
+
+        Project.objects.create(
+            developer=self.developer,
+            title="Developer Draft",
+            description="Desc",
+            short_description="Short Desc",
+            total_value=10000,
+            total_shares=1000,
+            duration_days=30,
+            status='DRAFT',
+        )
+        self.client.force_authenticate(user=self.developer)
+        response = self.client.get(url)
+        assert {item['title'] for item in response.data['results']} == {'Cached Project', 'Developer Draft'}
+
+    def test_detail_cache_follows_investor_access(self):
+        from access_requests.models import AccessRequest
+
+        url = reverse('project-detail', args=[self.project.id])
+        self.client.force_authenticate(user=self.investor)
+        assert self.client.get(url).data['restricted_fields'] is None
+
+        AccessRequest.objects.create(investor=self.investor, project=self.project, status='APPROVED')
+        response = self.client.get(url)
+        assert response.data['restricted_fields']['business_plan'] == "Plan"
+
+        self.client.force_authenticate(user=None)
+        assert self.client.get(url).data['restricted_fields'] is None
+
+
+@pytest.mark.django_db
+class TestProjectFacetsView:
+    def setup_method(self):
+        self.client = APIClient()
+        self.url = reverse('project-facets')
+        self.developer = User.objects.create_user(
+            username='facet-dev',
+            email='facet-dev@example.com',
+            password='password123',
+            role='DEVELOPER'
+        )
+        common = dict(developer=self.developer, description="Desc", short_description="Short Desc")
+        # per-share price 10, 20% funded, 30 days
+        Project.objects.create(title="Solar Farm", category='ENERGY', total_value=10000, total_shares=1000,
+                               shares_sold=200, duration_days=30, status='APPROVED', **common)
+        # per-share price 100, fully funded, 365 days
+        Project.objects.create(title="Wind Park", category='ENERGY', total_value=100000, total_shares=1000,
+                               shares_sold=1000, duration_days=365, status='APPROVED', **common)
+        # per-share price 5, 60% funded, 90 days
+        Project.objects.create(title="Clinic", category='HEALTHCARE', total_value=5000, total_shares=1000,
+                               shares_sold=600, duration_days=90, status='APPROVED', **common)
+        Project.objects.create(title="Draft Solar", category='ENERGY', total_value=5000, total_shares=1000,
+                               duration_days=90, status='DRAFT', **common)
+
+    def counts(self, data, facet):
+        return {bucket.get('value', bucket.get('key')): bucket['count'] for bucket in data[facet]}
+
+    def test_facets_come_from_one_query(self, django_assert_num_queries):
+        with django_assert_num_queries(1):
+            response = self.client.get(self.url)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['total'] == 3
+        assert self.counts(response.data, 'category')['ENERGY'] == 2
+        assert self.counts(response.data, 'category')['HEALTHCARE'] == 1
+        progress = self.counts(response.data, 'funding_progress')
+        assert (progress['0-25'], progress['50-75'], progress['funded']) == (1, 1, 1)
+        price = self.counts(response.data, 'per_share_price')
+        assert (price['under-10'], price['10-50'], price['100-500']) == (1, 1, 1)
+        duration = self.counts(response.data, 'duration_days')
+        assert (duration['30-90'], duration['90-180'], duration['365-plus']) == (1, 1, 1)
+
+    def test_bucket_counts_match_the_filtered_list_at_boundaries(self):
+        # Solar Farm sits on the 10 share-price and 30-day boundaries, Wind Park on 100% funded.
+        facets = self.client.get(self.url).data
+        params = {
+            'funding_progress': ('min_progress', 'max_progress'),
+            'per_share_price': ('min_share_price', 'max_share_price'),
+            'duration_days': ('min_duration', 'max_duration'),
+        }
+        for facet, (min_param, max_param) in params.items():
+            for bucket in facets[facet]:
+                query = {name: value for name, value in ((min_param, bucket['min']), (max_param, bucket['max']))
+                         if value is not None}
+                response = self.client.get(reverse('project-list'), query)
+                assert len(response.data['results']) == bucket['count'], (facet, bucket['key'])
+        price = self.counts(facets, 'per_share_price')
+        assert (price['under-10'], price['10-50']) == (1, 1)
+
+    def test_facets_apply_list_filters_and_role(self):
+        response = self.client.get(self.url, {'q': 'solar', 'category': 'ENERGY'})
+        assert response.data['total'] == 1
+
+        self.client.force_authenticate(user=self.developer)
+        response = self.client.get(self.url, {'q': 'solar', 'category': 'ENERGY'})
+        assert response.data['total'] == 2
+
+    def test_facets_cache_is_invalidated_by_catalog_changes(self, django_assert_num_queries):
+        self.client.get(self.url)
+        with django_assert_num_queries(0):
+            self.client.get(self.url)
+
+        project = Project.objects.get(title="Draft Solar")
+        project.status = 'APPROVED'
+        project.save(update_fields=['status'])
+        response = self.client.get(self.url)
+        assert response.data['total'] == 4
+
+
+@pytest.mark.django_db
+class TestConditionalGets:
+    def setup_method(self):
+        self.client = APIClient()
+        self.developer = User.objects.create_user(
+            username='etag-dev',
+            email='etag-dev@example.com',
+            password='password123',
+            role='DEVELOPER'
+        )
+        self.project = Project.objects.create(
+            developer=self.developer,
+            title="Tagged Project",
+            description="Desc",
+            short_description="Short Desc",
+            total_value=10000,
+            total_shares=1000,
+            duration_days=30,
+            status='APPROVED'
+        )
+
+    def test_detail_returns_304_until_the_project_changes(self):
+        url = reverse('project-detail', args=[self.project.id])
+        response = self.client.get(url)
+        etag = response['ETag']
+        assert response['Last-Modified']
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response['ETag'] == etag
+
+        self.project.shares_sold = 10
+        self.project.save(update_fields=['shares_sold'])
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        assert response['ETag'] != etag
+
+    def test_developer_rename_revalidates_list_and_detail(self):
+        urls = [reverse('project-list'), reverse('project-detail', args=[self.project.id])]
+        etags = [self.client.get(url)['ETag'] for url in urls]
+
+        # project.updated_at does not move, but developer_name in both payloads does.
+        self.developer.first_name = 'Renamed'
+        self.developer.save(update_fields=['first_name'])
+        for url, etag in zip(urls, etags):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            assert response.status_code == status.HTTP_200_OK
+            payload = response.data['results'][0] if 'results' in response.data else response.data
+            assert payload['developer_name'].startswith('Renamed')
+
+    def test_list_304_skips_serialization(self, django_assert_num_queries):
+        self.client.force_authenticate(user=self.developer)
+        url = reverse('project-list')
+        etag = self.client.get(url, {'ordering': '-created_at'})['ETag']
+
+        # The fingerprint is cached per viewer, so nothing is queried or serialized.
+        with django_assert_num_queries(0):
+            response = self.client.get(url, {'ordering': '-created_at'}, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+        response = self.client.get(url, {'ordering': 'end_date'}, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+class TestRestrictedAccessResolver:
+    def setup_method(self):
+        from access_requests.models import AccessRequest
+        from investments.models import Investment
+
+        self.developer = User.objects.create_user(
+            username='access-dev',
+            email='access-dev@example.com',
+            password='password123',
+            role='DEVELOPER'
+        )
+        self.investor = User.objects.create_user(
+            username='access-investor',
+            email='access-investor@example.com',
+            password='password123',
+            role='INVESTOR'
+        )
+        self.projects = [
+            Project.objects.create(
+                developer=self.developer,
+                title=f"Restricted {index}",
+                description="Desc",
+                short_description="Short Desc",
+                total_value=10000,
+                total_shares=1000,
+                duration_days=30,
+                status='APPROVED',
+                has_restricted_fields=True,
+                business_plan=f"Plan {index}",
+            )
+            for index in range(4)
+        ]
+        Investment.objects.create(investor=self.investor, project=self.projects[0], shares=1,
+                                  price_per_share=10, total_amount=10, status='COMPLETED')
+        Investment.objects.create(investor=self.investor, project=self.projects[1], shares=1,
+                                  price_per_share=10, total_amount=10, status='REQUESTED')
+        AccessRequest.objects.create(investor=self.investor, project=self.projects[2], status='APPROVED')
+
+    def serialize(self, user):
+        from rest_framework.request import Request
+        from rest_framework.test import APIRequestFactory, force_authenticate
+        from projects.serializers import ProjectDetailSerializer
+
+        http_request = APIRequestFactory().get('/')
+        force_authenticate(http_request, user=user)
+        request = Request(http_request)
+        projects = Project.objects.select_related('developer').prefetch_related('images')
+        return ProjectDetailSerializer(projects.order_by('title'), many=True, context={'request': request}).data
+
+    def test_access_is_resolved_in_one_query(self, django_assert_num_queries):
+        # projects + images prefetch + one access UNION for the whole page
+        with django_assert_num_queries(3):
+            data = self.serialize(self.investor)
+        visible = [item['title'] for item in data if item['restricted_fields']]
+        assert visible == ['Restricted 0', 'Restricted 2']
+
+    def test_owner_sees_everything_without_access_query(self, django_assert_num_queries):
+        with django_assert_num_queries(2):
+            data = self.serialize(self.developer)
+        assert all(item['restricted_fields'] for item in data)
+
+
+@pytest.mark.django_db
+class TestProjectComparatorView:
+    def setup_method(self):
+        from projects.comparator import reset_catalog_snapshot
+
+        reset_catalog_snapshot()
+        self.client = APIClient()
+        self.url = reverse('project-comparator')
+        self.developer = User.objects.create_user(
+            username='compare-dev',
+            email='compare-dev@example.com',
+            password='password123',
+            role='DEVELOPER'
+        )
+        self.client.force_authenticate(user=self.developer)
+        self.projects = [
+            Project.objects.create(
+                developer=self.developer,
+                title=f"Compared {index}",
+                description="Desc",
+                short_description="Short Desc",
+                total_value=1000 * (index + 1),
+                total_shares=100,
+                shares_sold=index * 25,
+                duration_days=30 * (index + 1),
+                status='APPROVED'
+            )
+            for index in range(4)
+        ]
+
+    def test_scores_against_selection_and_catalog(self, django_assert_num_queries):
+        ids = [self.projects[0].id, self.projects[3].id]
+        # selection + catalog snapshot; the snapshot is reused afterwards
+        with django_assert_num_queries(2):
+            response = self.client.post(self.url, {'project_ids': ids}, format='json')
+        assert response.status_code == status.HTTP_200_OK
+        by_id = {item['id']: item for item in response.data['projects']}
+        low, high = by_id[self.projects[0].id], by_id[self.projects[3].id]
+
+        assert (low['normalized']['total_value'], high['normalized']['total_value']) == (0, 1)
+        assert low['percentiles']['total_value'] == 12.5
+        assert high['percentiles']['total_value'] == 87.5
+        assert low['z_scores']['duration_days'] < 0 < high['z_scores']['duration_days']
+        assert high['remaining_shares'] == 25
+        assert response.data['catalog']['size'] == 4
+
+        with django_assert_num_queries(1):
+            self.client.post(self.url, {'project_ids': ids}, format='json')
+
+    def test_a_few_hundred_projects_cost_a_fixed_number_of_queries(self, django_assert_num_queries):
+        from projects.comparator import get_catalog_snapshot
+
+        extra = [
+            Project(
+                developer=self.developer, title=f"Bulk {index}", description="Desc", short_description="Short Desc",
+                total_value=500 + index, total_shares=100, shares_sold=index % 100, duration_days=30 + index % 300,
+                status='APPROVED',
+            )
+            for index in range(300)
+        ]
+        for project in extra:
+            project.refresh_funding_metrics()
+        Project.objects.bulk_create(extra)
+        ids = list(Project.objects.values_list('id', flat=True))
+
+        # The selection and the catalog snapshot, however many projects are compared.
+        with django_assert_num_queries(2):
+            response = self.client.post(self.url, {'project_ids': ids}, format='json')
+        assert len(response.data['projects']) == 304
+        assert response.data['catalog']['size'] == 304
+        snapshot = get_catalog_snapshot()
+
+        # Within the TTL the snapshot is reused: one query, and new projects only show up after a rebuild.
+        Project.objects.create(developer=self.developer, title="Late", description="Desc", short_description="Short",
+                               total_value=1000, total_shares=100, duration_days=30, status='APPROVED')
+        with django_assert_num_queries(1):
+            response = self.client.post(self.url, {'project_ids': ids}, format='json')
+        assert response.data['catalog']['size'] == 304
+        assert get_catalog_snapshot() is snapshot
+
+    def test_rejects_oversized_and_invalid_selections(self):
+        response = self.client.post(self.url, {'project_ids': list(range(1, 502))}, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        response = self.client.post(self.url, {'project_ids': ['abc']}, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        response = self.client.post(self.url, {'project_ids': [999999]}, format='json')
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+class TestSimilarProjectsView:
+    @pytest.fixture(autouse=True)
+    def index_dir(self, settings, tmp_path):
+        settings.SIMILARITY_INDEX_DIR = str(tmp_path / 'similarity')
+
+    def setup_method(self):
+        self.client = APIClient()
+        self.developer = User.objects.create_user(
+            username='similar-dev',
+            email='similar-dev@example.com',
+            password='password123',
+            role='DEVELOPER'
+        )
+        common = dict(developer=self.developer, total_shares=1000, duration_days=90, status='APPROVED')
+        self.solar = Project.objects.create(title="Solar Farm North", category='ENERGY', total_value=50000,
+                                            short_description="Solar panels and battery storage",
+                                            description="Community solar farm", **common)
+        self.solar_south = Project.objects.create(title="Solar Farm South", category='ENERGY', total_value=60000,
+                                                  short_description="Solar panels with battery storage",
+                                                  description="Regional solar farm", **common)
+        self.clinic = Project.objects.create(title="Rural Clinic", category='HEALTHCARE', total_value=900000,
+                                             short_description="Telemedicine clinic",
+                                             description="Healthcare access", **common)
+        self.bakery = Project.objects.create(title="Corner Bakery", category='RETAIL', total_value=8000,
+                                             short_description="Artisan bread shop",
+                                             description="Bakery and coffee", **common)
+
+    def test_similar_projects_from_full_and_incremental_builds(self):
+        from django.core.management import call_command
+
+        url = reverse('project-similar', args=[self.solar.id])
+        response = self.client.get(url)
+        assert response.data == {'project_id': self.solar.id, 'indexed': False, 'results': []}
+
+        call_command('build_similarity_index', stdout=open('/dev/null', 'w'))
+        response = self.client.get(url, {'limit': 2})
+        assert response.status_code == status.HTTP_200_OK
+        titles = [item['title'] for item in response.data['results']]
+        assert titles[0] == "Solar Farm South"
+        assert len(titles) == 2
+        assert self.solar.id not in [item['id'] for item in response.data['results']]
+
+        # A new near-duplicate and an archived project are folded in incrementally.
+        twin = Project.objects.create(developer=self.developer, title="Solar Farm North Phase Two", category='ENERGY',
+                                      total_value=50000, total_shares=1000, duration_days=90, status='APPROVED',
+                                      short_description="Solar panels and battery storage",
+                                      description="Community solar farm")
+        self.solar_south.status = 'ARCHIVED'
+        self.solar_south.save(update_fields=['status'])
+        from projects.similarity import refresh_index
+
+        result = refresh_index(max_changed_ratio=1.0)
+        assert (result['mode'], result['removed']) == ('incremental', 1)
+        response = self.client.get(url)
+        ids = [item['id'] for item in response.data['results']]
+        assert ids[0] == twin.id
+        assert self.solar_south.id not in ids
+        assert [item['id'] for item in self.client.get(reverse('project-similar', args=[twin.id])).data['results']][0] == self.solar.id
+
+
+    def test_old_versions_outlive_the_swap(self, settings):
+        import os
+        import time
+
+        from projects import similarity
+
+        similarity.build_index()
+        first = similarity.current_index_path()
+        similarity.build_index()
+        second = similarity.current_index_path()
+        # The previous version stays for readers that read CURRENT just before the swap.
+        assert first.is_dir() and similarity.load_index().path == second
+
+        # Three versions on: the oldest goes once it is past the grace period.
+        settings.SIMILARITY_INDEX_GRACE_SECONDS = 60
+        similarity.build_index()
+        assert first.is_dir()
+        old = time.time() - 120
+        os.utime(first, (old, old))
+        similarity.build_index()
+        assert not first.exists() and second.is_dir()
+        assert len([path for path in similarity.get_index_dir().iterdir() if path.is_dir()]) == 3
+
+    def test_load_retries_when_a_version_disappears(self, monkeypatch):
+        from projects import similarity
+
+        similarity.build_index()
+        live = similarity.current_index_path()
+        missing = live.with_name('19990101T000000000000')
+        paths = iter([missing, live])
+        monkeypatch.setattr(similarity, 'current_index_path', lambda: next(paths))
+        monkeypatch.setattr(similarity, '_loaded', None)
+        assert similarity.load_index().path == live
+
+
+@pytest.mark.django_db
+class TestTrendingRanking:
+    def setup_method(self):
+        self.client = APIClient()
+        self.url = reverse('project-list')
+        self.developer = User.objects.create_user(
+            username='trend-dev',
+            email='trend-dev@example.com',
+            password='password123',
+            role='DEVELOPER'
+        )
+        self.investors = [
+            User.objects.create_user(
+                username=f'trend-investor-{index}',
+                email=f'trend-investor-{index}@example.com',
+                password='password123',
+                role='INVESTOR'
+            )
+            for index in range(3)
+        ]
+        self.quiet, self.liked, self.hot = [
+            Project.objects.create(
+                developer=self.developer,
+                title=title,
+                description="Desc",
+                short_description="Short Desc",
+                total_value=10000,
+                total_shares=100,
+                duration_days=30,
+                status='APPROVED'
+            )
+            for title in ("Quiet", "Liked", "Hot")
+        ]
+
+    def favorite(self, investor, project):
+        self.client.force_authenticate(user=investor)
+        response = self.client.post(reverse('favorites'), {'project': project.id})
+        assert response.status_code == status.HTTP_201_CREATED
+
+    def trending_titles(self, **params):
+        self.client.force_authenticate(user=None)
+        response = self.client.get(self.url, {'ordering': 'trending', **params})
+        assert response.status_code == status.HTTP_200_OK
+        return [item['title'] for item in response.data['results']]
+
+    def test_events_update_trending_order(self):
+        from investments.models import Investment
+
+        assert {self.quiet.ranking.score, self.hot.ranking.score} == {0.0}
+        self.favorite(self.investors[0], self.liked)
+        assert self.trending_titles()[0] == "Liked"
+
+        self.client.force_authenticate(user=self.investors[1])
+        response = self.client.post(reverse('investment-list'), {'project': self.hot.id, 'shares': 5})
+        assert response.status_code == status.HTTP_201_CREATED
+        # Served fresh despite the cached first page: the ranking version moved.
+        assert self.trending_titles() == ["Hot", "Liked", "Quiet"]
+        assert self.trending_titles(ordering='-trending')[0] == "Quiet"
+
+        self.client.force_authenticate(user=self.investors[0])
+        response = self.client.delete(reverse('favorite-delete', args=[self.liked.id]))
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        self.liked.ranking.refresh_from_db()
+        assert self.liked.ranking.score == pytest.approx(0.0, abs=1e-9)
+        assert Investment.objects.filter(project=self.hot).exists()
+
+    def test_cursor_pages_follow_the_ranking_and_match_a_rebuild(self):
+        from projects.models import ProjectRanking
+        from projects.ranking import decayed_score, rebuild_rankings
+
+        for investor in self.investors:
+            self.favorite(investor, self.hot)
+        self.favorite(self.investors[0], self.liked)
+
+        self.client.force_authenticate(user=None)
+        first = self.client.get(self.url, {'ordering': 'trending', 'page_size': 2})
+        assert [item['title'] for item in first.data['results']] == ["Hot", "Liked"]
+        second = self.client.get(first.data['next'])
+        assert [item['title'] for item in second.data['results']] == ["Quiet"]
+
+        now = timezone.now()
+
+        def decayed():
+            return {
+                project_id: decayed_score(score, now)
+                for project_id, score in ProjectRanking.objects.values_list('project_id', 'score')
+            }
+
+        incremental = decayed()
+        # The rebuild also moves the epoch to now; scores are rescaled, not changed.
+        assert rebuild_rankings() == 3
+        assert decayed() == pytest.approx(incremental)
+
+    def test_short_half_life_rebases_instead_of_overflowing(self, settings):
+        from projects.models import ProjectRanking, RankingEpoch
+        from projects.ranking import EPOCH_CACHE, MAX_EXPONENT, decayed_score
+
+        EPOCH_CACHE.clear()
+        # Over 600 half-lives past the default epoch: 2 ** 600 alone would be near float range.
+        settings.TRENDING_HALF_LIFE_HOURS = 1
+        self.favorite(self.investors[0], self.liked)
+        self.favorite(self.investors[1], self.hot)
+        self.favorite(self.investors[2], self.hot)
+
+        epoch = RankingEpoch.objects.get().epoch
+        assert timezone.now().timestamp() - epoch < MAX_EXPONENT * 3600
+        scores = dict(ProjectRanking.objects.values_list('project_id', 'score'))
+        assert decayed_score(scores[self.hot.id]) == pytest.approx(2.0, rel=1e-3)
+        assert self.trending_titles() == ["Hot", "Liked", "Quiet"]
+
+    def test_half_life_setting_is_checked(self, settings):
+        from projects.ranking import check_half_life
+
+        assert check_half_life() == []
+        for value in (0, -48, 0.01, '48'):
+            settings.TRENDING_HALF_LIFE_HOURS = value
+            assert [error.id for error in check_half_life()] == ['projects.E001']
+
+
+@pytest.mark.django_db
+class TestProjectMembership:
+    def setup_method(self):
+        from access_requests.models import AccessRequest
+        from investments.models import Investment
+
+        self.client = APIClient()
+        self.developer = User.objects.create_user(
+            username='member-dev',
+            email='member-dev@example.com',
+            password='password123',
+            role='DEVELOPER'
+        )
+        self.investor = User.objects.create_user(
+            username='member-investor',
+            email='member-investor@example.com',
+            password='password123',
+            role='INVESTOR'
+        )
+        self.projects = [
+            Project.objects.create(
+                developer=self.developer,
+                title=f"Member {index}",
+                description="Desc",
+                short_description="Short Desc",
+                total_value=10000,
+                total_shares=100,
+                duration_days=30,
+                status='APPROVED'
+            )
+            for index in range(4)
+        ]
+        AccessRequest.objects.create(investor=self.investor, project=self.projects[0], status='APPROVED')
+        for shares in (3, 4):
+            Investment.objects.create(
+                investor=self.investor, project=self.projects[0], shares=shares,
+                price_per_share=100, total_amount=shares * 100, status='COMPLETED',
+            )
+        self.client.force_authenticate(user=self.investor)
+
+    def cards(self):
+        response = self.client.get(reverse('project-list'))
+        assert response.status_code == status.HTTP_200_OK
+        return {item['id']: item for item in response.data['results']}
+
+    def test_bulk_add_and_remove_in_one_statement_each(self, django_assert_num_queries):
+        ids = [project.id for project in self.projects]
+        response = self.client.post(reverse('favorites-bulk'), {'add': ids[:3] + [999999]}, format='json')
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == {'added': ids[:3], 'removed': []}
+        assert Favorite.objects.filter(user=self.investor).count() == 3
+
+        response = self.client.post(reverse('favorites-bulk'), {'add': [ids[3]], 'remove': ids[:2]}, format='json')
+        assert response.data == {'added': [ids[3]], 'removed': ids[:2]}
+        assert set(Favorite.objects.filter(user=self.investor).values_list('project_id', flat=True)) == set(ids[2:])
+        self.projects[0].ranking.refresh_from_db()
+        assert self.projects[0].ranking.score == pytest.approx(0.0, abs=1e-9)
+
+        response = self.client.post(reverse('compare-bulk'), {'add': ids[:2]}, format='json')
+        assert response.data['added'] == ids[:2]
+        # Nothing to remove: a single lookup (in a savepoint), no writes.
+        with django_assert_num_queries(3):
+            response = self.client.post(reverse('compare-bulk'), {'remove': [999999]}, format='json')
+        assert response.data == {'added': [], 'removed': []}
+
+    def test_bulk_counts_only_rows_it_inserted(self):
+        from projects.ranking import decayed_score
+
+        ids = [project.id for project in self.projects]
+        # Inserted behind the request's back, as a concurrent request would.
+        Favorite.objects.bulk_create([Favorite(user=self.investor, project_id=ids[0])])
+        response = self.client.post(reverse('favorites-bulk'), {'add': ids[:2]}, format='json')
+        assert response.data['added'] == [ids[1]]
+        self.projects[0].ranking.refresh_from_db()
+        self.projects[1].ranking.refresh_from_db()
+        assert self.projects[0].ranking.score == 0.0
+        assert decayed_score(self.projects[1].ranking.score) == pytest.approx(1.0, rel=1e-3)
+
+    def test_bulk_rejects_invalid_payloads(self):
+        url = reverse('favorites-bulk')
+        assert self.client.post(url, {}, format='json').status_code == status.HTTP_400_BAD_REQUEST
+        assert self.client.post(url, {'add': ['x']}, format='json').status_code == status.HTTP_400_BAD_REQUEST
+        assert self.client.post(url, {'add': list(range(1, 102))}, format='json').status_code == status.HTTP_400_BAD_REQUEST
+        response = self.client.post(url, {'add': [1], 'remove': [1]}, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_cards_carry_viewer_state(self, django_assert_num_queries):
+        first, second = self.projects[0].id, self.projects[1].id
+        self.client.post(reverse('favorites-bulk'), {'add': [first]}, format='json')
+        self.client.post(reverse('compare-bulk'), {'add': [second]}, format='json')
+
+        cards = self.cards()
+        assert (cards[first]['is_favorited'], cards[first]['is_compared']) == (True, False)
+        assert (cards[first]['my_access_status'], cards[first]['my_position']) == ('APPROVED', 7)
+        assert (cards[second]['is_favorited'], cards[second]['is_compared']) == (False, True)
+        assert (cards[second]['my_access_status'], cards[second]['my_position']) == (None, 0)
+
+        # The flags change the investor's ETag even though the catalog did not change.
+        etag = self.client.get(reverse('project-list'))['ETag']
+        self.client.post(reverse('favorites-bulk'), {'remove': [first]}, format='json')
+        response = self.client.get(reverse('project-list'), HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        assert {item['id']: item for item in response.data['results']}[first]['is_favorited'] is False
+
+        self.client.force_authenticate(user=None)
+        guest_cards = self.cards()
+        assert guest_cards[second]['is_compared'] is False
+
+        # Favorites list: count + favorites + prefetched projects (with the state subqueries).
+        self.client.force_authenticate(user=self.investor)
+        self.client.post(reverse('favorites-bulk'), {'add': [second]}, format='json')
+        with django_assert_num_queries(3):
+            response = self.client.get(reverse('favorites'))
+        [favorite] = response.data['results']
+        assert (favorite['project']['is_favorited'], favorite['project']['is_compared']) == (True, True)
+
+
+@pytest.mark.django_db
+class TestDeveloperPortfolio:
+    def setup_method(self):
+        from access_requests.models import AccessRequest
+        from investments.models import Investment
+
+        self.client = APIClient()
+        self.developer = User.objects.create_user(
+            username='portfolio-dev',
+            email='portfolio-dev@example.com',
+            password='password123',
+            role='DEVELOPER'
+        )
+        self.investors = [
+            User.objects.create_user(
+                username=f'portfolio-investor-{index}',
+                email=f'portfolio-investor-{index}@example.com',
+                password='password123',
+                role='INVESTOR'
+            )
+            for index in range(3)
+        ]
+        self.funded, self.open = [
+            Project.objects.create(
+                developer=self.developer,
+                title=title,
+                description="Desc",
+                short_description="Short Desc",
+                total_value=10000,
+                total_shares=100,
+                shares_sold=shares_sold,
+                duration_days=30,
+                status=project_status,
+            )
+            for title, shares_sold, project_status in (("Funded", 100, 'APPROVED'), ("Open", 10, 'ARCHIVED'))
+        ]
+
+        def invest(investor, project, shares, investment_status):
+            Investment.objects.create(
+                investor=investor, project=project, shares=shares, price_per_share=100,
+                total_amount=shares * 100, status=investment_status,
+            )
+
+        invest(self.investors[0], self.funded, 60, 'COMPLETED')
+        invest(self.investors[0], self.funded, 30, 'COMPLETED')
+        invest(self.investors[1], self.funded, 10, 'COMPLETED')
+        invest(self.investors[1], self.open, 10, 'COMPLETED')
+        invest(self.investors[2], self.open, 5, 'REQUESTED')
+        for investor in self.investors:
+            AccessRequest.objects.create(investor=investor, project=self.funded)
+        self.client.force_authenticate(user=self.developer)
+
+    def test_portfolio_rows_and_totals_from_one_query(self, django_assert_num_queries):
+        with django_assert_num_queries(1):
+            response = self.client.get(reverse('developer-portfolio'))
+        assert response.status_code == status.HTTP_200_OK
+        rows = {item['title']: item for item in response.data['projects']}
+        assert rows['Funded']['raised_amount'] == 10000.0
+        assert (rows['Funded']['investor_count'], rows['Funded']['pending_request_count']) == (2, 0)
+        assert rows['Funded']['access_request_count'] == 3
+        assert (rows['Open']['investor_count'], rows['Open']['pending_request_count']) == (1, 1)
+        assert rows['Open']['access_request_count'] == 0
+
+        totals = response.data['totals']
+        assert totals['total_projects'] == 2
+        assert (totals['active_projects'], totals['completed_projects'], totals['archived_projects']) == (1, 1, 1)
+        assert totals['total_funds_secured'] == 11000.0
+        assert (totals['total_investors'], totals['total_shares_sold']) == (2, 110)
+
+    def test_dashboard_uses_the_portfolio_query(self, django_assert_num_queries):
+        with django_assert_num_queries(1):
+            response = self.client.get(reverse('dashboard-stats'))
+        assert response.data['total_investors'] == 2
+        assert response.data['total_funds_secured'] == 11000.0
+
+
+@pytest.mark.django_db
+class TestProjectFundingHistory:
+    def setup_method(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_user(
+            username='funding-admin', email='funding-admin@example.com', password='password123', role='ADMIN'
+        )
+        self.developer = User.objects.create_user(
+            username='funding-dev', email='funding-dev@example.com', password='password123', role='DEVELOPER'
+        )
+        self.investors = [
+            User.objects.create_user(
+                username=f'funding-investor-{index}',
+                email=f'funding-investor-{index}@example.com',
+                password='password123',
+                role='INVESTOR'
+            )
+            for index in range(2)
+        ]
+        self.project = Project.objects.create(
+            developer=self.developer,
+            title="Funded Over Time",
+            description="Desc",
+            short_description="Short Desc",
+            total_value=100000,
+            total_shares=1000,
+            shares_sold=50,
+            duration_days=30,
+            status='APPROVED'
+        )
+        self.url = reverse('project-funding-history', args=[self.project.id])
+
+    def invest(self, investor, shares, investment_status):
+        from investments.models import Investment
+
+        return Investment.objects.create(
+            investor=investor, project=self.project, shares=shares, price_per_share=100,
+            total_amount=shares * 100, status=investment_status,
+        )
+
+    def snapshot(self, day, shares_sold, raised, investor_count):
+        from projects.models import ProjectFundingSnapshot
+
+        ProjectFundingSnapshot.objects.create(
+            project=self.project, day=day, shares_sold=shares_sold, raised=raised, investor_count=investor_count,
+        )
+
+    def test_completion_and_release_update_todays_snapshot(self):
+        from django.utils import timezone
+        from investments.utils import apply_investment_action
+
+        investment = self.invest(self.investors[0], 10, 'PROCESSING')
+        self.client.force_authenticate(user=self.admin)
+        self.client.post(reverse('investment-complete', args=[investment.id]))
+
+        points = self.client.get(self.url).data['points']
+        assert [(point['date'], point['shares_sold'], point['raised'], point['investor_count']) for point in points] == [
+            (timezone.localdate(), 60, 1000, 1),
+        ]
+
+        investment.refresh_from_db()
+        apply_investment_action(investment, 'refund', actor=self.admin)
+        points = self.client.get(self.url).data['points']
+        assert [(point['shares_sold'], point['raised'], point['investor_count']) for point in points] == [(50, 0, 0)]
+
+    def test_rollup_replays_the_ledger_from_the_current_state(self):
+        from datetime import date, datetime
+        from io import StringIO
+        from django.core.management import call_command
+        from django.utils import timezone
+        from audit.models import ProjectLedgerEntry
+        from projects.models import ProjectFundingSnapshot
+
+        refunded = self.invest(self.investors[0], 10, 'REFUNDED')
+        held = self.invest(self.investors[1], 20, 'COMPLETED')
+        withdrawn = self.invest(self.investors[1], 5, 'WITHDRAWN')
+        Project.objects.filter(pk=self.project.pk).update(shares_sold=70)
+
+        def entry(day, entry_type, investment):
+            row = ProjectLedgerEntry.objects.create(
+                project=self.project,
+                entry_type=entry_type,
+                metadata={
+                    'investment_id': str(investment.id),
+                    'investor_id': str(investment.investor_id),
+                    'shares': investment.shares,
+                    'amount': str(investment.total_amount),
+                },
+            )
+            moment = timezone.make_aware(datetime(2026, 3, day, 12))
+            ProjectLedgerEntry.objects.filter(pk=row.pk).update(created_at=moment)
+
+        entry(2, ProjectLedgerEntry.EntryType.INVESTMENT_COMPLETED, refunded)
+        entry(3, ProjectLedgerEntry.EntryType.INVESTMENT_COMPLETED, held)
+        entry(3, ProjectLedgerEntry.EntryType.INVESTMENT_WITHDRAWN, withdrawn)  # never completed
+        entry(4, ProjectLedgerEntry.EntryType.INVESTMENT_REFUNDED, refunded)
+        self.snapshot(date(2026, 3, 1), 1, 1, 1)  # stale rows are replaced
+
+        out = StringIO()
+        call_command('rollup_funding_snapshots', stdout=out)
+        assert 'Rebuilt 3 funding snapshots for 1 projects' in out.getvalue()
+
+        rows = ProjectFundingSnapshot.objects.filter(project=self.project).order_by('day')
+        assert [(row.day, row.shares_sold, row.raised, row.investor_count) for row in rows] == [
+            (date(2026, 3, 2), 60, 1000, 1),
+            (date(2026, 3, 3), 80, 3000, 2),
+            (date(2026, 3, 4), 70, 2000, 1),
+        ]
+
+    def test_range_and_downsampling(self):
+        from datetime import date
+
+        self.snapshot(date(2026, 1, 5), 60, 1000, 1)
+        self.snapshot(date(2026, 1, 7), 70, 2000, 2)
+        self.snapshot(date(2026, 1, 20), 80, 3000, 2)
+        self.snapshot(date(2026, 2, 3), 90, 4000, 3)
+
+        response = self.client.get(self.url, {'from': '2026-01-06', 'to': '2026-01-31', 'interval': 'week'})
+        assert response.status_code == status.HTTP_200_OK
+        assert [(point['date'], point['shares_sold']) for point in response.data['points']] == [
+            (date(2026, 1, 6), 70),
+            (date(2026, 1, 19), 80),
+        ]
+
+        response = self.client.get(self.url, {'interval': 'month'})
+        assert [(point['date'], point['shares_sold']) for point in response.data['points']] == [
+            (date(2026, 1, 1), 80),
+            (date(2026, 2, 1), 90),
+        ]
+
+        response = self.client.get(self.url, {'from': '2026-01-10', 'to': '2026-01-12'})
+        assert [(point['date'], point['shares_sold']) for point in response.data['points']] == [
+            (date(2026, 1, 10), 70),
+        ]
+
+    def test_visibility_and_validation(self):
+        assert self.client.get(self.url, {'interval': 'year'}).status_code == status.HTTP_400_BAD_REQUEST
+        assert self.client.get(self.url, {'from': 'yesterday'}).status_code == status.HTTP_400_BAD_REQUEST
+        response = self.client.get(self.url, {'from': '2026-02-01', 'to': '2026-01-01'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+        Project.objects.filter(pk=self.project.pk).update(status='DRAFT')
+        assert self.client.get(self.url).status_code == status.HTTP_404_NOT_FOUND
+        self.client.force_authenticate(user=self.developer)
+        assert self.client.get(self.url).status_code == status.HTTP_200_OK
@@ -42,6 +42,7 @@ const getVariantForStatus = (status: string): VariantProps<typeof statusBadgeVar
     draft: "draft",
     pendingreview: "pending",
     pending: "pending",
+    queued: "pending",
     requested: "pending",
     approved: "approved",
     rejected: "rejected",
@@ -69,6 +70,7 @@ const getStatusLabel = (status: string): string => {
     DRAFT: "Draft",
     PENDING_REVIEW: "Pending Review",
     PENDING: "Pending",
+    QUEUED: "Queued",
     REQUESTED: "Requested",
     APPROVED: "Approved",
     REJECTED: "Rejected",
@@ -59,7 +59,7 @@ export const projectsApi = {
     }
     
     if (filters?.maxProgress !== undefined) {
-      projects = projects.filter(p => p.fundingProgress <= filters.maxProgress!);
+      projects = projects.filter(p => p.fundingProgress < filters.maxProgress!);
     }
     
     if (filters?.minSharePrice !== undefined) {
@@ -67,7 +67,7 @@ export const projectsApi = {
     }
     
     if (filters?.maxSharePrice !== undefined) {
-      projects = projects.filter(p => p.perSharePrice <= filters.maxSharePrice!);
+      projects = projects.filter(p => p.perSharePrice < filters.maxSharePrice!);
     }
     
     // Apply sorting
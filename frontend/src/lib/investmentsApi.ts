@@ -57,8 +57,9 @@ export const investmentsApi = {
     return mapInvestment(response.data);
   },
 
-  async pay(investmentId: string, paymentMethod: string): Promise<void> {
-    await apiClient.post(`/investments/${investmentId}/pay/`, { payment_method: paymentMethod });
+  async pay(investmentId: string, paymentMethod: string): Promise<Payment> {
+    const response = await apiClient.post(`/investments/${investmentId}/pay/`, { payment_method: paymentMethod });
+    return mapPayment(response.data.payment);
   },
 
   async review(investmentId: string, action: 'approve' | 'reject', expiresInDays?: number, adminNote?: string): Promise<Investment> {
@@ -94,4 +95,9 @@ export const paymentsApi = {
     const results = Array.isArray(response.data.results) ? response.data.results : response.data;
     return results.map(mapPayment);
   },
+
+  async get(paymentId: string): Promise<Payment | undefined> {
+    const payments = await paymentsApi.list();
+    return payments.find((payment) => payment.id === paymentId);
+  },
 };
@@ -149,6 +149,7 @@ export default function AdminPayments() {
                 <SelectItem value="SUCCESS">Success</SelectItem>
                 <SelectItem value="FAILED">Failed</SelectItem>
                 <SelectItem value="PENDING">Pending</SelectItem>
+                <SelectItem value="QUEUED">Queued</SelectItem>
                 <SelectItem value="REFUNDED">Refunded</SelectItem>
                 <SelectItem value="WITHDRAWN">Withdrawn</SelectItem>
                 <SelectItem value="REVERSED">Reversed</SelectItem>
@@ -14,7 +14,7 @@ import {
   CheckCircle, AlertCircle, Loader2, Lock, Shield 
 } from 'lucide-react';
 import { projectsApi } from '@/lib/projectsApi';
-import { investmentsApi } from '@/lib/investmentsApi';
+import { investmentsApi, paymentsApi } from '@/lib/investmentsApi';
 import type { Project } from '@/types';
 import type { Investment } from '@/types';
 import { useAuthStore } from '@/store/authStore';
@@ -22,7 +22,11 @@ import { useToast } from '@/hooks/use-toast';
 import { cn } from '@/lib/utils';
 import { MediaImage } from '@/components/common/MediaImage';
 
-type Step = 'shares' | 'payment' | 'processing' | 'success' | 'failed';
+type Step = 'shares' | 'payment' | 'queued' | 'processing' | 'success' | 'failed';
+
+// How often, and for how long, a queued payment is polled until it settles.
+const PAYMENT_POLL_INTERVAL_MS = 3000;
+const PAYMENT_POLL_ATTEMPTS = 40;
 
 const paymentMethods = [
   { id: 'card', label: 'Credit/Debit Card', icon: CreditCard },
@@ -43,6 +47,8 @@ export default function InvestPage() {
   const [shares, setShares] = useState(1);
   const [paymentMethod, setPaymentMethod] = useState('card');
   const [isProcessing, setIsProcessing] = useState(false);
+  const [queuedPaymentId, setQueuedPaymentId] = useState<string | null>(null);
+  const [isStillQueued, setIsStillQueued] = useState(false);
 
   useEffect(() => {
     const loadProject = async () => {
@@ -81,6 +87,48 @@ export default function InvestPage() {
     setShares(investmentRequest.shares);
   }, [investmentRequest?.id]);
 
+  useEffect(() => {
+    if (!queuedPaymentId) return;
+    let cancelled = false;
+    let attempts = 0;
+    let timer: ReturnType<typeof setTimeout>;
+
+    const poll = async () => {
+      attempts += 1;
+      try {
+        const payment = await paymentsApi.get(queuedPaymentId);
+        if (cancelled) return;
+        if (payment?.status === 'SUCCESS') {
+          setQueuedPaymentId(null);
+          if (id) setProject(await projectsApi.getById(id));
+          setStep('processing');
+          toast({ title: 'Payment received', description: 'Awaiting admin approval.' });
+          return;
+        }
+        if (payment && payment.status !== 'QUEUED' && payment.status !== 'PENDING') {
+          setQueuedPaymentId(null);
+          setStep('failed');
+          toast({ title: 'Payment failed', description: 'Your payment was not completed.', variant: 'destructive' });
+          return;
+        }
+      } catch {
+        // Keep polling; a transient error says nothing about the payment.
+      }
+      if (cancelled) return;
+      if (attempts >= PAYMENT_POLL_ATTEMPTS) {
+        setIsStillQueued(true);
+        return;
+      }
+      timer = setTimeout(poll, PAYMENT_POLL_INTERVAL_MS);
+    };
+
+    timer = setTimeout(poll, PAYMENT_POLL_INTERVAL_MS);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [queuedPaymentId, id, toast]);
+
   if (isLoading) {
     return (
       <PageContainer>
@@ -152,12 +200,11 @@ export default function InvestPage() {
       if (!project || !investmentRequest) {
         throw new Error('Investment request not found');
       }
-      await investmentsApi.pay(investmentRequest.id, paymentMethod);
-
-      const refreshed = await projectsApi.getById(project.id);
-      setProject(refreshed);
-      setStep('processing');
-      toast({ title: 'Payment received', description: 'Awaiting admin approval.' });
+      // The charge is queued; the effect above follows it until it settles.
+      const payment = await investmentsApi.pay(investmentRequest.id, paymentMethod);
+      setIsStillQueued(false);
+      setQueuedPaymentId(payment.id);
+      setStep('queued');
     } catch (error) {
       toast({
         title: 'Investment failed',
@@ -316,6 +363,24 @@ export default function InvestPage() {
           </motion.div>
         );
 
+      case 'queued':
+        return (
+          <motion.div initial={{ opacity: 0 }} animate={{ opacity: 1 }} className="text-center py-12">
+            <Loader2 className="h-16 w-16 animate-spin text-accent mx-auto mb-6" />
+            <h2 className="text-2xl font-display font-bold mb-2">Processing Payment</h2>
+            <p className="text-muted-foreground">
+              {isStillQueued
+                ? 'Your payment is still being processed. Check your investments for its status.'
+                : 'Your payment is queued with the payment provider. This page updates once it is confirmed.'}
+            </p>
+            <div className="mt-6">
+              <Link to="/app/investor/investments">
+                <Button variant="outline">View Investments</Button>
+              </Link>
+            </div>
+          </motion.div>
+        );
+
       case 'processing':
         return (
           <motion.div initial={{ opacity: 0 }} animate={{ opacity: 1 }} className="text-center py-12">
@@ -405,7 +470,7 @@ export default function InvestPage() {
         <div className="grid lg:grid-cols-3 gap-8">
           <div className="lg:col-span-2">
             {/* Progress Steps */}
-            {step !== 'processing' && (
+            {step !== 'processing' && step !== 'queued' && (
               <div className="flex items-center gap-4 mb-8">
                 {['shares', 'payment'].map((s, i) => (
                   <div key={s} className="flex items-center gap-2">
@@ -18,7 +18,7 @@ export type AccessRequestStatus =
   | 'REVOKED';
 
 // Payment Status
-export type PaymentStatus = 'PENDING' | 'SUCCESS' | 'FAILED' | 'REFUNDED' | 'WITHDRAWN' | 'REVERSED';
+export type PaymentStatus = 'PENDING' | 'QUEUED' | 'SUCCESS' | 'FAILED' | 'REFUNDED' | 'WITHDRAWN' | 'REVERSED';
 
 // Investment Status
 export type InvestmentStatus =